@@ -0,0 +1,248 @@
+"""
+Admission control for /chat.
+
+One chat turn fans out to up to three specialists, each making up to six
+LLM calls, so an unbounded burst of /chat requests becomes an unbounded
+number of outbound LLM calls and DB sessions. Three limits stop that:
+
+  • per-user token buckets    CHAT_RATE_PER_MINUTE turns per user (or per
+                              client address when anonymous) with bursts of
+                              up to CHAT_BURST; over the limit → 429
+  • the chat gate             at most CHAT_MAX_CONCURRENT turns run at once;
+                              up to CHAT_QUEUE_SIZE more wait in line, each
+                              for at most CHAT_QUEUE_TIMEOUT seconds; a full
+                              queue or a timed-out wait → 503
+  • the LLM gate              at most LLM_MAX_CONCURRENT LLM calls are in
+                              flight across all admitted turns; further calls
+                              wait for a slot (hedged attempts share their
+                              call's slot)
+
+Rejections are raised as AdmissionRejected, carrying the status code and a
+Retry-After estimate: when the bucket refills, or how long the queue ahead
+should take to drain at the gate's recent turn time. Queue depth, in-flight
+counts, wait times and rejections are exported at /metrics.
+
+All limits are per worker process. CHAT_RATE_PER_MINUTE=0 turns the buckets
+off, ADMISSION_CONTROL=0 turns everything off.
+"""
+import asyncio
+import collections
+import contextlib
+import math
+import os
+import threading
+import time
+
+import metrics
+
+ADMISSION_CONTROL = os.getenv("ADMISSION_CONTROL", "1").lower() not in ("0", "false", "no")
+CHAT_MAX_CONCURRENT = int(os.getenv("CHAT_MAX_CONCURRENT", "32"))
+CHAT_QUEUE_SIZE = int(os.getenv("CHAT_QUEUE_SIZE", "64"))
+CHAT_QUEUE_TIMEOUT = float(os.getenv("CHAT_QUEUE_TIMEOUT", "15"))
+LLM_MAX_CONCURRENT = int(os.getenv("LLM_MAX_CONCURRENT", "48"))
+CHAT_RATE_PER_MINUTE = float(os.getenv("CHAT_RATE_PER_MINUTE", "30"))
+CHAT_BURST = int(os.getenv("CHAT_BURST", "10"))
+_MAX_BUCKETS = 10_000
+_MAX_RETRY_AFTER = 60
+
+_in_flight = metrics.gauge("admission_in_flight", "Work holding a slot of the gate", ("gate",))
+_queue_depth = metrics.gauge("admission_queue_depth", "Work waiting for a slot of the gate", ("gate",))
+_wait_seconds = metrics.histogram(
+    "admission_wait_seconds", "Time spent waiting for a slot (0 when one was free)", ("gate",),
+    buckets=(0.001, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0),
+)
+_rejected = metrics.counter(
+    "admission_rejected", "Requests turned away: rate_limited, queue_full or queue_timeout", ("gate", "reason"))
+
+
+class AdmissionRejected(Exception):
+    """The request is not admitted; retry after `retry_after` seconds."""
+
+    def __init__(self, status_code: int, detail: str, retry_after: int):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+        self.retry_after = retry_after
+
+
+def _retry_after(seconds: float) -> int:
+    return max(1, min(_MAX_RETRY_AFTER, math.ceil(seconds)))
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Per-user token buckets
+# ─────────────────────────────────────────────────────────────────────────────
+
+class TokenBuckets:
+    """`rate_per_minute` tokens per key, refilled continuously, holding at most `burst`."""
+
+    def __init__(self, rate_per_minute: float, burst: int, max_keys: int = _MAX_BUCKETS):
+        self.rate = rate_per_minute / 60
+        self.burst = burst
+        self.max_keys = max_keys
+        self._buckets: collections.OrderedDict = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, key) -> float:
+        """Spend one token for `key`: 0 when granted, else seconds until one is available."""
+        if self.rate <= 0:
+            return 0.0
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.pop(key, (float(self.burst), now))
+            tokens = min(float(self.burst), tokens + (now - updated) * self.rate)
+            wait = 0.0
+            if tokens >= 1:
+                tokens -= 1
+            else:
+                wait = (1 - tokens) / self.rate
+            self._buckets[key] = (tokens, now)
+            # Least recently seen keys go first; a forgotten key starts with a full bucket
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+            return wait
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Gates
+# ─────────────────────────────────────────────────────────────────────────────
+
+class Gate:
+    """
+    A semaphore with a bounded FIFO wait queue. A released slot is handed
+    straight to the longest waiter, so late arrivals cannot jump the queue.
+    """
+
+    def __init__(self, name: str, limit: int, queue_size: int | None = None, timeout: float | None = None):
+        self.name = name
+        self.limit = limit
+        self.queue_size = queue_size
+        self.timeout = timeout
+        self.active = 0
+        self._waiters: collections.deque[asyncio.Future] = collections.deque()
+        # Moving average of how long a slot is held, for Retry-After
+        self._hold_seconds = 1.0
+
+    @property
+    def waiting(self) -> int:
+        return len(self._waiters)
+
+    def _publish(self):
+        _in_flight.set(self.active, gate=self.name)
+        _queue_depth.set(len(self._waiters), gate=self.name)
+
+    def drain_estimate(self) -> float:
+        """Seconds until the queue ahead of a new arrival should have been served."""
+        return self._hold_seconds * (len(self._waiters) + 1) / max(1, self.limit)
+
+    async def acquire(self) -> float:
+        """Wait for a slot; returns the seconds waited. Raises AdmissionRejected when turned away."""
+        if self.active < self.limit and not self._waiters:
+            self.active += 1
+            self._publish()
+            _wait_seconds.observe(0.0, gate=self.name)
+            return 0.0
+        if self.queue_size is not None and len(self._waiters) >= self.queue_size:
+            _rejected.inc(gate=self.name, reason="queue_full")
+            raise AdmissionRejected(503, "Server busy, please retry shortly", _retry_after(self.drain_estimate()))
+
+        started = time.monotonic()
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        self._publish()
+        try:
+            await asyncio.wait_for(waiter, self.timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as exc:
+            if waiter.done() and not waiter.cancelled():
+                self.release()  # the slot arrived as we gave up: pass it on
+            else:
+                with contextlib.suppress(ValueError):
+                    self._waiters.remove(waiter)
+                self._publish()
+            if isinstance(exc, asyncio.CancelledError):
+                raise
+            _rejected.inc(gate=self.name, reason="queue_timeout")
+            raise AdmissionRejected(
+                503, "Server busy, please retry shortly", _retry_after(self.drain_estimate())
+            ) from None
+        waited = time.monotonic() - started
+        _wait_seconds.observe(waited, gate=self.name)
+        return waited
+
+    def release(self, held_seconds: float | None = None):
+        if held_seconds is not None:
+            self._hold_seconds += 0.1 * (held_seconds - self._hold_seconds)
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)  # the slot moves to the waiter; `active` is unchanged
+                self._publish()
+                return
+        self.active -= 1
+        self._publish()
+
+    @contextlib.asynccontextmanager
+    async def slot(self):
+        await self.acquire()
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self.release(time.monotonic() - started)
+
+    def snapshot(self) -> dict:
+        return {
+            "limit": self.limit,
+            "in_flight": self.active,
+            "waiting": len(self._waiters),
+            "queue_size": self.queue_size,
+            "avg_hold_ms": round(self._hold_seconds * 1000, 1),
+        }
+
+
+chat_gate = Gate("chat", CHAT_MAX_CONCURRENT, CHAT_QUEUE_SIZE, CHAT_QUEUE_TIMEOUT)
+llm_gate = Gate("llm", LLM_MAX_CONCURRENT)
+chat_buckets = TokenBuckets(CHAT_RATE_PER_MINUTE, CHAT_BURST)
+
+
+class Ticket:
+    """An admitted chat turn's slot; `release()` may be called more than once."""
+
+    def __init__(self, gate: Gate | None):
+        self._gate = gate
+        self._started = time.monotonic()
+
+    def release(self):
+        gate, self._gate = self._gate, None
+        if gate is not None:
+            gate.release(time.monotonic() - self._started)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.release()
+
+
+async def admit(client_key) -> Ticket:
+    """
+    Admit one chat turn for `client_key`: spend a token, then take (or queue
+    for) a chat slot. Release the returned ticket when the turn is over.
+    """
+    if not ADMISSION_CONTROL:
+        return Ticket(None)
+    wait = chat_buckets.take(client_key)
+    if wait:
+        _rejected.inc(gate="chat", reason="rate_limited")
+        raise AdmissionRejected(429, "Too many chat requests, please slow down", _retry_after(wait))
+    await chat_gate.acquire()
+    return Ticket(chat_gate)
+
+
+def llm_slot():
+    """Async context manager holding one of the LLM_MAX_CONCURRENT call slots."""
+    return llm_gate.slot() if ADMISSION_CONTROL else contextlib.nullcontext()
+
+
+def snapshot() -> dict:
+    return {"chat": chat_gate.snapshot(), "llm": llm_gate.snapshot()}
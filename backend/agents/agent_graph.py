@@ -5,26 +5,31 @@ Features:
   • Parallel execution of ProductSearch / CartManager / OrderTracker
   • Structured action events returned to the UI (cart_updated, order_placed, etc.)
   • Robust tool-call loop with retry and error handling
+  • Async tool-call loop running a turn's independent tool calls concurrently
+  • LLM clients, tool bindings and the graph are built lazily (agents.registry)
+  • Spans around nodes, tool-loop iterations, tools and LLM calls (agents.tracing)
+  • Hedged LLM calls with deadlines and per-provider circuit breakers (agents.llm_router)
+  • Process-wide cap on concurrent LLM calls (admission.llm_slot)
 """
 
+import asyncio
+import contextvars
 import operator
+import os
+import time
 from typing import TypedDict, Annotated, List, Literal
 
-from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain_groq import ChatGroq
 from langchain_core.messages import (
-    BaseMessage, HumanMessage, AIMessage, ToolMessage, SystemMessage
+    BaseMessage, HumanMessage, AIMessage, AIMessageChunk, ToolMessage, SystemMessage
 )
-from langgraph.graph import StateGraph, END
 from langchain_core.tools import tool
 from pydantic import BaseModel, Field
 
-try:
-    from langgraph.types import Send
-except ImportError:
-    from langgraph.constants import Send
-
+import admission
 import agents.tools as agent_tools
+import chat_sessions
+import query_stats
+from agents import fake_llm, fast_router, llm_router, registry, tracing
 
 
 # ─────────────────────────────────────────────────────────────────────────────
@@ -32,22 +37,24 @@ import agents.tools as agent_tools
 # ─────────────────────────────────────────────────────────────────────────────
 
 @tool
-def search_products(query: str) -> str:
+def search_products(query: str, offset: int = 0) -> str:
     """
     Search for products by name, keyword, or category.
     Use a short keyword — e.g. 'headphones', 'running shoes', 'electronics'.
+    Long result lists are cut short; pass the offset from the "more products" hint to continue.
     """
-    return agent_tools.get_product_list(search=query)
+    return agent_tools.get_product_list(search=query, offset=offset)
 
 
 @tool
-def browse_catalog(category: str = "") -> str:
+def browse_catalog(category: str = "", offset: int = 0) -> str:
     """
     Browse the full product catalog, optionally filtered by category.
     Categories: Electronics, Clothing, Footwear, Accessories, Home, Sports.
     Pass empty string to get all products.
+    Long result lists are cut short; pass the offset from the "more products" hint to continue.
     """
-    return agent_tools.get_product_list(category=category if category else None)
+    return agent_tools.get_product_list(category=category if category else None, offset=offset)
 
 
 @tool
@@ -56,10 +63,28 @@ def add_to_cart(product_id: int, quantity: int = 1, user_id: int = 1) -> str:
     return agent_tools.add_item_to_cart(user_id=user_id, product_id=product_id, quantity=quantity)
 
 
+class CartLine(BaseModel):
+    product_id: int = Field(description="Product ID from the catalog")
+    quantity: int = Field(default=1, description="Units to add")
+
+
 @tool
-def view_cart(user_id: int = 1) -> str:
-    """View all items currently in the user's shopping cart with totals."""
-    return agent_tools.get_cart_contents(user_id=user_id)
+def add_items_to_cart(items: List[CartLine], user_id: int = 1) -> str:
+    """
+    Add several products to the shopping cart in ONE call.
+    Pass every product the user asked for, e.g. items=[{"product_id": 3, "quantity": 2}, {"product_id": 7}].
+    Either all items are added or none (if one is out of stock).
+    """
+    return agent_tools.add_items_to_cart(user_id=user_id, items=items)
+
+
+@tool
+def view_cart(offset: int = 0, user_id: int = 1) -> str:
+    """
+    View the items in the user's shopping cart with the cart total.
+    Long carts are cut short; pass the offset from the "more item(s)" hint to list the rest.
+    """
+    return agent_tools.get_cart_contents(user_id=user_id, offset=offset)
 
 
 @tool
@@ -69,23 +94,53 @@ def checkout(shipping_address: str, user_id: int = 1) -> str:
 
 
 @tool
-def get_order_status(user_id: int = 1) -> str:
-    """Retrieve the complete order history and delivery status for this user."""
-    return agent_tools.get_order_status(user_id=user_id)
+def get_order_status(offset: int = 0, user_id: int = 1) -> str:
+    """
+    Retrieve the order history and delivery status for this user, newest first.
+    Only the most recent orders fit in one result; pass the offset from the
+    "more order(s)" hint to list older ones.
+    """
+    return agent_tools.get_order_status(user_id=user_id, offset=offset)
+
+
+# Native async implementations, used by `ainvoke` in the async agent runner so
+# tool DB access goes through AsyncSessionLocal instead of a worker thread.
+search_products.coroutine  = lambda query, offset=0: agent_tools.aget_product_list(search=query, offset=offset)
+browse_catalog.coroutine   = lambda category="", offset=0: agent_tools.aget_product_list(
+    category=category or None, offset=offset
+)
+add_to_cart.coroutine      = lambda product_id, quantity=1, user_id=1: agent_tools.aadd_item_to_cart(
+    user_id=user_id, product_id=product_id, quantity=quantity
+)
+add_items_to_cart.coroutine = lambda items, user_id=1: agent_tools.aadd_items_to_cart(
+    user_id=user_id, items=items
+)
+view_cart.coroutine        = lambda offset=0, user_id=1: agent_tools.aget_cart_contents(user_id=user_id, offset=offset)
+checkout.coroutine         = lambda shipping_address, user_id=1: agent_tools.aperform_checkout(
+    user_id=user_id, shipping_address=shipping_address
+)
+get_order_status.coroutine = lambda offset=0, user_id=1: agent_tools.aget_order_status(user_id=user_id, offset=offset)
 
 
 # Tool registries — each specialist agent owns its own set
 _search_tools = [search_products, browse_catalog]
-_cart_tools   = [add_to_cart, view_cart, checkout]
+_cart_tools   = [add_to_cart, add_items_to_cart, view_cart, checkout]
 _order_tools  = [get_order_status]
 
 # Tools that must have user_id injected at runtime (never trust LLM-provided user_id)
-_USER_SCOPED_TOOLS = {"add_to_cart", "view_cart", "checkout", "get_order_status"}
+_USER_SCOPED_TOOLS = {"add_to_cart", "add_items_to_cart", "view_cart", "checkout", "get_order_status"}
 
 # Tools that trigger UI refresh actions
-_CART_MUTATING_TOOLS  = {"add_to_cart"}
+_CART_MUTATING_TOOLS  = {"add_to_cart", "add_items_to_cart"}
 _ORDER_MUTATING_TOOLS = {"checkout"}
 
+# Mutating tools are never run concurrently with other calls from the same turn
+# (e.g. add_to_cart must land before a checkout the model emitted after it)
+_MUTATING_TOOLS = _CART_MUTATING_TOOLS | _ORDER_MUTATING_TOOLS
+
+# Max tool calls in flight per /chat request, across all parallel specialists
+AGENT_TOOL_CONCURRENCY = int(os.getenv("AGENT_TOOL_CONCURRENCY", "4"))
+
 
 # ─────────────────────────────────────────────────────────────────────────────
 # Shared State
@@ -101,43 +156,60 @@ class AgentState(TypedDict):
     actions:       Annotated[List[dict], operator.add]         # UI action events
     intents:       List[str]
     sub_queries:   List[str]
+    route_path:    str                                         # "fast" | "llm" | "default"
 
 
 # ─────────────────────────────────────────────────────────────────────────────
 # LLM
 # ─────────────────────────────────────────────────────────────────────────────
 
-# Primary Model: Gemini
-gemini_llm = ChatGoogleGenerativeAI(model="gemini-2.5-flash-lite", temperature=0)
+# Provider SDKs are imported on first use: they dominate the module's import time.
+
+# LLM_BACKEND=fake swaps both providers for the offline stand-in (agents.fake_llm).
 
-# Fallback Model: Groq (Llama 3.3 70B)
-groq_llm = ChatGroq(model="llama-3.3-70b-versatile", temperature=0)
+def _gemini_llm():
+    # Primary Model: Gemini
+    if fake_llm.LLM_BACKEND == "fake":
+        return fake_llm.chat_model("gemini")
+    from langchain_google_genai import ChatGoogleGenerativeAI
+    return ChatGoogleGenerativeAI(
+        model="gemini-2.5-flash-lite", temperature=0, callbacks=fake_llm.recorder_callbacks() or None
+    )
 
-# Combined LLM with Fallback Logic
-llm = gemini_llm.with_fallbacks([groq_llm])
+
+def _groq_llm():
+    # Fallback Model: Groq (Llama 3.3 70B)
+    if fake_llm.LLM_BACKEND == "fake":
+        return fake_llm.chat_model("groq")
+    from langchain_groq import ChatGroq
+    return ChatGroq(
+        model="llama-3.3-70b-versatile", temperature=0, callbacks=fake_llm.recorder_callbacks() or None
+    )
+
+
+def get_llm():
+    """Gemini first, Groq hedged in behind it (agents.llm_router), built once per process."""
+    return registry.get("llm", lambda: llm_router.hedged([
+        ("gemini", registry.get("gemini", _gemini_llm)),
+        ("groq", registry.get("groq", _groq_llm)),
+    ]))
+
+
+def _llm_with_tools(tools: list):
+    """`llm.bind_tools(tools)`, cached per tool set instead of rebuilt on every agent run."""
+    key = ("bind_tools",) + tuple(t.name for t in tools)
+    return registry.get(key, lambda: get_llm().bind_tools(tools))
 
 
 # ─────────────────────────────────────────────────────────────────────────────
-# Self-contained agent runner (parallel-safe, synchronous)
+# Self-contained async agent runner (parallel-safe: one tool loop per specialist)
 # ─────────────────────────────────────────────────────────────────────────────
 
-def _run_agent(
-    tools: list,
-    system_prompt: str,
-    query: str,
-    user_id: int,
-    history_str: str = "",
-) -> tuple[str, list[dict]]:
-    """
-    Run a single specialist agent with its own tool-calling loop.
-    Returns (response_text, actions_list).
-    Safe to call from parallel graph nodes — no shared mutable state.
-    """
-    llm_with_tools = llm.bind_tools(tools)
-    tool_map = {t.name: t for t in tools}
-    actions: list[dict] = []
+_FAILED_REPLY = "I wasn't able to complete the request after several attempts. Please try rephrasing."
 
-    # Build the message list: system + history context + current query
+
+def _agent_messages(system_prompt: str, query: str, history_str: str) -> List:
+    """Build the message list: system + history context + current query."""
     messages: List = [SystemMessage(content=system_prompt)]
 
     if history_str:
@@ -146,49 +218,109 @@ def _run_agent(
         ))
 
     messages.append(HumanMessage(content=query))
+    return messages
+
+
+def _tool_args(tc: dict, user_id: int) -> dict:
+    args = dict(tc["args"])
+    # Always inject authenticated user_id for user-scoped tools
+    if tc["name"] in _USER_SCOPED_TOOLS:
+        args["user_id"] = user_id
+    return args
+
+
+def _tool_actions(tool_name: str, tool_result_str: str) -> list[dict]:
+    """Action events for the UI to react to."""
+    if tool_name in _CART_MUTATING_TOOLS and "✓" in tool_result_str:
+        return [{
+            "type": "cart_updated",
+            "message": tool_result_str,
+            "icon": "🛒",
+        }]
+    if tool_name in _ORDER_MUTATING_TOOLS and "✓" in tool_result_str:
+        return [{
+            "type": "order_placed",
+            "message": tool_result_str,
+            "icon": "📦",
+        }]
+    return []
+
+
+# One limiter per /chat request, shared by every specialist it fans out to.
+# Set by run_agent / stream_agent; graph node tasks inherit it via contextvars.
+_request_tool_limiter: contextvars.ContextVar[asyncio.Semaphore | None] = contextvars.ContextVar(
+    "request_tool_limiter", default=None
+)
 
-    for iteration in range(6):  # max tool-calling iterations
-        response = llm_with_tools.invoke(messages)
-        messages.append(response)
-
-        # No tool calls → agent is done
-        if not getattr(response, "tool_calls", None):
-            return response.content or "I couldn't find relevant information.", actions
 
-        # Execute every tool call and feed results back
-        for tc in response.tool_calls:
-            args = dict(tc["args"])
+def _tool_batches(tool_calls: list[dict]) -> list[list[dict]]:
+    """
+    Split one turn's tool calls into batches that may run concurrently.
+    Read-only calls are grouped; each mutating call is a batch of its own,
+    so side effects keep the order the model emitted them in.
+    """
+    batches: list[list[dict]] = []
+    for tc in tool_calls:
+        if tc["name"] in _MUTATING_TOOLS or not batches or batches[-1][-1]["name"] in _MUTATING_TOOLS:
+            batches.append([tc])
+        else:
+            batches[-1].append(tc)
+    return batches
 
-            # Always inject authenticated user_id for user-scoped tools
-            if tc["name"] in _USER_SCOPED_TOOLS:
-                args["user_id"] = user_id
 
-            try:
-                tool_result = tool_map[tc["name"]].invoke(args)
-            except Exception as exc:
-                tool_result = f"Tool error: {exc}"
+async def _arun_agent(
+    tools: list,
+    system_prompt: str,
+    query: str,
+    user_id: int,
+    history_str: str = "",
+) -> tuple[str, list[dict]]:
+    """
+    Run a single specialist agent with its own tool-calling loop and return
+    (response_text, actions_list). Awaits the LLM with `ainvoke` and runs the
+    independent tool calls of a turn concurrently (bounded by the per-request
+    limiter). ToolMessages are appended in the order the model issued the
+    calls, regardless of completion order.
+    """
+    llm_with_tools = _llm_with_tools(tools)
+    tool_map = {t.name: t for t in tools}
+    actions: list[dict] = []
+    messages = _agent_messages(system_prompt, query, history_str)
+    limiter = _request_tool_limiter.get() or asyncio.Semaphore(AGENT_TOOL_CONCURRENCY)
+
+    async def call_tool(tc: dict) -> str:
+        async with limiter:
+            with tracing.span(f"tool {tc['name']}", "tool", tool=tc["name"]) as tool_span, \
+                    query_stats.track(tc["name"], kind="tool", budget=query_stats.TOOL_QUERY_BUDGET) as queries:
+                try:
+                    return str(await tool_map[tc["name"]].ainvoke(_tool_args(tc, user_id)))
+                except query_stats.QueryBudgetExceeded:
+                    raise
+                except Exception as exc:
+                    tool_span.fail(exc)
+                    return f"Tool error: {exc}"
+                finally:
+                    tool_span.set(db_queries=queries.count, db_time_ms=round(queries.seconds * 1000, 3))
 
-            tool_result_str = str(tool_result)
+    for iteration in range(6):  # max tool-calling iterations
+        with tracing.span("agent.iteration", "iteration", iteration=iteration):
+            async with admission.llm_slot():
+                with tracing.span("llm", "llm"):
+                    response = await llm_with_tools.ainvoke(messages)
+            messages.append(response)
 
-            messages.append(
-                ToolMessage(content=tool_result_str, tool_call_id=tc["id"])
-            )
+            if not getattr(response, "tool_calls", None):
+                return response.content or "I couldn't find relevant information.", actions
 
-            # Emit action events for UI to react to
-            if tc["name"] in _CART_MUTATING_TOOLS and "✓" in tool_result_str:
-                actions.append({
-                    "type": "cart_updated",
-                    "message": tool_result_str,
-                    "icon": "🛒",
-                })
-            elif tc["name"] in _ORDER_MUTATING_TOOLS and "✓" in tool_result_str:
-                actions.append({
-                    "type": "order_placed",
-                    "message": tool_result_str,
-                    "icon": "📦",
-                })
+            for batch in _tool_batches(response.tool_calls):
+                results = await asyncio.gather(*(call_tool(tc) for tc in batch))
+                for tc, tool_result_str in zip(batch, results):
+                    messages.append(
+                        ToolMessage(content=tool_result_str, tool_call_id=tc["id"])
+                    )
+                    actions.extend(_tool_actions(tc["name"], tool_result_str))
 
-    return "I wasn't able to complete the request after several attempts. Please try rephrasing.", actions
+    return _FAILED_REPLY, actions
 
 
 # ─────────────────────────────────────────────────────────────────────────────
@@ -224,32 +356,56 @@ class Router(BaseModel):
     )
 
 
-# We need structured output to also have fallback, so we apply it to the base models first
-gemini_router = gemini_llm.with_structured_output(Router)
-groq_router   = groq_llm.with_structured_output(Router)
+def _build_router_chain():
+    # Structured output is applied to each provider inside the hedged LLM, so both can answer
+    return get_llm().with_structured_output(Router)
 
-_router_chain = gemini_router.with_fallbacks([groq_router])
 
+def get_router_chain():
+    return registry.get("router", _build_router_chain)
 
-def supervisor_node(state: AgentState) -> dict:
-    system_msg = SystemMessage(content=_SUPERVISOR_SYSTEM)
-    routing_q  = HumanMessage(
-        content="Identify which agents are needed and the focused sub-query for each."
-    )
-    try:
-        result: Router = _router_chain.invoke(
-            [system_msg] + list(state["messages"]) + [routing_q]
-        )
-        intents     = list(result.intents)     or ["ProductSearch"]
-        sub_queries = list(result.sub_queries) or [state["messages"][-1].content]
-    except Exception:
-        intents     = ["ProductSearch"]
-        sub_queries = [state["messages"][-1].content]
 
-    return {"intents": intents, "sub_queries": sub_queries}
+async def supervisor_node(state: AgentState) -> dict:
+    started = time.perf_counter()
+
+    # High-confidence keyword match → skip the LLM round trip entirely
+    fast = None
+    if fast_router.FAST_ROUTER_ENABLED:
+        fast = fast_router.classify(state["messages"][-1].content)
+
+    if fast:
+        intents, sub_queries = fast
+        path = "fast"
+    else:
+        system_msg = SystemMessage(content=_SUPERVISOR_SYSTEM)
+        routing_q  = HumanMessage(
+            content="Identify which agents are needed and the focused sub-query for each."
+        )
+        try:
+            async with admission.llm_slot():
+                with tracing.span("llm Router", "llm"):
+                    result: Router = await get_router_chain().ainvoke(
+                        [system_msg] + list(state["messages"]) + [routing_q]
+                    )
+            intents     = list(result.intents)     or ["ProductSearch"]
+            sub_queries = list(result.sub_queries) or [state["messages"][-1].content]
+            path = "llm"
+        except Exception:
+            intents     = ["ProductSearch"]
+            sub_queries = [state["messages"][-1].content]
+            path = "default"
+
+    fast_router.route_stats.record(path, time.perf_counter() - started)
+    return {"intents": intents, "sub_queries": sub_queries, "route_path": path}
 
 
 def route_to_agents(state: AgentState) -> list:
+    # Imported here with the rest of langgraph, which is only loaded once the graph is built
+    try:
+        from langgraph.types import Send
+    except ImportError:
+        from langgraph.constants import Send
+
     sends = [
         Send(intent, {**state, "current_query": sub_query})
         for intent, sub_query in zip(
@@ -265,9 +421,9 @@ def route_to_agents(state: AgentState) -> list:
 # Worker Nodes (each runs its own tool loop — parallel-safe)
 # ─────────────────────────────────────────────────────────────────────────────
 
-def product_search_node(state: AgentState) -> dict:
+async def product_search_node(state: AgentState) -> dict:
     query = state.get("current_query") or state["messages"][-1].content
-    result, actions = _run_agent(
+    result, actions = await _arun_agent(
         tools=_search_tools,
         system_prompt=(
             "You are the Product Search Agent for ShopEasy e-commerce platform.\n"
@@ -292,9 +448,9 @@ def product_search_node(state: AgentState) -> dict:
     }
 
 
-def cart_manager_node(state: AgentState) -> dict:
+async def cart_manager_node(state: AgentState) -> dict:
     query = state.get("current_query") or state["messages"][-1].content
-    result, actions = _run_agent(
+    result, actions = await _arun_agent(
         tools=_cart_tools,
         system_prompt=(
             f"You are the Cart Manager Agent for ShopEasy, serving User #{state['user_id']}.\n"
@@ -302,6 +458,8 @@ def cart_manager_node(state: AgentState) -> dict:
             "STRICT RULES:\n"
             "1. To VIEW the cart → call view_cart(). Summarize the contents clearly.\n"
             "2. To ADD an item → call add_to_cart(product_id=<ID>, quantity=<N>).\n"
+            "   To ADD two or more items → call add_items_to_cart ONCE with all of them,\n"
+            "   items=[{\"product_id\": <ID>, \"quantity\": <N>}, ...] — never one add_to_cart per item.\n"
             "   If the user says 'add headphones' and mentioned ID in history, use that ID.\n"
             "3. To CHECKOUT/ORDER → call checkout(shipping_address='<address>').\n"
             "   If no address given, ask the user for one.\n"
@@ -321,9 +479,9 @@ def cart_manager_node(state: AgentState) -> dict:
     }
 
 
-def order_tracker_node(state: AgentState) -> dict:
+async def order_tracker_node(state: AgentState) -> dict:
     query = state.get("current_query") or state["messages"][-1].content
-    result, actions = _run_agent(
+    result, actions = await _arun_agent(
         tools=_order_tools,
         system_prompt=(
             f"You are the Order Tracker Agent for ShopEasy, serving User #{state['user_id']}.\n"
@@ -332,7 +490,9 @@ def order_tracker_node(state: AgentState) -> dict:
             "1. ALWAYS call get_order_status first — never answer from memory.\n"
             "2. Present each order: Order ID, status, total amount, items, date, shipping address.\n"
             "3. If no orders exist, tell the user clearly.\n"
-            "4. Respond in a friendly, reassuring tone."
+            "4. The result lists the most recent orders first. Only call get_order_status(offset=<N>)\n"
+            "   again if the user asks about older orders than those shown.\n"
+            "5. Respond in a friendly, reassuring tone."
         ),
         query=query,
         user_id=state["user_id"],
@@ -367,28 +527,59 @@ def result_merger_node(state: AgentState) -> dict:
 # Graph Construction
 # ─────────────────────────────────────────────────────────────────────────────
 
-workflow = StateGraph(AgentState)
+def _build_graph():
+    from langgraph.graph import StateGraph, END
 
-workflow.add_node("Supervisor",    supervisor_node)
-workflow.add_node("ProductSearch", product_search_node)
-workflow.add_node("CartManager",   cart_manager_node)
-workflow.add_node("OrderTracker",  order_tracker_node)
-workflow.add_node("ResultMerger",  result_merger_node)
+    workflow = StateGraph(AgentState)
 
-workflow.set_entry_point("Supervisor")
+    workflow.add_node("Supervisor",    tracing.traced_node("Supervisor",    supervisor_node))
+    workflow.add_node("ProductSearch", tracing.traced_node("ProductSearch", product_search_node))
+    workflow.add_node("CartManager",   tracing.traced_node("CartManager",   cart_manager_node))
+    workflow.add_node("OrderTracker",  tracing.traced_node("OrderTracker",  order_tracker_node))
+    workflow.add_node("ResultMerger",  tracing.traced_node("ResultMerger",  result_merger_node))
 
-workflow.add_conditional_edges(
-    "Supervisor",
-    route_to_agents,
-    ["ProductSearch", "CartManager", "OrderTracker"],
-)
+    workflow.set_entry_point("Supervisor")
+
+    workflow.add_conditional_edges(
+        "Supervisor",
+        route_to_agents,
+        ["ProductSearch", "CartManager", "OrderTracker"],
+    )
+
+    workflow.add_edge("ProductSearch", "ResultMerger")
+    workflow.add_edge("CartManager",   "ResultMerger")
+    workflow.add_edge("OrderTracker",  "ResultMerger")
+    workflow.add_edge("ResultMerger",  END)
+
+    return workflow.compile()
+
+
+def get_graph():
+    """The compiled multi-agent graph, built on first use."""
+    return registry.get("graph", _build_graph)
+
+
+def warm_up():
+    """Build the graph, the LLM clients and every specialist's tool binding now."""
+    get_graph()
+    get_router_chain()
+    for tools in (_search_tools, _cart_tools, _order_tools):
+        _llm_with_tools(tools)
 
-workflow.add_edge("ProductSearch", "ResultMerger")
-workflow.add_edge("CartManager",   "ResultMerger")
-workflow.add_edge("OrderTracker",  "ResultMerger")
-workflow.add_edge("ResultMerger",  END)
 
-graph = workflow.compile()
+# Module attributes kept for callers that used the eager globals
+_LAZY_ATTRS = {
+    "graph":      get_graph,
+    "llm":        get_llm,
+    "gemini_llm": lambda: registry.get("gemini", _gemini_llm),
+    "groq_llm":   lambda: registry.get("groq", _groq_llm),
+}
+
+
+def __getattr__(name: str):
+    if name in _LAZY_ATTRS:
+        return _LAZY_ATTRS[name]()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 # ─────────────────────────────────────────────────────────────────────────────
@@ -399,17 +590,14 @@ def _build_history_str(history: list[dict]) -> str:
     """Convert list of {role, content} dicts into a readable string for agents."""
     if not history:
         return ""
-    lines = []
-    for msg in history[-10:]:  # last 10 turns max (keep context window reasonable)
-        role = "Customer" if msg.get("role") == "user" else "Assistant"
-        lines.append(f"{role}: {msg.get('content', '')}")
-    return "\n".join(lines)
+    # last HISTORY_WINDOW messages max (keep context window reasonable)
+    return "\n".join(chat_sessions.history_line(msg) for msg in history[-chat_sessions.HISTORY_WINDOW:])
 
 
 def _build_langchain_history(history: list[dict]) -> list[BaseMessage]:
     """Convert conversation history into LangChain message objects."""
     msgs = []
-    for msg in history[-10:]:
+    for msg in history[-chat_sessions.HISTORY_WINDOW:]:
         role    = msg.get("role", "user")
         content = msg.get("content", "")
         if role == "user":
@@ -419,19 +607,10 @@ def _build_langchain_history(history: list[dict]) -> list[BaseMessage]:
     return msgs
 
 
-async def run_agent(
-    query: str,
-    user_id: int,
-    history: list[dict] | None = None,
-) -> tuple[str, list[str], list[dict]]:
-    """
-    Run the full multi-agent graph.
-    Returns: (response_text, agents_used_list, actions_list)
-
-    history: list of {"role": "user"|"assistant", "content": "..."} dicts
-    """
+def _initial_state(query: str, user_id: int, history: list[dict] | None, history_str: str | None = None) -> AgentState:
     history = history or []
-    history_str = _build_history_str(history)
+    if history_str is None:
+        history_str = _build_history_str(history)
     lc_history  = _build_langchain_history(history)
 
     # The messages list = history + current user query
@@ -447,9 +626,52 @@ async def run_agent(
         "actions":       [],
         "intents":       [],
         "sub_queries":   [],
+        "route_path":    "",
     }
+    return inputs
+
+
+_FALLBACK_REPLY = "How else can I help you with your shopping today?"
+
+# Callback handlers attached to every graph run (benchmarks, tracing)
+_graph_callbacks: list = [tracing.llm_attempt_tracer] if tracing.TRACING_ENABLED else []
 
-    result = await graph.ainvoke(inputs)
+
+def add_graph_callback(handler):
+    """Attach a LangChain callback handler to every subsequent graph run."""
+    if handler not in _graph_callbacks:
+        _graph_callbacks.append(handler)
+
+
+def remove_graph_callback(handler):
+    if handler in _graph_callbacks:
+        _graph_callbacks.remove(handler)
+
+
+def _run_config() -> dict:
+    return {"callbacks": list(_graph_callbacks)} if _graph_callbacks else {}
+
+
+async def run_agent(
+    query: str,
+    user_id: int,
+    history: list[dict] | None = None,
+    history_str: str | None = None,
+) -> tuple[str, list[str], list[dict], str]:
+    """
+    Run the full multi-agent graph.
+    Returns: (response_text, agents_used_list, actions_list, route_path)
+    route_path is "fast" (keyword router), "llm" (Supervisor LLM) or "default".
+
+    history: list of {"role": "user"|"assistant", "content": "..."} dicts
+    history_str: the already formatted history (e.g. ChatSession.history_str), if the caller keeps one
+    """
+    inputs = _initial_state(query, user_id, history, history_str)
+    _request_tool_limiter.set(asyncio.Semaphore(AGENT_TOOL_CONCURRENCY))
+    with tracing.span("chat", "request") as request_span:
+        result = await get_graph().ainvoke(inputs, config=_run_config())
+        route_path = result.get("route_path", "")
+        request_span.set(route=route_path)
 
     agents_used = result.get("agents_used", [])
     actions     = result.get("actions", [])
@@ -457,6 +679,87 @@ async def run_agent(
     # Return the last AIMessage produced by ResultMerger
     for msg in reversed(result.get("messages", [])):
         if isinstance(msg, AIMessage) and msg.content:
-            return msg.content, agents_used, actions
+            return msg.content, agents_used, actions, route_path
+
+    return _FALLBACK_REPLY, agents_used, actions, route_path
+
+
+_WORKER_NODES = {"ProductSearch", "CartManager", "OrderTracker"}
+
+
+def _chunk_text(chunk: AIMessageChunk) -> str:
+    """Plain text of a streamed chunk (Gemini may send a list of content parts)."""
+    if isinstance(chunk.content, str):
+        return chunk.content
+    return "".join(
+        part.get("text", "") if isinstance(part, dict) else str(part)
+        for part in chunk.content
+    )
 
-    return "How else can I help you with your shopping today?", agents_used, actions
+
+async def stream_agent(
+    query: str,
+    user_id: int,
+    history: list[dict] | None = None,
+    history_str: str | None = None,
+):
+    """
+    Run the graph and yield events as they happen instead of waiting for the
+    slowest specialist:
+
+      {"event": "routing",      "intents": [...], "sub_queries": [...], "route": "fast"}
+      {"event": "token",        "agent": "CartManager", "content": "..."}
+      {"event": "agent_result", "agent": "ProductSearch", "result": "..."}
+      {"event": "action",       "agent": "CartManager", "action": {"type": "cart_updated", ...}}
+      {"event": "done",         "response": "...", "agents_used": [...], "actions": [...], "route": "..."}
+    """
+    inputs = _initial_state(query, user_id, history, history_str)
+    _request_tool_limiter.set(asyncio.Semaphore(AGENT_TOOL_CONCURRENCY))
+    agents_used: list[str]  = []
+    actions:     list[dict] = []
+    route_path = ""
+    final = None
+
+    with tracing.span("chat", "request") as request_span:
+        async for mode, chunk in get_graph().astream(inputs, config=_run_config(), stream_mode=["updates", "messages"]):
+            if mode == "messages":
+                msg, metadata = chunk
+                node = metadata.get("langgraph_node")
+                # Only stream the specialists' prose — not router JSON or tool-call args
+                if node in _WORKER_NODES and isinstance(msg, AIMessageChunk) and not msg.tool_call_chunks:
+                    text = _chunk_text(msg)
+                    if text:
+                        yield {"event": "token", "agent": node, "content": text}
+                continue
+
+            for node, update in chunk.items():
+                if not update:
+                    continue
+                if node == "Supervisor":
+                    route_path = update.get("route_path", "")
+                    yield {
+                        "event":       "routing",
+                        "intents":     update.get("intents", []),
+                        "sub_queries": update.get("sub_queries", []),
+                        "route":       route_path,
+                    }
+                elif node in _WORKER_NODES:
+                    agents_used.extend(update.get("agents_used", []))
+                    for result in update.get("agent_results", []):
+                        yield {"event": "agent_result", "agent": node, "result": result}
+                    for action in update.get("actions", []):
+                        actions.append(action)
+                        yield {"event": "action", "agent": node, "action": action}
+                elif node == "ResultMerger":
+                    for msg in update.get("messages", []):
+                        if isinstance(msg, AIMessage) and msg.content:
+                            final = msg.content
+        request_span.set(route=route_path)
+
+    yield {
+        "event":       "done",
+        "response":    final or _FALLBACK_REPLY,
+        "agents_used": agents_used,
+        "actions":     actions,
+        "route":       route_path,
+    }
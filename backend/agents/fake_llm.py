@@ -0,0 +1,315 @@
+"""
+fake_llm.py — Offline stand-in for the Gemini / Groq chat models
+
+Selected with LLM_BACKEND (read by agent_graph):
+
+  • live   (default) — the real providers
+  • fake   — FakeChatModel: replays responses from the cassette at
+             FAKE_LLM_CASSETTE when one matches, otherwise follows a scripted
+             policy (route with the keyword router, call the specialist's
+             obvious tool once, then answer from the tool output)
+  • record — the real providers, with every chat-model response appended to
+             FAKE_LLM_CASSETTE for later replay
+
+FakeChatModel supports `bind_tools` and `with_structured_output`, so the
+graph, the tool loops and the Supervisor run unchanged; only the provider
+round trip is replaced by a sleep of FAKE_LLM_LATENCY_MS ("120" or a uniform
+range such as "80-200"). Nothing touches the network. Each provider's stand-in
+can be given its own latency, tail latency and error rate (see `chat_model`)
+to exercise hedging and the circuit breaker.
+
+Cassette entries are JSON lines keyed by a fingerprint of the bound tool
+names and the message contents, so a replay hits only when the graph asks
+the same question it asked while recording.
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import random
+import re
+import threading
+import time
+import uuid
+from typing import Any
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, ToolMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.runnables import Runnable
+from langchain_core.utils.function_calling import convert_to_openai_tool
+
+from agents import fast_router
+
+LLM_BACKEND = os.getenv("LLM_BACKEND", "live").lower()
+CASSETTE_PATH = os.getenv("FAKE_LLM_CASSETTE", "")
+LATENCY_MS = os.getenv("FAKE_LLM_LATENCY_MS", "0")
+
+_STOPWORDS = {
+    "a", "an", "the", "me", "my", "i", "you", "your", "any", "some", "for", "of", "to", "in", "on",
+    "show", "find", "search", "looking", "look", "list", "what", "do", "have", "sell", "please",
+    "can", "could", "want", "need", "get", "buy", "browse", "products", "product", "items", "is", "are",
+}
+
+
+def _parse_latency(spec: str) -> tuple[float, float]:
+    low, _, high = (spec or "0").partition("-")
+    low_s = float(low or 0) / 1000
+    return low_s, (float(high) / 1000 if high else low_s)
+
+
+def _tool_names(tools: list[dict] | None) -> list[str]:
+    return [t["function"]["name"] for t in tools or ()]
+
+
+def _content(message: BaseMessage) -> str:
+    if isinstance(message.content, str):
+        return message.content
+    return "".join(p.get("text", "") if isinstance(p, dict) else str(p) for p in message.content)
+
+
+def _declared_names(tools) -> list[str]:
+    """Tool names from provider invocation params (OpenAI-style or Gemini function_declarations)."""
+    names = []
+    for tool in tools or ():
+        if not isinstance(tool, dict):
+            name = getattr(tool, "name", None)
+            names.extend([name] if name else [])
+        elif "function_declarations" in tool:
+            names.extend(_declared_names(tool["function_declarations"]))
+        elif "function" in tool:
+            names.append(tool["function"].get("name", ""))
+        elif "name" in tool:
+            names.append(tool["name"])
+    return names
+
+
+def fingerprint(tool_names: list[str], messages: list[BaseMessage]) -> str:
+    payload = json.dumps(
+        [sorted(tool_names), [(m.type, _content(m)) for m in messages]],
+        ensure_ascii=False, separators=(",", ":"),
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def _message_to_dict(message: AIMessage) -> dict:
+    return {
+        "content": _content(message),
+        "tool_calls": [{"name": tc["name"], "args": tc["args"]} for tc in message.tool_calls or ()],
+    }
+
+
+def _message_from_dict(data: dict) -> AIMessage:
+    return AIMessage(
+        content=data.get("content", ""),
+        tool_calls=[
+            {"name": tc["name"], "args": tc.get("args", {}), "id": f"call_{uuid.uuid4().hex[:12]}", "type": "tool_call"}
+            for tc in data.get("tool_calls", ())
+        ],
+    )
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Cassette (record / replay)
+# ─────────────────────────────────────────────────────────────────────────────
+
+class Cassette:
+    """Append-only JSONL of {key, message}; the last recording of a key wins."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._entries: dict[str, dict] = {}
+        if path and os.path.exists(path):
+            with open(path, encoding="utf-8") as fh:
+                for line in fh:
+                    if line.strip():
+                        entry = json.loads(line)
+                        self._entries[entry["key"]] = entry["message"]
+
+    def get(self, key: str) -> dict | None:
+        return self._entries.get(key)
+
+    def record(self, key: str, message: dict):
+        with self._lock:
+            self._entries[key] = message
+            with open(self.path, "a", encoding="utf-8") as fh:
+                fh.write(json.dumps({"key": key, "message": message}, ensure_ascii=False) + "\n")
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class CassetteRecorder(BaseCallbackHandler):
+    """Callback for live chat models that appends every response to a cassette."""
+
+    def __init__(self, cassette: Cassette):
+        self.cassette = cassette
+        self._pending: dict[uuid.UUID, str] = {}
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, invocation_params=None, **kwargs):
+        names = _declared_names((invocation_params or {}).get("tools"))
+        self._pending[run_id] = fingerprint(names, messages[0])
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        key = self._pending.pop(run_id, None)
+        if key is None or not response.generations or not response.generations[0]:
+            return
+        message = getattr(response.generations[0][0], "message", None)
+        if isinstance(message, AIMessage):
+            self.cassette.record(key, _message_to_dict(message))
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self._pending.pop(run_id, None)
+
+
+_cassette: Cassette | None = None
+_cassette_lock = threading.Lock()
+
+
+def cassette() -> Cassette | None:
+    global _cassette
+    if not CASSETTE_PATH:
+        return None
+    with _cassette_lock:
+        if _cassette is None:
+            _cassette = Cassette(CASSETTE_PATH)
+        return _cassette
+
+
+def recorder_callbacks() -> list:
+    """Callbacks to attach to live models when LLM_BACKEND=record."""
+    if LLM_BACKEND != "record" or cassette() is None:
+        return []
+    return [CassetteRecorder(cassette())]
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Fake chat model
+# ─────────────────────────────────────────────────────────────────────────────
+
+class FakeChatModel(BaseChatModel):
+    """Deterministic chat model: cassette replay first, scripted policy second."""
+
+    provider: str = "fake"
+    latency_ms: str = LATENCY_MS
+    # Fault injection, to exercise hedging and the circuit breaker (agents.llm_router)
+    tail_rate: float = 0.0          # share of calls that take tail_latency_ms instead
+    tail_latency_ms: float = 0.0
+    error_rate: float = 0.0         # share of calls that raise after their latency
+    use_cassette: bool = True
+    replays: int = 0
+    scripted: int = 0
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-chat-model"
+
+    def _get_ls_params(self, stop=None, **kwargs):
+        # Reported as the provider in traces and metrics
+        return {**super()._get_ls_params(stop=stop, **kwargs), "ls_provider": self.provider, "ls_model_name": "fake-chat-model"}
+
+    # The return annotation lets with_fallbacks() apply bind_tools to every fallback too
+    def bind_tools(self, tools, *, tool_choice=None, **kwargs) -> Runnable:
+        return self.bind(tools=[convert_to_openai_tool(t) for t in tools], tool_choice=tool_choice, **kwargs)
+
+    def _delay(self) -> float:
+        if self.tail_rate and random.random() < self.tail_rate:
+            return self.tail_latency_ms / 1000
+        low, high = _parse_latency(self.latency_ms)
+        return random.uniform(low, high) if high > low else low
+
+    def _maybe_fail(self):
+        if self.error_rate and random.random() < self.error_rate:
+            raise RuntimeError(f"{self.provider}: injected failure")
+
+    def _respond(self, messages: list[BaseMessage], tools: list[dict] | None) -> AIMessage:
+        names = _tool_names(tools)
+        book = cassette() if self.use_cassette else None
+        if book is not None:
+            recorded = book.get(fingerprint(names, messages))
+            if recorded is not None:
+                self.replays += 1
+                return self._structured(_message_from_dict(recorded), names)
+        self.scripted += 1
+        if names == ["Router"]:
+            return self._route(messages)
+        return self._specialist(messages, names)
+
+    # Structured-output providers may answer in JSON text instead of a tool call
+    @staticmethod
+    def _structured(message: AIMessage, names: list[str]) -> AIMessage:
+        if len(names) == 1 and not message.tool_calls and message.content:
+            try:
+                args = json.loads(message.content)
+            except ValueError:
+                return message
+            return _message_from_dict({"content": "", "tool_calls": [{"name": names[0], "args": args}]})
+        return message
+
+    @staticmethod
+    def _route(messages: list[BaseMessage]) -> AIMessage:
+        humans = [m for m in messages if isinstance(m, HumanMessage)]
+        # The Supervisor appends its own instruction after the user's message
+        query = _content(humans[-2] if len(humans) > 1 else humans[-1]) if humans else ""
+        routed = fast_router.classify(query) or (["ProductSearch"], [query])
+        intents, sub_queries = routed
+        return _message_from_dict({"tool_calls": [{
+            "name": "Router", "args": {"intents": intents, "sub_queries": sub_queries},
+        }]})
+
+    @staticmethod
+    def _specialist(messages: list[BaseMessage], names: list[str]) -> AIMessage:
+        last_human = max((i for i, m in enumerate(messages) if isinstance(m, HumanMessage)), default=-1)
+        results = [_content(m) for m in messages[last_human + 1:] if isinstance(m, ToolMessage)]
+        if results or not names:
+            summary = "\n\n".join(r[:600] for r in results) or "How can I help you with your shopping today?"
+            return AIMessage(content=f"Here is what I found:\n{summary}")
+
+        query = _content(messages[last_human]) if last_human >= 0 else ""
+        if "get_order_status" in names:
+            call = {"name": "get_order_status", "args": {}}
+        elif "view_cart" in names:
+            product_id = re.search(r"\b(?:id|#|product)\s*(\d+)\b", query, re.IGNORECASE)
+            if product_id and "add_to_cart" in names:
+                call = {"name": "add_to_cart", "args": {"product_id": int(product_id.group(1)), "quantity": 1}}
+            else:
+                call = {"name": "view_cart", "args": {}}
+        else:
+            words = [w for w in re.findall(r"[a-z0-9]+", query.lower()) if w not in _STOPWORDS]
+            call = {"name": names[0], "args": {"query": " ".join(words[-2:]) or query}}
+            if names[0] != "search_products":
+                call["args"] = {}
+        return _message_from_dict({"content": "", "tool_calls": [call]})
+
+    def _generate(self, messages, stop=None, run_manager=None, tools=None, **kwargs) -> ChatResult:
+        time.sleep(self._delay())
+        self._maybe_fail()
+        return ChatResult(generations=[ChatGeneration(message=self._respond(messages, tools))])
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, tools=None, **kwargs) -> ChatResult:
+        await asyncio.sleep(self._delay())
+        self._maybe_fail()
+        return ChatResult(generations=[ChatGeneration(message=self._respond(messages, tools))])
+
+
+def chat_model(provider: str = "", **overrides: Any) -> FakeChatModel:
+    """
+    A fake model standing in for `provider` ("gemini", "groq"). Its latency and
+    faults can be set per provider: FAKE_LLM_GEMINI_LATENCY_MS, _TAIL_RATE,
+    _TAIL_MS and _ERROR_RATE (likewise for GROQ), falling back to
+    FAKE_LLM_LATENCY_MS and no faults.
+    """
+    settings: dict[str, Any] = {}
+    if provider:
+        prefix = f"FAKE_LLM_{provider.upper()}_"
+        settings["provider"] = f"fake-{provider}"
+        for env, field, cast in (
+            ("LATENCY_MS", "latency_ms", str), ("TAIL_RATE", "tail_rate", float),
+            ("TAIL_MS", "tail_latency_ms", float), ("ERROR_RATE", "error_rate", float),
+        ):
+            if os.getenv(prefix + env):
+                settings[field] = cast(os.environ[prefix + env])
+    return FakeChatModel(**{**settings, **overrides})
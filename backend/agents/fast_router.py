@@ -0,0 +1,166 @@
+"""
+fast_router.py — Deterministic keyword router for the Supervisor
+
+Applies the keyword rules from the Supervisor prompt locally. When every
+clause of the message maps unambiguously onto one specialist, the route is
+returned without an LLM call; otherwise `classify` returns None and the
+Supervisor falls back to the LLM router.
+
+`route_stats` counts how often each path was taken and how long routing
+took, so the saving can be measured.
+"""
+
+import os
+import re
+import threading
+
+FAST_ROUTER_ENABLED = os.getenv("FAST_ROUTER_ENABLED", "1").lower() not in ("0", "false", "no")
+
+# Longer messages tend to carry nuance the keyword rules cannot see.
+_MAX_CHARS   = 240
+_MAX_CLAUSES = 3
+
+_ORDER_RE = re.compile(
+    r"\b(my orders?|order status|order history|past orders|previous orders|"
+    r"deliver(y|ed)?|shipped|shipping status|"
+    r"track(ing)?\s+(my\s+|the\s+|an?\s+)?(order|package|parcel|shipment|delivery)|"
+    r"where\s+is\s+my\s+(order|package|parcel|stuff))\b",
+    re.IGNORECASE,
+)
+_CART_RE = re.compile(
+    r"\b(add|put|cart|basket|buy|purchase|checkout|check\s+out|order\s+now|"
+    r"place\s+(an\s+|my\s+|the\s+)?order)\b",
+    re.IGNORECASE,
+)
+_SEARCH_RE = re.compile(r"\b(search|browse|products?|catalog(ue)?)\b", re.IGNORECASE)
+# Weak search cues only count when the clause names something from the
+# catalog — a product or category, a price or a size — and is not about
+# something earlier in the conversation ("is it any good?" needs the LLM and
+# the history). "what is your return policy", "do you have a return policy"
+# or "show me how to reset my password" are not searches.
+_WEAK_SEARCH_RE = re.compile(
+    r"\b(show|what|list|any|find|looking\s+for|recommend|do\s+you\s+(have|sell))\b",
+    re.IGNORECASE,
+)
+_ANAPHORA_RE    = re.compile(r"\b(it|that|this|these|those|them)\b", re.IGNORECASE)
+_CATALOG_RE     = re.compile(
+    r"\b(electronics|cloth(es|ing)|footwear|accessories|sports?|books?|beauty|toys?|grocer(y|ies)|garden|"
+    r"automotive|home\s+goods|gadgets?|"
+    r"headphones?|earbuds?|watch(es)?|keyboards?|webcams?|cameras?|chargers?|speakers?|mouse|mice|"
+    r"laptops?|phones?|tablets?|shirts?|t-shirts?|jeans|jackets?|coats?|leggings|sweaters?|hoodies?|"
+    r"dress(es)?|shoes?|sneakers?|boots?|loafers?|sandals?|wallets?|sunglasses|backpacks?|bags?|"
+    r"lamps?|chairs?|desks?|candles?|mugs?|coffee|mats?|dumbbells?|bottles?|novels?|serums?|puzzles?|"
+    r"planters?|blenders?|notebooks?)\b",
+    re.IGNORECASE,
+)
+_PRICE_SIZE_RE  = re.compile(
+    r"(\$\s?\d|\b\d+\s?(dollars|bucks|usd)\b|"
+    r"\b(under|below|over|above|less\s+than|more\s+than|cheaper\s+than|between)\s+\$?\d|"
+    r"\b(prices?|priced|cheap(er|est)?|budget)\b|"
+    r"\bsizes?\b|\b(xxs|xs|xl|xxl)\b|\b\d+(\.\d+)?\s?(inch(es)?|cm|mm|ml|l|gb|tb)\b)",
+    re.IGNORECASE,
+)
+
+_SPLIT_RE = re.compile(r"(\s*(?:[,;]|\band\s+then\b|\bthen\b|\balso\b|\band\b)\s*)", re.IGNORECASE)
+
+
+def _classify_clause(clause: str, tail: str = "") -> str | None:
+    """`tail` is the text of the unrouted clauses that follow, where a weak cue may name its product."""
+    order = bool(_ORDER_RE.search(clause))
+    cart  = bool(_CART_RE.search(clause))
+    if order and cart:
+        return None  # e.g. "add it to my order" — let the LLM decide
+    if order:
+        return "OrderTracker"
+    if cart:
+        return "CartManager"
+    if _SEARCH_RE.search(clause):
+        return "ProductSearch"
+    if (_WEAK_SEARCH_RE.search(clause) and not _ANAPHORA_RE.search(clause)
+            and (_CATALOG_RE.search(f"{clause} {tail}") or _PRICE_SIZE_RE.search(f"{clause} {tail}"))):
+        return "ProductSearch"
+    return None
+
+
+def classify(message: str) -> tuple[list[str], list[str]] | None:
+    """
+    Return (intents, sub_queries) for a high-confidence message, else None.
+    Clauses that match no rule are folded into their neighbour so phrases like
+    "find black and white shoes" stay one ProductSearch sub-query.
+    """
+    text = (message or "").strip()
+    if not text or len(text) > _MAX_CHARS:
+        return None
+
+    routed: list[list] = []          # [intent, clause] pairs in message order
+    pending = ""
+    pieces = _SPLIT_RE.split(text)   # clause, delimiter, clause, delimiter, …
+    clauses = [(pieces[idx - 1] if idx else "", pieces[idx].strip()) for idx in range(0, len(pieces), 2)]
+    clauses = [(joiner, clause) for joiner, clause in clauses if clause]
+    # A weak cue may name its product in the unrouted clauses after it ("find black | white shoes")
+    unrouted = [_classify_clause(clause) is None for _, clause in clauses]
+    for pos, (joiner, clause) in enumerate(clauses):
+        tail = []
+        for later in range(pos + 1, len(clauses)):
+            if not unrouted[later]:
+                break
+            tail.append(clauses[later][1])
+        intent = _classify_clause(clause, " ".join(tail))
+        if intent is None or (routed and routed[-1][0] == intent):
+            if routed:
+                routed[-1][1] = f"{routed[-1][1]}{joiner}{clause}"
+            else:
+                pending = f"{pending}{joiner}{clause}"
+            continue
+        if pending:
+            clause, pending = f"{pending}{joiner}{clause}", ""
+        routed.append([intent, clause])
+
+    if not routed or len(routed) > _MAX_CLAUSES:
+        return None
+
+    # A specialist needed by two non-adjacent clauses would get one merged,
+    # out-of-order sub-query; leave that to the LLM.
+    intents = [intent for intent, _ in routed]
+    if len(set(intents)) != len(intents):
+        return None
+
+    if len(routed) == 1:
+        return intents, [text]
+    return intents, [clause for _, clause in routed]
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Path accounting
+# ─────────────────────────────────────────────────────────────────────────────
+
+class RouteStats:
+    """Counts and cumulative latency per routing path ("fast", "llm", "default")."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts: dict[str, int] = {}
+        self._seconds: dict[str, float] = {}
+
+    def record(self, path: str, seconds: float):
+        with self._lock:
+            self._counts[path] = self._counts.get(path, 0) + 1
+            self._seconds[path] = self._seconds.get(path, 0.0) + seconds
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            total = sum(self._counts.values())
+            return {
+                "total": total,
+                "fast_path_ratio": round(self._counts.get("fast", 0) / total, 4) if total else 0.0,
+                "paths": {
+                    path: {
+                        "count": count,
+                        "avg_ms": round(self._seconds[path] / count * 1000, 3),
+                    }
+                    for path, count in self._counts.items()
+                },
+            }
+
+
+route_stats = RouteStats()
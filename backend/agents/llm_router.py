@@ -0,0 +1,417 @@
+"""
+llm_router.py — Latency-aware provider routing for the agents' LLM calls
+
+`HedgedLLM` takes the place of `with_fallbacks`. It keeps the same
+contract: try the providers in order and return the first answer. On top of
+that it adds three things:
+
+  • hedging     if the current provider has not answered within its hedge
+                delay (its recent p95 latency), the next provider is started
+                as well; whichever answers first wins and the other attempt
+                is cancelled. An attempt that fails starts the next provider
+                at once, exactly as a fallback would.
+  • deadline    every call gives up after LLM_CALL_DEADLINE seconds with
+                LLMDeadlineExceeded, however many providers are in flight.
+  • breaker     a provider that fails LLM_BREAKER_FAILURES times in a row
+                (errors, timeouts, or hedges it lost while it was still
+                running) is skipped for LLM_BREAKER_COOLDOWN seconds; after
+                that a single probe call decides whether it comes back.
+                When every circuit is open the first provider is tried anyway.
+
+Provider health is shared per provider name across every bound variant
+(tool sets, the structured-output router) and exported through `metrics`:
+
+  llm_provider_circuit_state{provider}         0 closed, 1 half-open, 2 open
+  llm_provider_latency_p95_seconds{provider}   drives the hedge delay
+  llm_provider_calls_total{provider,outcome}   success, error, timeout,
+                                               lost_hedge, cancelled, skipped
+  llm_hedges_total{provider}                   hedges fired while it was slow
+
+`snapshot()` returns the same picture for /admin/routing-stats.
+
+Hedges are tagged "nostream" so two providers never interleave their prose
+in stream_agent; a call answered by a hedge still delivers its text through
+the node's result.
+
+The synchronous `invoke` falls back sequentially (breaker included) without
+hedging. LLM_HEDGING=0 turns hedging off while keeping the deadline and the
+breaker. agents.fake_llm can give each provider its own latency tail and
+error rate to exercise all of this offline (benchmarks/llm_hedging.py).
+"""
+
+import asyncio
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Optional
+
+from langchain_core.callbacks import AsyncCallbackManagerForLLMRun, BaseCallbackHandler
+from langchain_core.runnables import Runnable, RunnableConfig
+from langchain_core.runnables.config import patch_config
+
+import metrics
+
+HEDGING_ENABLED = os.getenv("LLM_HEDGING", "1").lower() not in ("0", "false", "no")
+CALL_DEADLINE = float(os.getenv("LLM_CALL_DEADLINE", "30"))
+HEALTH_WINDOW = int(os.getenv("LLM_HEALTH_WINDOW", "200"))
+HEDGE_PERCENTILE = float(os.getenv("LLM_HEDGE_PERCENTILE", "95"))
+HEDGE_MIN_SAMPLES = int(os.getenv("LLM_HEDGE_MIN_SAMPLES", "20"))
+# Until a provider has HEDGE_MIN_SAMPLES answers its delay is HEDGE_DELAY
+HEDGE_DELAY = float(os.getenv("LLM_HEDGE_DELAY", "2.0"))
+HEDGE_MIN_DELAY = float(os.getenv("LLM_HEDGE_MIN_DELAY", "0.25"))
+HEDGE_MAX_DELAY = float(os.getenv("LLM_HEDGE_MAX_DELAY", "10"))
+BREAKER_FAILURES = int(os.getenv("LLM_BREAKER_FAILURES", "3"))
+BREAKER_COOLDOWN = float(os.getenv("LLM_BREAKER_COOLDOWN", "30"))
+
+# langgraph's TAG_NOSTREAM: stream_mode="messages" ignores runs carrying it
+_NOSTREAM_TAG = "nostream"
+
+CLOSED, HALF_OPEN, OPEN = "closed", "half_open", "open"
+_STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+_circuit_state = metrics.gauge(
+    "llm_provider_circuit_state", "Provider circuit breaker: 0 closed, 1 half-open, 2 open", ("provider",))
+_latency_p95 = metrics.gauge(
+    "llm_provider_latency_p95_seconds", "Recent p95 answer latency per provider (the hedge delay before clamping)",
+    ("provider",))
+_calls = metrics.counter(
+    "llm_provider_calls", "Provider attempts by outcome", ("provider", "outcome"))
+_hedges = metrics.counter(
+    "llm_hedges", "Hedged requests fired because the provider had not answered in time", ("provider",))
+
+
+class LLMDeadlineExceeded(TimeoutError):
+    """No provider answered within the call's deadline."""
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Provider health
+# ─────────────────────────────────────────────────────────────────────────────
+
+class ProviderHealth:
+    """Recent latencies and the circuit breaker of one provider."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._lock = threading.Lock()
+        self._latencies: deque[float] = deque(maxlen=HEALTH_WINDOW)
+        self._p95: float | None = None
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self._probing = False
+        self._publish()
+
+    def _publish(self):
+        _circuit_state.set(_STATE_VALUES[self.state], provider=self.name)
+        if self._p95 is not None:
+            _latency_p95.set(self._p95, provider=self.name)
+
+    def p95(self) -> float | None:
+        return self._p95
+
+    def hedge_delay(self) -> float:
+        """How long to wait for this provider before hedging."""
+        with self._lock:
+            if len(self._latencies) < HEDGE_MIN_SAMPLES or self._p95 is None:
+                return HEDGE_DELAY
+            return min(max(self._p95, HEDGE_MIN_DELAY), HEDGE_MAX_DELAY)
+
+    def allow(self) -> bool:
+        """May a call go to this provider now? Claims the probe when half-open."""
+        with self._lock:
+            if self.state == OPEN and time.monotonic() - self.opened_at >= BREAKER_COOLDOWN:
+                self.state = HALF_OPEN
+                self._publish()
+            if self.state == CLOSED:
+                return True
+            if self.state == HALF_OPEN and not self._probing:
+                self._probing = True
+                return True
+            return False
+
+    def success(self, seconds: float):
+        with self._lock:
+            self._latencies.append(seconds)
+            ordered = sorted(self._latencies)
+            self._p95 = ordered[min(len(ordered) - 1, int(len(ordered) * HEDGE_PERCENTILE / 100))]
+            self.consecutive_failures = 0
+            self._probing = False
+            self.state = CLOSED
+            self._publish()
+
+    def failure(self):
+        with self._lock:
+            self.consecutive_failures += 1
+            if self.state == HALF_OPEN or self.consecutive_failures >= BREAKER_FAILURES:
+                self.state = OPEN
+                self.opened_at = time.monotonic()
+            self._probing = False
+            self._publish()
+
+    def release(self):
+        """The attempt ended without telling us anything (cancelled as a late hedge)."""
+        with self._lock:
+            self._probing = False
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "state": self.state,
+                "consecutive_failures": self.consecutive_failures,
+                "samples": len(self._latencies),
+                "p95_ms": round(self._p95 * 1000, 1) if self._p95 is not None else None,
+                "open_for_s": (
+                    round(max(0.0, BREAKER_COOLDOWN - (time.monotonic() - self.opened_at)), 1)
+                    if self.state == OPEN else 0.0
+                ),
+            }
+
+
+_health: dict[str, ProviderHealth] = {}
+_health_lock = threading.Lock()
+
+
+def health(name: str) -> ProviderHealth:
+    with _health_lock:
+        if name not in _health:
+            _health[name] = ProviderHealth(name)
+        return _health[name]
+
+
+def snapshot() -> dict:
+    with _health_lock:
+        providers = dict(_health)
+    return {name: h.snapshot() for name, h in providers.items()}
+
+
+def reset():
+    """Forget every provider's history (benchmarks, or after changing provider settings)."""
+    with _health_lock:
+        _health.clear()
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Hedged calls
+# ─────────────────────────────────────────────────────────────────────────────
+
+class _OpenRuns(BaseCallbackHandler):
+    """The chat-model runs an attempt has started and not yet ended."""
+
+    run_inline = True
+
+    def __init__(self):
+        self.runs: dict = {}
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, parent_run_id=None, **kwargs):
+        self.runs[run_id] = parent_run_id
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        self.runs.pop(run_id, None)
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self.runs.pop(run_id, None)
+
+
+class _Attempt:
+    __slots__ = ("name", "health", "started", "callbacks", "open_runs")
+
+    def __init__(self, name: str, provider_health: ProviderHealth, callbacks):
+        self.name = name
+        self.health = provider_health
+        self.started = time.monotonic()
+        self.callbacks = callbacks
+        self.open_runs = _OpenRuns()
+        callbacks.add_handler(self.open_runs, inherit=True)
+
+    async def close_runs(self):
+        """
+        A cancelled chat model never reports its end: close its runs for it so
+        tracing records the attempt as cancelled and stream handlers forget it.
+        """
+        for run_id, parent_run_id in list(self.open_runs.runs.items()):
+            await AsyncCallbackManagerForLLMRun(
+                run_id=run_id,
+                handlers=self.callbacks.handlers,
+                inheritable_handlers=self.callbacks.inheritable_handlers,
+                parent_run_id=parent_run_id,
+            ).on_llm_error(asyncio.CancelledError())
+
+
+class HedgedLLM(Runnable):
+    """Providers tried in order, with hedging, a per-call deadline and circuit breakers."""
+
+    def __init__(
+        self,
+        providers: list[tuple[str, Runnable]],
+        deadline: float = CALL_DEADLINE,
+        hedging: bool = HEDGING_ENABLED,
+    ):
+        if not providers:
+            raise ValueError("HedgedLLM needs at least one provider")
+        self.providers = list(providers)
+        self.deadline = deadline
+        self.hedging = hedging
+
+    def get_name(self, suffix: Optional[str] = None, *, name: Optional[str] = None) -> str:
+        return name or "HedgedLLM" + (suffix or "")
+
+    def _derive(self, transform) -> "HedgedLLM":
+        return HedgedLLM([(name, transform(r)) for name, r in self.providers], self.deadline, self.hedging)
+
+    def bind_tools(self, tools: list, **kwargs: Any) -> "HedgedLLM":
+        return self._derive(lambda r: r.bind_tools(tools, **kwargs))
+
+    def with_structured_output(self, schema: Any, **kwargs: Any) -> "HedgedLLM":
+        return self._derive(lambda r: r.with_structured_output(schema, **kwargs))
+
+    # ── sync: sequential fallback ────────────────────────────────────────────
+
+    def invoke(self, input: Any, config: Optional[RunnableConfig] = None, **kwargs: Any) -> Any:
+        return self._call_with_config(self._invoke, input, config, **kwargs)
+
+    def _invoke(self, input, run_manager, config, **kwargs):
+        first_error = None
+        for name, runnable, provider_health in self._admitted():
+            started = time.monotonic()
+            try:
+                output = runnable.invoke(input, patch_config(config, callbacks=run_manager.get_child()), **kwargs)
+            except Exception as exc:
+                provider_health.failure()
+                _calls.inc(provider=name, outcome="error")
+                first_error = first_error or exc
+                continue
+            provider_health.success(time.monotonic() - started)
+            _calls.inc(provider=name, outcome="success")
+            return output
+        raise first_error
+
+    def _admitted(self):
+        """Providers whose circuit lets the call through, in order; the first one if none does."""
+        tried = False
+        for name, runnable in self.providers:
+            provider_health = health(name)
+            if provider_health.allow():
+                tried = True
+                yield name, runnable, provider_health
+            else:
+                _calls.inc(provider=name, outcome="skipped")
+        if not tried:
+            name, runnable = self.providers[0]
+            yield name, runnable, health(name)
+
+    # ── async: hedged race ───────────────────────────────────────────────────
+
+    async def ainvoke(self, input: Any, config: Optional[RunnableConfig] = None, **kwargs: Any) -> Any:
+        return await self._acall_with_config(self._ainvoke, input, config, **kwargs)
+
+    async def _ainvoke(self, input, run_manager, config, **kwargs):
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.deadline
+        candidates = self._admitted()
+        in_flight: dict[asyncio.Task, _Attempt] = {}
+        first_error: BaseException | None = None
+        last: _Attempt | None = None
+
+        def launch() -> _Attempt | None:
+            nonlocal last
+            entry = next(candidates, None)
+            if entry is None:
+                return None
+            name, runnable, provider_health = entry
+            attempt = _Attempt(name, provider_health, run_manager.get_child())
+            child = patch_config(config, callbacks=attempt.callbacks)
+            if in_flight:
+                # A hedge runs next to an attempt that may already be streaming tokens
+                child["tags"] = [*child.get("tags", []), _NOSTREAM_TAG]
+            task = asyncio.ensure_future(runnable.ainvoke(input, child, **kwargs))
+            last = in_flight[task] = attempt
+            return attempt
+
+        launch()
+        try:
+            while in_flight:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                hedge_in = None
+                if self.hedging and last is not None:
+                    hedge_in = last.started + last.health.hedge_delay() - time.monotonic()
+                    timeout = min(timeout, max(hedge_in, 0.0))
+                done, _ = await asyncio.wait(in_flight, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+
+                if not done:
+                    if hedge_in is not None and hedge_in <= timeout:
+                        slow = last
+                        if launch() is not None:
+                            _hedges.inc(provider=slow.name)
+                        else:
+                            last = None  # nothing left to hedge with; wait out the deadline
+                    continue
+
+                winner = None
+                for task in done:
+                    attempt = in_flight.pop(task)
+                    exc = task.exception()
+                    if exc is None:
+                        if winner is None:
+                            winner = (task, attempt)
+                        else:
+                            attempt.health.success(time.monotonic() - attempt.started)
+                            _calls.inc(provider=attempt.name, outcome="success")
+                        continue
+                    attempt.health.failure()
+                    _calls.inc(provider=attempt.name, outcome="error")
+                    first_error = first_error or exc
+                if winner is not None:
+                    task, attempt = winner
+                    attempt.health.success(time.monotonic() - attempt.started)
+                    _calls.inc(provider=attempt.name, outcome="success")
+                    self._abandon(in_flight, winner=attempt)
+                    await _drain(in_flight)
+                    return task.result()
+                launch()  # a failed provider hands over at once, hedge or not
+            if in_flight:
+                for attempt in in_flight.values():
+                    attempt.health.failure()
+                    _calls.inc(provider=attempt.name, outcome="timeout")
+                self._cancel(in_flight)
+                await _drain(in_flight)
+                raise LLMDeadlineExceeded(f"no LLM provider answered within {self.deadline:g}s")
+            raise first_error
+        finally:
+            # Cancelled from outside (client went away): take the attempts down with us
+            if in_flight:
+                self._cancel(in_flight)
+
+    @staticmethod
+    def _abandon(in_flight: dict, winner: _Attempt):
+        """Another attempt answered: the ones started before it lost the race, later hedges just stop."""
+        for attempt in in_flight.values():
+            if attempt.started <= winner.started:
+                attempt.health.failure()
+                _calls.inc(provider=attempt.name, outcome="lost_hedge")
+            else:
+                attempt.health.release()
+                _calls.inc(provider=attempt.name, outcome="cancelled")
+        HedgedLLM._cancel(in_flight)
+
+    @staticmethod
+    def _cancel(in_flight: dict):
+        for task in in_flight:
+            task.cancel()
+
+
+async def _drain(in_flight: dict):
+    """Wait for the cancelled attempts to unwind."""
+    attempts = list(in_flight.items())
+    in_flight.clear()
+    if attempts:
+        await asyncio.gather(*(task for task, _ in attempts), return_exceptions=True)
+        for _, attempt in attempts:
+            await attempt.close_runs()
+
+
+def hedged(providers: list[tuple[str, Runnable]], **options: Any) -> HedgedLLM:
+    return HedgedLLM(providers, **options)
@@ -0,0 +1,51 @@
+"""
+registry.py — Lazily built, per-process agent components
+
+LLM clients, tool-bound models, structured-output routers and the compiled
+LangGraph are expensive to import and construct, and a worker that never
+serves /chat (or a script that only imports `main`) should not pay for them.
+`get(key, factory)` builds each component on first use and returns the same
+instance afterwards; concurrent first calls build it only once.
+
+`stats()` reports what has been built and how long each build took.
+"""
+
+import threading
+import time
+from typing import Any, Callable, Hashable
+
+_lock = threading.RLock()
+_instances: dict[Hashable, Any] = {}
+_build_seconds: dict[Hashable, float] = {}
+
+
+def get(key: Hashable, factory: Callable[[], Any]) -> Any:
+    try:
+        return _instances[key]
+    except KeyError:
+        pass
+    # RLock: factories may themselves resolve other registry entries
+    with _lock:
+        if key not in _instances:
+            started = time.perf_counter()
+            _instances[key] = factory()
+            _build_seconds[key] = time.perf_counter() - started
+        return _instances[key]
+
+
+def clear():
+    """Forget every built component (tests, or after changing provider settings)."""
+    with _lock:
+        _instances.clear()
+        _build_seconds.clear()
+
+
+def stats() -> dict:
+    with _lock:
+        return {
+            "built": len(_instances),
+            "build_ms": {
+                (key if isinstance(key, str) else ":".join(map(str, key))): round(seconds * 1000, 3)
+                for key, seconds in _build_seconds.items()
+            },
+        }
@@ -0,0 +1,107 @@
+"""
+tool_budget.py — Size budget for tool outputs fed back to the LLM
+
+Every ToolMessage lands in the specialist's prompt, so an unbounded tool
+result (a heavy user's full order history, a long cart) costs prompt tokens
+and latency on every following LLM call of the turn. Tools format their
+results as a header plus one entry per row and pass them through `fit`,
+which keeps as many whole entries as fit in the budget and ends with a
+continuation hint ("… 12 more orders — call get_order_status(offset=5)")
+the agent can follow if the user really wants more.
+
+The budget is TOOL_OUTPUT_MAX_CHARS characters, or TOOL_OUTPUT_MAX_TOKENS
+tokens (≈ 4 characters each). `budget_stats` counts what was sent and what
+was left out per tool, reported at /admin/tool-output-stats.
+"""
+
+import os
+import threading
+
+CHARS_PER_TOKEN = 4
+
+MAX_CHARS = int(
+    os.getenv("TOOL_OUTPUT_MAX_CHARS")
+    or int(os.getenv("TOOL_OUTPUT_MAX_TOKENS", "500")) * CHARS_PER_TOKEN
+)
+
+
+def estimate_tokens(chars: int) -> int:
+    return -(-chars // CHARS_PER_TOKEN)
+
+
+def fit(
+    tool: str,
+    header: str,
+    entries: list[str],
+    continuation,
+    footer: str = "",
+    omitted_chars: int = 0,
+    max_chars: int = None,
+) -> tuple[str, int]:
+    """
+    Return (text, shown): `header`, as many of `entries` as fit in the budget,
+    then `footer`. When entries are left out, `continuation(shown)` supplies
+    the hint line. At least one entry is always shown, cut short if needed.
+    `omitted_chars` accounts for rows the tool never fetched.
+    """
+    budget = max_chars or MAX_CHARS
+    fixed = len(header) + (len(footer) + 1 if footer else 0)
+    lines = [header]
+    used, shown = fixed, 0
+    for entry in entries:
+        # Reserve room for the continuation hint unless this is the last entry
+        reserve = 0 if shown == len(entries) - 1 and not omitted_chars else 120
+        if used + len(entry) + 1 + reserve > budget:
+            if shown == 0:
+                room = max(budget - used - reserve - 2, 40)
+                lines.append(entry[:room].rstrip() + "…")
+                used += room + 2
+                shown = 1
+            break
+        lines.append(entry)
+        used += len(entry) + 1
+        shown += 1
+
+    dropped = sum(len(e) + 1 for e in entries[shown:]) + omitted_chars
+    if shown < len(entries) or omitted_chars:
+        lines.append(continuation(shown))
+    if footer:
+        lines.append(footer)
+    text = "\n".join(lines)
+    budget_stats.record(tool, len(text), dropped)
+    return text, shown
+
+
+class BudgetStats:
+    """Characters sent vs. left out per tool, with the token estimate."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._tools: dict[str, dict] = {}
+
+    def record(self, tool: str, sent_chars: int, omitted_chars: int):
+        with self._lock:
+            entry = self._tools.setdefault(tool, {"calls": 0, "truncated": 0, "sent_chars": 0, "omitted_chars": 0})
+            entry["calls"] += 1
+            entry["truncated"] += 1 if omitted_chars else 0
+            entry["sent_chars"] += sent_chars
+            entry["omitted_chars"] += omitted_chars
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            tools = {
+                name: {
+                    **entry,
+                    "sent_tokens": estimate_tokens(entry["sent_chars"]),
+                    "tokens_saved": estimate_tokens(entry["omitted_chars"]),
+                }
+                for name, entry in self._tools.items()
+            }
+        return {
+            "max_chars": MAX_CHARS,
+            "tokens_saved": sum(t["tokens_saved"] for t in tools.values()),
+            "tools": tools,
+        }
+
+
+budget_stats = BudgetStats()
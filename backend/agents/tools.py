@@ -1,59 +1,184 @@
 from sqlalchemy.orm import Session
-from database import SessionLocal
-import crud, schemas
+from database import SessionLocal, AsyncSessionLocal
+import checkout, crud, crud_async, schemas
+from agents import tool_budget
 
 
-def get_order_status(user_id: int) -> str:
-    """Get the order history and current status for the user."""
+# ─────────────────────────────────────────────────────────────────────────────
+# Formatting helpers (shared by the sync and async tool variants)
+# ─────────────────────────────────────────────────────────────────────────────
+
+ORDER_PAGE_SIZE   = 10  # orders fetched per get_order_status call
+PRODUCT_PAGE_SIZE = 10  # products fetched per search / browse call
+_ITEMS_PER_ORDER  = 3   # items listed per order before "+N more items"
+
+
+def _order_entry(o) -> str:
+    try:
+        items_list = ", ".join(
+            f"{i.product.name} x{i.quantity} @ ${i.price_at_purchase:.2f}"
+            for i in o.items[:_ITEMS_PER_ORDER]
+        )
+        if len(o.items) > _ITEMS_PER_ORDER:
+            items_list += f" (+{len(o.items) - _ITEMS_PER_ORDER} more items)"
+    except Exception:
+        items_list = "Item details unavailable"
+    return (
+        f"• Order #{o.id} | Status: {o.status} | Total: ${o.total_amount:.2f} | "
+        f"Placed: {o.created_at.strftime('%Y-%m-%d')} | "
+        f"Items: {items_list} | Ship to: {o.shipping_address}"
+    )
+
+
+def _format_orders(orders, total: int, offset: int = 0) -> str:
+    if not orders:
+        if total and offset:
+            return f"No more orders — all {total} have been listed."
+        return "You currently have no orders placed."
+    entries = [_order_entry(o) for o in orders]
+    # Orders beyond this page were never fetched; estimate their size for the stats
+    unfetched = max(total - offset - len(orders), 0)
+    header = f"Found {total} order(s):\n" if not offset else f"Orders {offset + 1}+ of {total}:\n"
+    text, _ = tool_budget.fit(
+        "get_order_status", header, entries,
+        continuation=lambda shown: (
+            f"… {total - offset - shown} more order(s) not shown — "
+            f"call get_order_status(offset={offset + shown}) to list them."
+        ),
+        omitted_chars=unfetched * sum(map(len, entries)) // len(entries),
+    )
+    return text
+
+
+def _format_products(products, search: str = None, fallback: bool = False,
+                     offset: int = 0, has_more: bool = False, next_call=None,
+                     tool: str = "search_products") -> str:
+    if fallback:
+        header = f"No exact match for '{search}', but here are some products you might like:\n"
+    else:
+        label = f"Products matching '{search}'" if search else "Available products"
+        header = f"{label} ({len(products)} found):\n" if not (offset or has_more) else f"{label} (from #{offset + 1}):\n"
+
+    entries = []
+    for p in products:
+        stock_info = f"{p.stock_quantity} in stock" if p.stock_quantity > 0 else "Out of stock"
+        entries.append(f"• [{p.category}] {p.name} — ${p.price:.2f} | {stock_info} | ID: {p.id}")
+
+    def continuation(shown: int) -> str:
+        if next_call is None:
+            return "… more products not shown — ask for a narrower search."
+        return f"… more products not shown — call {next_call(offset + shown)} for the next ones."
+
+    text, _ = tool_budget.fit(
+        tool, header, entries, continuation,
+        # One unfetched row is known to exist when has_more; assume a typical entry size
+        omitted_chars=(sum(map(len, entries)) // max(len(entries), 1)) if has_more else 0,
+    )
+    return text
+
+
+def _format_cart(items, offset: int = 0) -> str:
+    if not items:
+        return "Your cart is empty."
+    total = sum(i.product.price * i.quantity for i in items)
+    entries = [
+        f"• {i.product.name} x{i.quantity} — ${i.product.price:.2f} each = ${i.product.price * i.quantity:.2f}"
+        for i in items[offset:]
+    ]
+    if not entries:
+        return f"No more cart items — all {len(items)} have been listed. Cart Total: ${total:.2f}"
+    header = f"Your cart ({len(items)} item(s)):\n" if not offset else f"Your cart, items {offset + 1}+ of {len(items)}:\n"
+    text, _ = tool_budget.fit(
+        "view_cart", header, entries,
+        continuation=lambda shown: (
+            f"… {len(entries) - shown} more item(s) not shown — call view_cart(offset={offset + shown}) to list them."
+        ),
+        footer=f"\nCart Total: ${total:.2f}",
+    )
+    return text
+
+
+def _format_added(items, requested: dict[int, int]) -> str:
+    added = ", ".join(
+        f"{requested[i.product_id]}x '{i.product.name}' (${i.product.price:.2f} each)"
+        for i in items if i.product_id in requested
+    )
+    return f"✓ Added {added} to your cart."
+
+
+def _cart_lines(items) -> list[schemas.CartItemCreate]:
+    # Tool calls hand over validated argument models; direct callers may pass dicts
+    return [schemas.CartItemCreate.model_validate(i, from_attributes=True) for i in items or ()]
+
+
+def _requested(lines: list[schemas.CartItemCreate]) -> dict[int, int]:
+    requested: dict[int, int] = {}
+    for line in lines:
+        requested[line.product_id] = requested.get(line.product_id, 0) + line.quantity
+    return requested
+
+
+def _format_checkout(order, shipping_address: str) -> str:
+    if order:
+        return (
+            f"✓ Order placed successfully!\n"
+            f"  Order ID: #{order.id}\n"
+            f"  Total charged: ${order.total_amount:.2f}\n"
+            f"  Shipping to: {shipping_address}\n"
+            f"  Status: {order.status}"
+        )
+    return "Checkout failed — your cart may be empty."
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Sync tools
+# ─────────────────────────────────────────────────────────────────────────────
+
+def get_order_status(user_id: int, offset: int = 0) -> str:
+    """Get the order history and current status for the user, newest first, a page at a time."""
+    offset = max(offset, 0)
     db = SessionLocal()
     try:
-        orders = crud.get_user_orders(db, user_id=user_id)
-        if not orders:
-            return "You currently have no orders placed."
-        lines = [f"Found {len(orders)} order(s):\n"]
-        for o in orders:
-            try:
-                items_list = ", ".join(
-                    f"{i.product.name} x{i.quantity} @ ${i.price_at_purchase:.2f}"
-                    for i in o.items
-                )
-            except Exception:
-                items_list = "Item details unavailable"
-            lines.append(
-                f"• Order #{o.id} | Status: {o.status} | Total: ${o.total_amount:.2f} | "
-                f"Placed: {o.created_at.strftime('%Y-%m-%d')} | "
-                f"Items: {items_list} | Ship to: {o.shipping_address}"
-            )
-        return "\n".join(lines)
+        total = crud.count_user_orders(db, user_id=user_id)
+        orders = crud.get_user_orders(db, user_id=user_id, limit=ORDER_PAGE_SIZE, skip=offset) if total > offset else []
+        return _format_orders(orders, total, offset)
     finally:
         db.close()
 
 
-def get_product_list(search: str = None, category: str = None) -> str:
+def _next_products_call(search: str = None, category: str = None):
+    if search:
+        return lambda offset: f"search_products(query={search!r}, offset={offset})"
+    return lambda offset: f"browse_catalog(category={category or ''!r}, offset={offset})"
+
+
+def _products_page(products, search: str, category: str, offset: int) -> str:
+    # One extra row is fetched to learn whether another page exists
+    has_more = len(products) > PRODUCT_PAGE_SIZE
+    return _format_products(
+        products[:PRODUCT_PAGE_SIZE], search=search, offset=offset,
+        has_more=has_more, next_call=_next_products_call(search, category),
+        tool="search_products" if search else "browse_catalog",
+    )
+
+
+def get_product_list(search: str = None, category: str = None, offset: int = 0) -> str:
     """Search for products in the catalog. Returns a formatted list of matching products."""
+    offset = max(offset, 0)
     db = SessionLocal()
     try:
-        products = crud.get_products(db, search=search, category=category, limit=10)
-        if not products:
-            # Try a broader search if specific search found nothing
-            if search:
-                products = crud.get_products(db, limit=10)
-                if products:
-                    lines = [f"No exact match for '{search}', but here are some products you might like:\n"]
-                else:
-                    return f"No products found matching '{search}'."
-            else:
-                return "No products available in the catalog."
-        else:
-            label = f"Products matching '{search}'" if search else "Available products"
-            lines = [f"{label} ({len(products)} found):\n"]
-
-        for p in products:
-            stock_info = f"{p.stock_quantity} in stock" if p.stock_quantity > 0 else "Out of stock"
-            lines.append(
-                f"• [{p.category}] {p.name} — ${p.price:.2f} | {stock_info} | ID: {p.id}"
-            )
-        return "\n".join(lines)
+        products = crud.get_products(db, search=search, category=category, skip=offset, limit=PRODUCT_PAGE_SIZE + 1)
+        if products:
+            return _products_page(products, search, category, offset)
+        if offset:
+            return "No more products match."
+        # Try a broader search if specific search found nothing
+        if search:
+            products = crud.get_products(db, limit=PRODUCT_PAGE_SIZE)
+            if products:
+                return _format_products(products, search=search, fallback=True)
+            return f"No products found matching '{search}'."
+        return "No products available in the catalog."
     finally:
         db.close()
 
@@ -66,32 +191,42 @@ def add_item_to_cart(user_id: int, product_id: int, quantity: int = 1) -> str:
         product = crud.get_product(db, product_id=product_id)
         if not product:
             return f"Product with ID {product_id} not found."
-        if product.stock_quantity < quantity:
-            return f"Only {product.stock_quantity} units of '{product.name}' are available."
         item = schemas.CartItemCreate(product_id=product_id, quantity=quantity)
         crud.add_to_cart(db, user_id=user_id, item=item)
         return f"✓ Added {quantity}x '{product.name}' (${product.price:.2f} each) to your cart."
+    except checkout.InsufficientStockError as e:
+        return f"Nothing was added — {e}"
+    except Exception as e:
+        return f"Error adding to cart: {str(e)}"
+    finally:
+        db.close()
+
+
+def add_items_to_cart(user_id: int, items: list) -> str:
+    """Add several products to the cart in one transaction. `items` carry product_id and quantity."""
+    db = SessionLocal()
+    try:
+        lines = _cart_lines(items)
+        if not lines:
+            return "No items to add."
+        if any(line.quantity < 1 for line in lines):
+            return "Quantities must be at least 1."
+        cart_items = crud.add_items_to_cart(db, user_id=user_id, items=lines)
+        return _format_added(cart_items, _requested(lines))
+    except checkout.InsufficientStockError as e:
+        return f"Nothing was added — {e}"
     except Exception as e:
         return f"Error adding to cart: {str(e)}"
     finally:
         db.close()
 
 
-def get_cart_contents(user_id: int) -> str:
+def get_cart_contents(user_id: int, offset: int = 0) -> str:
     """View all items currently in the user's shopping cart."""
     db = SessionLocal()
     try:
         items = crud.get_cart_items(db, user_id=user_id)
-        if not items:
-            return "Your cart is empty."
-        lines = [f"Your cart ({len(items)} item(s)):\n"]
-        total = 0.0
-        for i in items:
-            subtotal = i.product.price * i.quantity
-            total += subtotal
-            lines.append(f"• {i.product.name} x{i.quantity} — ${i.product.price:.2f} each = ${subtotal:.2f}")
-        lines.append(f"\nCart Total: ${total:.2f}")
-        return "\n".join(lines)
+        return _format_cart(items, max(offset, 0))
     finally:
         db.close()
 
@@ -102,16 +237,93 @@ def perform_checkout(user_id: int, shipping_address: str) -> str:
     try:
         order_data = schemas.OrderCreate(shipping_address=shipping_address)
         order = crud.create_order(db, user_id=user_id, order_data=order_data)
-        if order:
-            return (
-                f"✓ Order placed successfully!\n"
-                f"  Order ID: #{order.id}\n"
-                f"  Total charged: ${order.total_amount:.2f}\n"
-                f"  Shipping to: {shipping_address}\n"
-                f"  Status: {order.status}"
-            )
-        return "Checkout failed — your cart may be empty."
+        return _format_checkout(order, shipping_address)
+    except checkout.InsufficientStockError as e:
+        return f"Checkout failed — {e} Please update your cart and try again."
     except Exception as e:
         return f"Error during checkout: {str(e)}"
     finally:
         db.close()
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Async tools (same contract, non-blocking DB access via AsyncSessionLocal)
+# ─────────────────────────────────────────────────────────────────────────────
+
+async def aget_order_status(user_id: int, offset: int = 0) -> str:
+    """Async variant of get_order_status."""
+    offset = max(offset, 0)
+    async with AsyncSessionLocal() as db:
+        total = await crud_async.count_user_orders(db, user_id=user_id)
+        orders = await crud_async.get_user_orders(db, user_id=user_id, limit=ORDER_PAGE_SIZE, skip=offset) if total > offset else []
+        return _format_orders(orders, total, offset)
+
+
+async def aget_product_list(search: str = None, category: str = None, offset: int = 0) -> str:
+    """Async variant of get_product_list."""
+    offset = max(offset, 0)
+    async with AsyncSessionLocal() as db:
+        products = await crud_async.get_products(db, search=search, category=category, skip=offset, limit=PRODUCT_PAGE_SIZE + 1)
+        if products:
+            return _products_page(products, search, category, offset)
+        if offset:
+            return "No more products match."
+        if search:
+            products = await crud_async.get_products(db, limit=PRODUCT_PAGE_SIZE)
+            if products:
+                return _format_products(products, search=search, fallback=True)
+            return f"No products found matching '{search}'."
+        return "No products available in the catalog."
+
+
+async def aadd_item_to_cart(user_id: int, product_id: int, quantity: int = 1) -> str:
+    """Async variant of add_item_to_cart."""
+    async with AsyncSessionLocal() as db:
+        try:
+            product = await crud_async.get_product(db, product_id=product_id)
+            if not product:
+                return f"Product with ID {product_id} not found."
+            item = schemas.CartItemCreate(product_id=product_id, quantity=quantity)
+            await crud_async.add_to_cart(db, user_id=user_id, item=item)
+            return f"✓ Added {quantity}x '{product.name}' (${product.price:.2f} each) to your cart."
+        except checkout.InsufficientStockError as e:
+            return f"Nothing was added — {e}"
+        except Exception as e:
+            return f"Error adding to cart: {str(e)}"
+
+
+async def aadd_items_to_cart(user_id: int, items: list) -> str:
+    """Async variant of add_items_to_cart."""
+    async with AsyncSessionLocal() as db:
+        try:
+            lines = _cart_lines(items)
+            if not lines:
+                return "No items to add."
+            if any(line.quantity < 1 for line in lines):
+                return "Quantities must be at least 1."
+            cart_items = await crud_async.add_items_to_cart(db, user_id=user_id, items=lines)
+            return _format_added(cart_items, _requested(lines))
+        except checkout.InsufficientStockError as e:
+            return f"Nothing was added — {e}"
+        except Exception as e:
+            return f"Error adding to cart: {str(e)}"
+
+
+async def aget_cart_contents(user_id: int, offset: int = 0) -> str:
+    """Async variant of get_cart_contents."""
+    async with AsyncSessionLocal() as db:
+        items = await crud_async.get_cart_items(db, user_id=user_id)
+        return _format_cart(items, max(offset, 0))
+
+
+async def aperform_checkout(user_id: int, shipping_address: str) -> str:
+    """Async variant of perform_checkout."""
+    async with AsyncSessionLocal() as db:
+        try:
+            order_data = schemas.OrderCreate(shipping_address=shipping_address)
+            order = await crud_async.create_order(db, user_id=user_id, order_data=order_data)
+            return _format_checkout(order, shipping_address)
+        except checkout.InsufficientStockError as e:
+            return f"Checkout failed — {e} Please update your cart and try again."
+        except Exception as e:
+            return f"Error during checkout: {str(e)}"
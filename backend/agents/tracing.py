@@ -0,0 +1,336 @@
+"""
+tracing.py — Where a /chat request spends its time
+
+Spans are opened around:
+
+  • the whole agent run              kind "request"    (run_agent / stream_agent)
+  • every graph node                 kind "node"       (Supervisor, ProductSearch, …)
+  • every tool-loop iteration        kind "iteration"  (_arun_agent)
+  • every tool invocation            kind "tool"
+  • every LLM call                   kind "llm"        (one per ainvoke, hedges and fallbacks included)
+  • every provider attempt           kind "llm_attempt" — which provider and model
+                                     answered, failed, or was cancelled when a hedge won
+
+Parent/child links follow contextvars, so parallel specialists and
+concurrent tool calls nest under the right node. Spans carry the node they
+ran in as the `node` attribute, inherited from their parent.
+
+Finished spans feed the Prometheus histograms in `metrics` (GET /metrics),
+are mirrored to OpenTelemetry when the opentelemetry API is installed (a
+no-op unless the deployment configures an SDK and exporter), and are
+collected per request by `collect()` for the /chat debug flag, which returns
+them as a timing table and as OTLP/JSON spans.
+
+AGENT_TRACING=0 turns all of it off.
+"""
+
+import asyncio
+import contextlib
+import contextvars
+import functools
+import inspect
+import os
+import secrets
+import time
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+import metrics
+
+TRACING_ENABLED = os.getenv("AGENT_TRACING", "1").lower() not in ("0", "false", "no")
+SERVICE_NAME = os.getenv("OTEL_SERVICE_NAME", "ecommerce-backend")
+_SCOPE = "ecommerce.agents"
+
+try:
+    from opentelemetry import trace as _otel_trace
+    _otel_tracer = _otel_trace.get_tracer(_SCOPE)
+except ImportError:  # opentelemetry-api not installed
+    _otel_tracer = None
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Metrics
+# ─────────────────────────────────────────────────────────────────────────────
+
+_request_seconds = metrics.histogram(
+    "agent_request_duration_seconds", "Whole agent runs for /chat", ("route", "status"))
+_node_seconds = metrics.histogram(
+    "agent_node_duration_seconds", "Graph node executions", ("node", "status"))
+_iteration_seconds = metrics.histogram(
+    "agent_iteration_duration_seconds", "Specialist tool-loop iterations (LLM call plus tools)", ("node",))
+_tool_seconds = metrics.histogram(
+    "agent_tool_duration_seconds", "Agent tool invocations", ("tool", "status"))
+_llm_seconds = metrics.histogram(
+    "agent_llm_call_duration_seconds", "LLM calls including fallbacks, by answering provider",
+    ("node", "provider", "status"))
+_llm_attempt_seconds = metrics.histogram(
+    "agent_llm_attempt_duration_seconds", "Single provider attempts within an LLM call",
+    ("provider", "model", "status"))
+_llm_fallbacks = metrics.counter(
+    "agent_llm_fallbacks", "LLM calls answered by a fallback provider", ("node",))
+
+
+def _observe(span: "Span"):
+    a, seconds, status = span.attributes, span.duration_s, span.status
+    node = a.get("node", "")
+    if span.kind == "request":
+        _request_seconds.observe(seconds, route=a.get("route", ""), status=status)
+    elif span.kind == "node":
+        _node_seconds.observe(seconds, node=node, status=status)
+    elif span.kind == "iteration":
+        _iteration_seconds.observe(seconds, node=node)
+    elif span.kind == "tool":
+        _tool_seconds.observe(seconds, tool=a.get("tool", span.name), status=status)
+    elif span.kind == "llm":
+        _llm_seconds.observe(seconds, node=node, provider=a.get("provider", ""), status=status)
+        if a.get("fallback"):
+            _llm_fallbacks.inc(node=node)
+    elif span.kind == "llm_attempt":
+        _llm_attempt_seconds.observe(seconds, provider=a.get("provider", ""), model=a.get("model", ""), status=status)
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Spans
+# ─────────────────────────────────────────────────────────────────────────────
+
+class Span:
+    __slots__ = ("name", "kind", "trace_id", "span_id", "parent_id", "attributes",
+                 "start_ns", "end_ns", "_started", "duration_s", "status", "error")
+
+    def __init__(self, name: str, kind: str, parent: "Span | None", trace_id: str, attributes: dict):
+        self.name = name
+        self.kind = kind
+        self.trace_id = trace_id
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent.span_id if parent else None
+        inherited = {"node": parent.attributes["node"]} if parent and "node" in parent.attributes else {}
+        self.attributes = {**inherited, **attributes}
+        self.start_ns = time.time_ns()
+        self._started = time.perf_counter()
+        self.end_ns = None
+        self.duration_s = 0.0
+        self.status = "ok"
+        self.error = None
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    def fail(self, exc: BaseException):
+        self.status = "error"
+        self.error = f"{type(exc).__name__}: {exc}"
+
+    def end(self):
+        self.duration_s = time.perf_counter() - self._started
+        self.end_ns = self.start_ns + int(self.duration_s * 1e9)
+
+
+class _NoopSpan:
+    """Stands in for Span when tracing is disabled."""
+
+    def set(self, **attributes):
+        pass
+
+    def fail(self, exc: BaseException):
+        pass
+
+
+_NOOP = _NoopSpan()
+
+_current_span: contextvars.ContextVar[Span | None] = contextvars.ContextVar("agent_span", default=None)
+_current_trace: contextvars.ContextVar["Trace | None"] = contextvars.ContextVar("agent_trace", default=None)
+
+
+def _otel_value(value):
+    return value if isinstance(value, (str, bool, int, float)) else str(value)
+
+
+def _finish(span: Span, otel_span=None):
+    span.end()
+    _observe(span)
+    collected = _current_trace.get()
+    if collected is not None and collected.trace_id == span.trace_id:
+        collected.spans.append(span)
+    if otel_span is not None:
+        otel_span.set_attributes({f"agent.{k}": _otel_value(v) for k, v in span.attributes.items()})
+        otel_span.set_attribute("agent.kind", span.kind)
+        if span.status == "error" and span.error:
+            from opentelemetry.trace import Status, StatusCode
+            otel_span.set_status(Status(StatusCode.ERROR, span.error))
+
+
+def _start(name: str, kind: str, attributes: dict, parent: Span | None) -> Span:
+    collected = _current_trace.get()
+    trace_id = parent.trace_id if parent else (collected.trace_id if collected else secrets.token_hex(16))
+    return Span(name, kind, parent, trace_id, attributes)
+
+
+@contextlib.contextmanager
+def span(name: str, kind: str = "internal", **attributes):
+    """Time the enclosed block as a child of the current span."""
+    if not TRACING_ENABLED:
+        yield _NOOP
+        return
+    current = _start(name, kind, attributes, _current_span.get())
+    token = _current_span.set(current)
+    otel_cm = _otel_tracer.start_as_current_span(name) if _otel_tracer else contextlib.nullcontext()
+    with otel_cm as otel_span:
+        try:
+            yield current
+        except (GeneratorExit, asyncio.CancelledError):
+            current.status = "cancelled"
+            raise
+        except BaseException as exc:
+            current.fail(exc)
+            raise
+        finally:
+            _current_span.reset(token)
+            _finish(current, otel_span)
+
+
+def traced_node(name: str, fn):
+    """Wrap a graph node function (sync or async) in a "node" span."""
+    if inspect.iscoroutinefunction(fn):
+        @functools.wraps(fn)
+        async def async_node(*args, **kwargs):
+            with span(name, "node", node=name):
+                return await fn(*args, **kwargs)
+        return async_node
+
+    @functools.wraps(fn)
+    def node(*args, **kwargs):
+        with span(name, "node", node=name):
+            return fn(*args, **kwargs)
+    return node
+
+
+class LLMAttemptTracer(BaseCallbackHandler):
+    """
+    Graph callback that records each chat-model attempt as an "llm_attempt"
+    span under the current "llm" span, and marks on that span the provider
+    tried first, the one that answered and whether they differ (a fallback or
+    a winning hedge).
+    """
+
+    # Called in the LLM caller's context, so the current span is the "llm" one
+    run_inline = True
+
+    def __init__(self):
+        self._attempts: dict = {}
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, metadata=None, **kwargs):
+        if not TRACING_ENABLED:
+            return
+        metadata = metadata or {}
+        provider = metadata.get("ls_provider") or kwargs.get("name") or (serialized or {}).get("name", "")
+        parent = _current_span.get()
+        attempt = _start(f"llm {provider}", "llm_attempt",
+                         {"provider": provider, "model": metadata.get("ls_model_name", "")}, parent)
+        if parent is not None and parent.kind == "llm":
+            parent.set(attempts=parent.attributes.get("attempts", 0) + 1)
+            parent.attributes.setdefault("primary", provider)
+        self._attempts[run_id] = (attempt, parent)
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        entry = self._attempts.pop(run_id, None)
+        if entry is None:
+            return
+        attempt, parent = entry
+        _finish(attempt)
+        # The first answer is the one used; a hedge that also finishes changes nothing
+        if parent is not None and parent.kind == "llm" and "provider" not in parent.attributes:
+            parent.set(
+                provider=attempt.attributes["provider"],
+                model=attempt.attributes["model"],
+                fallback=attempt.attributes["provider"] != parent.attributes.get("primary"),
+            )
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        entry = self._attempts.pop(run_id, None)
+        if entry is not None:
+            attempt, _ = entry
+            if isinstance(error, asyncio.CancelledError):
+                attempt.status = "cancelled"
+            else:
+                attempt.fail(error)
+            _finish(attempt)
+
+
+llm_attempt_tracer = LLMAttemptTracer()
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Per-request collection (/chat debug)
+# ─────────────────────────────────────────────────────────────────────────────
+
+def _otlp_attribute(key: str, value) -> dict:
+    if isinstance(value, bool):
+        return {"key": key, "value": {"boolValue": value}}
+    if isinstance(value, int):
+        return {"key": key, "value": {"intValue": str(value)}}
+    if isinstance(value, float):
+        return {"key": key, "value": {"doubleValue": value}}
+    return {"key": key, "value": {"stringValue": str(value)}}
+
+
+class Trace:
+    """The finished spans of one request."""
+
+    def __init__(self):
+        self.trace_id = secrets.token_hex(16)
+        self.spans: list[Span] = []
+        self.start_ns = time.time_ns()
+        self._started = time.perf_counter()
+
+    def timings(self) -> dict:
+        """Human-readable: every span with its offset and duration, in start order."""
+        return {
+            "trace_id": self.trace_id,
+            "total_ms": round((time.perf_counter() - self._started) * 1000, 2),
+            "spans": [
+                {
+                    "name": s.name,
+                    "kind": s.kind,
+                    "span_id": s.span_id,
+                    "parent_id": s.parent_id,
+                    "start_ms": round((s.start_ns - self.start_ns) / 1e6, 2),
+                    "duration_ms": round(s.duration_s * 1000, 2),
+                    "status": s.status,
+                    **({"error": s.error} if s.error else {}),
+                    "attributes": s.attributes,
+                }
+                for s in sorted(self.spans, key=lambda s: s.start_ns)
+            ],
+        }
+
+    def otlp(self) -> dict:
+        """The spans as an OTLP/JSON ExportTraceServiceRequest body."""
+        spans = [
+            {
+                "traceId": s.trace_id,
+                "spanId": s.span_id,
+                **({"parentSpanId": s.parent_id} if s.parent_id else {}),
+                "name": s.name,
+                "kind": 1,  # SPAN_KIND_INTERNAL
+                "startTimeUnixNano": str(s.start_ns),
+                "endTimeUnixNano": str(s.end_ns),
+                "attributes": [_otlp_attribute("agent.kind", s.kind)]
+                              + [_otlp_attribute(f"agent.{k}", v) for k, v in s.attributes.items()],
+                "status": {"code": 2, "message": s.error or ""} if s.status == "error" else {"code": 1},
+            }
+            for s in self.spans
+        ]
+        return {"resourceSpans": [{
+            "resource": {"attributes": [_otlp_attribute("service.name", SERVICE_NAME)]},
+            "scopeSpans": [{"scope": {"name": _SCOPE}, "spans": spans}],
+        }]}
+
+
+@contextlib.contextmanager
+def collect():
+    """Collect the spans of everything run inside the block into a Trace."""
+    collected = Trace()
+    token = _current_trace.set(collected)
+    try:
+        yield collected
+    finally:
+        _current_trace.reset(token)
@@ -0,0 +1,225 @@
+"""
+Sales analytics rollups.
+
+Three rollup tables (models.SalesDaily / SalesDailyCategory / SalesDailyProduct)
+hold orders, units and revenue per day, per day+category and per day+product.
+
+  • rebuild      — recomputes a date range (or everything) from orders and
+    order_items; run it after imports or edits:
+
+        python analytics.py rebuild            # everything
+        python analytics.py rebuild --days 7   # the last 7 days
+
+  • refresh      — rebuilds yesterday and today. The server runs it every
+    ANALYTICS_REFRESH_INTERVAL seconds (`run_refresh`), so new orders show
+    up within that interval. Checkout never writes the rollups: every order
+    of the day would otherwise queue on the lock of the day's single
+    sales_daily row.
+  • backfill     — rebuilds everything once when the rollups are empty but
+    orders are not, i.e. on a database that predates them. The server runs
+    it at startup.
+
+The /admin/analytics endpoints read only the rollups, so their cost depends on
+the number of days requested, not on the size of the order history.
+"""
+import asyncio
+import logging
+import os
+from datetime import date, datetime, time, timedelta
+
+from sqlalchemy import Date, cast, delete, func, insert, select
+from sqlalchemy.orm import Session
+
+import database, models
+
+REFRESH_INTERVAL = float(os.getenv("ANALYTICS_REFRESH_INTERVAL", "60"))
+
+logger = logging.getLogger(__name__)
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Full / ranged rebuild (periodic job)
+# ─────────────────────────────────────────────────────────────────────────────
+
+def _order_day(dialect: str):
+    # SQLite's CAST(... AS DATE) yields a number; date() gives the 'YYYY-MM-DD' text SQLAlchemy expects
+    if dialect == "sqlite":
+        return func.date(models.Order.created_at)
+    return cast(models.Order.created_at, Date)
+
+
+def rebuild(db: Session, start: date = None, end: date = None):
+    """Recompute the rollups for [start, end] (inclusive; open-ended when None) and commit."""
+    day = _order_day(db.get_bind().dialect.name).label("day")
+    revenue = func.sum(models.OrderItem.quantity * models.OrderItem.price_at_purchase)
+    units = func.sum(models.OrderItem.quantity)
+    orders = func.count(func.distinct(models.Order.id))
+
+    source = (
+        select()
+        .select_from(models.Order)
+        .join(models.OrderItem, models.OrderItem.order_id == models.Order.id)
+        .join(models.Product, models.Product.id == models.OrderItem.product_id)
+    )
+    if start:
+        source = source.where(models.Order.created_at >= datetime.combine(start, time.min))
+    if end:
+        source = source.where(models.Order.created_at < datetime.combine(end + timedelta(days=1), time.min))
+
+    targets = [
+        (models.SalesDaily, [day], ["day"]),
+        (models.SalesDailyCategory, [day, func.coalesce(models.Product.category, "")], ["day", "category"]),
+        (models.SalesDailyProduct, [day, models.OrderItem.product_id], ["day", "product_id"]),
+    ]
+    try:
+        for model, group_cols, key_names in targets:
+            clear = delete(model)
+            if start:
+                clear = clear.where(model.day >= start)
+            if end:
+                clear = clear.where(model.day <= end)
+            db.execute(clear)
+            db.execute(
+                insert(model).from_select(
+                    key_names + ["orders", "units", "revenue"],
+                    source.add_columns(*group_cols, orders, units, revenue).group_by(*group_cols),
+                )
+            )
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+
+
+def backfill(db: Session) -> bool:
+    """Rebuild everything if the rollups are empty but there are orders. Returns whether it did."""
+    if db.execute(select(models.SalesDaily.day).limit(1)).first() is not None:
+        return False
+    if db.execute(select(models.Order.id).limit(1)).first() is None:
+        return False
+    logger.info("analytics rollups are empty; rebuilding them from the order history")
+    try:
+        rebuild(db)
+    except Exception:
+        # e.g. another worker starting at the same time got there first
+        logger.exception("analytics backfill failed; run `python analytics.py rebuild`")
+        return False
+    return True
+
+
+def refresh():
+    """Rebuild yesterday's and today's rollups, in a session of its own."""
+    db = database.SessionLocal()
+    try:
+        # Yesterday too, for the orders placed just before midnight since the last run
+        rebuild(db, start=datetime.utcnow().date() - timedelta(days=1))
+    finally:
+        db.close()
+
+
+async def run_refresh(interval: float = REFRESH_INTERVAL):
+    """Server background task: `refresh` every `interval` seconds, until cancelled."""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await asyncio.to_thread(refresh)
+        except Exception:
+            # e.g. another worker refreshing the same days at the same time
+            logger.exception("Analytics refresh failed")
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Queries (rollups only)
+# ─────────────────────────────────────────────────────────────────────────────
+
+def _in_range(query, model, start: date = None, end: date = None):
+    if start:
+        query = query.where(model.day >= start)
+    if end:
+        query = query.where(model.day <= end)
+    return query
+
+
+def _totals(model):
+    return (
+        func.coalesce(func.sum(model.orders), 0).label("orders"),
+        func.coalesce(func.sum(model.units), 0).label("units"),
+        func.coalesce(func.sum(model.revenue), 0.0).label("revenue"),
+    )
+
+
+def summary(db: Session, start: date = None, end: date = None) -> dict:
+    row = db.execute(
+        _in_range(select(*_totals(models.SalesDaily)), models.SalesDaily, start, end)
+    ).one()
+    return {
+        "start": start,
+        "end": end,
+        "orders": row.orders,
+        "units": row.units,
+        "revenue": round(row.revenue, 2),
+        "average_order_value": round(row.revenue / row.orders, 2) if row.orders else 0.0,
+    }
+
+
+def daily(db: Session, start: date = None, end: date = None) -> list[dict]:
+    rows = db.execute(
+        _in_range(select(models.SalesDaily), models.SalesDaily, start, end).order_by(models.SalesDaily.day)
+    ).scalars()
+    return [
+        {"day": r.day, "orders": r.orders, "units": r.units, "revenue": round(r.revenue, 2)}
+        for r in rows
+    ]
+
+
+def by_category(db: Session, start: date = None, end: date = None) -> list[dict]:
+    model = models.SalesDailyCategory
+    rows = db.execute(
+        _in_range(select(model.category, *_totals(model)), model, start, end)
+        .group_by(model.category)
+        .order_by(func.sum(model.revenue).desc())
+    ).all()
+    return [
+        {"category": r.category, "orders": r.orders, "units": r.units, "revenue": round(r.revenue, 2)}
+        for r in rows
+    ]
+
+
+def top_products(db: Session, start: date = None, end: date = None, limit: int = 10) -> list[dict]:
+    model = models.SalesDailyProduct
+    totals = (
+        _in_range(select(model.product_id, *_totals(model)), model, start, end)
+        .group_by(model.product_id)
+        .order_by(func.sum(model.revenue).desc())
+        .limit(limit)
+        .subquery()
+    )
+    rows = db.execute(
+        select(totals, models.Product.name)
+        .join(models.Product, models.Product.id == totals.c.product_id, isouter=True)
+        .order_by(totals.c.revenue.desc())
+    ).all()
+    return [
+        {"product_id": r.product_id, "name": r.name, "orders": r.orders, "units": r.units, "revenue": round(r.revenue, 2)}
+        for r in rows
+    ]
+
+
+if __name__ == "__main__":
+    import argparse
+    from database import SessionLocal, engine
+
+    parser = argparse.ArgumentParser(description="Maintain the sales analytics rollups.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    rebuild_cmd = sub.add_parser("rebuild", help="Recompute rollups from orders")
+    rebuild_cmd.add_argument("--days", type=int, help="Only rebuild the last N days (default: everything)")
+    args = parser.parse_args()
+
+    models.Base.metadata.create_all(bind=engine)
+    session = SessionLocal()
+    try:
+        first_day = datetime.utcnow().date() - timedelta(days=args.days - 1) if args.days else None
+        rebuild(session, start=first_day)
+        print(f"✅ Rollups rebuilt{f' for the last {args.days} day(s)' if args.days else ''}: {summary(session, start=first_day)}")
+    finally:
+        session.close()
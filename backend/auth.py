@@ -18,6 +18,11 @@ def verify_password(plain_password, hashed_password):
 def get_password_hash(password):
     return pwd_context.hash(password)
 
+def user_claims(user) -> dict:
+    """JWT claims for a user: `sub` (email) plus `uid` and `role`, so requests
+    can be authorized from the token and the user cache without a DB lookup."""
+    return {"sub": user.email, "uid": user.id, "role": user.role}
+
 def create_access_token(data: dict, expires_delta: timedelta = None):
     to_encode = data.copy()
     if expires_delta:
@@ -0,0 +1,201 @@
+"""
+chat_load.py — Offline load test for /chat with per-node latency
+
+Drives POST /chat in-process (httpx ASGITransport, no server, no network)
+with LLM_BACKEND=fake, so every LLM call is a FakeChatModel response after
+FAKE_LLM_LATENCY_MS — replayed from FAKE_LLM_CASSETTE when one is set,
+scripted otherwise. The prompt mix covers every specialist, a multi-intent
+message and a message the keyword router leaves to the Supervisor LLM.
+
+Reports p50/p95/p99 for the whole request, for each graph node
+(Supervisor, ProductSearch, …, ResultMerger), for the LLM calls made inside
+each node and for each tool.
+
+Runs against a throwaway SQLite database by default; set BENCH_DATABASE_URL
+to use a scratch PostgreSQL database instead.
+
+Usage (from backend/):
+    python benchmarks/chat_load.py --concurrency 16 --requests 400
+    FAKE_LLM_LATENCY_MS=80-200 python benchmarks/chat_load.py --json
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+from collections import defaultdict
+
+_DEFAULT_URL = f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='chat-load-'), 'bench.db')}"
+os.environ["DATABASE_URL"] = os.getenv("BENCH_DATABASE_URL", _DEFAULT_URL)
+os.environ.pop("ASYNC_DATABASE_URL", None)
+os.environ["LLM_BACKEND"] = "fake"
+os.environ.setdefault("FAKE_LLM_LATENCY_MS", "50")
+# A few shoppers send every request: measure the chat gate, not their rate limits
+os.environ.setdefault("CHAT_RATE_PER_MINUTE", "0")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+from langchain_core.callbacks import BaseCallbackHandler
+
+import auth, database, main as app_main, models
+from agents import agent_graph
+from latency import summarize
+
+PROMPTS = [
+    "show me running shoes",
+    "do you have any wireless headphones",
+    "where is my order",
+    "add product id 3 to my cart",
+    "what is in my cart",
+    "find a laptop and track my order",
+    "I need something nice for my dad's birthday",
+]
+
+_PRODUCTS = [
+    ("Trail Running Shoes", "Footwear"), ("Road Running Shoes", "Footwear"),
+    ("Wireless Headphones", "Electronics"), ("Noise Cancelling Headphones", "Electronics"),
+    ("Gaming Laptop", "Electronics"), ("Ultrabook Laptop", "Electronics"),
+    ("Leather Wallet", "Accessories"), ("Steel Watch", "Accessories"),
+]
+
+
+class NodeTimer(BaseCallbackHandler):
+    """Collects wall-clock durations of graph nodes, LLM calls and tool calls."""
+
+    def __init__(self):
+        self.samples: dict[str, list[float]] = defaultdict(list)
+        self._open: dict = {}
+
+    def _start(self, run_id, label: str):
+        self._open[run_id] = (label, time.perf_counter())
+
+    def _end(self, run_id):
+        opened = self._open.pop(run_id, None)
+        if opened is not None:
+            label, started = opened
+            self.samples[label].append(time.perf_counter() - started)
+
+    def on_chain_start(self, serialized, inputs, *, run_id, metadata=None, **kwargs):
+        node = (metadata or {}).get("langgraph_node")
+        # A node's own run carries its name; the runnables inside it only inherit the metadata
+        if node and kwargs.get("name") == node:
+            self._start(run_id, f"node:{node}")
+
+    def on_chain_end(self, outputs, *, run_id, **kwargs):
+        self._end(run_id)
+
+    def on_chain_error(self, error, *, run_id, **kwargs):
+        self._open.pop(run_id, None)
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, metadata=None, **kwargs):
+        self._start(run_id, f"llm:{(metadata or {}).get('langgraph_node', '?')}")
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        self._end(run_id)
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self._open.pop(run_id, None)
+
+    def on_tool_start(self, serialized, input_str, *, run_id, **kwargs):
+        self._start(run_id, f"tool:{kwargs.get('name') or (serialized or {}).get('name', '?')}")
+
+    def on_tool_end(self, output, *, run_id, **kwargs):
+        self._end(run_id)
+
+    def on_tool_error(self, error, *, run_id, **kwargs):
+        self._open.pop(run_id, None)
+
+
+def setup(n_users: int) -> list[str]:
+    app_main.init_db()
+    db = database.SessionLocal()
+    try:
+        tag = int(time.time() * 1000)
+        if not db.query(models.Product).filter(models.Product.category == "Footwear").first():
+            db.add_all(
+                models.Product(name=name, description=f"{name} for everyday use", price=20.0 + i * 10,
+                               stock_quantity=10_000, category=category)
+                for i, (name, category) in enumerate(_PRODUCTS)
+            )
+        users = [models.User(email=f"chat-load-{tag}-{i}@shop.com", password_hash="x") for i in range(n_users)]
+        db.add_all(users)
+        db.commit()
+        return [auth.create_access_token(auth.user_claims(u)) for u in users]
+    finally:
+        db.close()
+
+
+async def run(concurrency: int, total: int, tokens: list[str]) -> tuple[list[float], dict]:
+    latencies: list[float] = []
+    statuses: dict[int, int] = defaultdict(int)
+    queue: asyncio.Queue = asyncio.Queue()
+    for i in range(total):
+        queue.put_nowait(i)
+
+    transport = httpx.ASGITransport(app=app_main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as client:
+        async def worker():
+            while True:
+                try:
+                    i = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                started = time.perf_counter()
+                response = await client.post(
+                    "/chat",
+                    json={"content": PROMPTS[i % len(PROMPTS)]},
+                    headers={"Authorization": f"Bearer {tokens[i % len(tokens)]}"},
+                )
+                latencies.append(time.perf_counter() - started)
+                statuses[response.status_code] += 1
+
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return latencies, dict(statuses)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--users", type=int, default=20, help="Distinct shoppers the requests rotate through")
+    parser.add_argument("--json", action="store_true", help="Machine-readable output")
+    args = parser.parse_args()
+
+    tokens = setup(args.users)
+    agent_graph.warm_up()
+    timer = NodeTimer()
+    agent_graph.add_graph_callback(timer)
+
+    started = time.perf_counter()
+    latencies, statuses = asyncio.run(run(args.concurrency, args.requests, tokens))
+    elapsed = time.perf_counter() - started
+    agent_graph.remove_graph_callback(timer)
+
+    report = {
+        "concurrency": args.concurrency,
+        "requests": args.requests,
+        "fake_latency_ms": os.environ["FAKE_LLM_LATENCY_MS"],
+        "elapsed_s": round(elapsed, 3),
+        "requests_per_second": round(len(latencies) / elapsed, 2),
+        "statuses": statuses,
+        "request": summarize(latencies),
+        "spans": {label: summarize(samples) for label, samples in sorted(timer.samples.items())},
+    }
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return 0 if set(statuses) == {200} else 1
+
+    print(f"database      {database.engine.url.render_as_string(hide_password=True)}")
+    print(f"load          {args.requests} requests, concurrency {args.concurrency}, "
+          f"fake LLM latency {report['fake_latency_ms']}ms")
+    print(f"throughput    {report['requests_per_second']} req/s over {report['elapsed_s']}s   statuses {statuses}\n")
+    print(f"{'span':34} {'count':>6} {'p50':>9} {'p95':>9} {'p99':>9}")
+    for label, s in [("POST /chat", report["request"]), *report["spans"].items()]:
+        print(f"{label:34} {s['count']:>6} {s['p50_ms']:>7.1f}ms {s['p95_ms']:>7.1f}ms {s['p99_ms']:>7.1f}ms")
+    return 0 if set(statuses) == {200} else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
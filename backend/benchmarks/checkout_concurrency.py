@@ -0,0 +1,106 @@
+"""
+checkout_concurrency.py — Concurrent checkout throughput and oversell check
+
+Gives N shoppers the same hot product in their carts (more units in total
+than are in stock) and checks them all out concurrently through
+crud.create_order. Reports orders/second and verifies that
+units sold + remaining stock == initial stock, and that stock never goes
+negative. Exits non-zero if it finds an oversell.
+
+Runs against a throwaway SQLite database by default. Set BENCH_DATABASE_URL
+to point it at a scratch PostgreSQL database instead. Row locking only
+matters there, because SQLite serializes all writers.
+
+Usage (from backend/):
+    python benchmarks/checkout_concurrency.py --shoppers 200 --stock 150 --qty 1 --workers 16
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+_DEFAULT_URL = f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='checkout-'), 'bench.db')}"
+os.environ["DATABASE_URL"] = os.getenv("BENCH_DATABASE_URL", _DEFAULT_URL)
+os.environ.pop("ASYNC_DATABASE_URL", None)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import func, select
+
+import checkout, crud, database, models, schemas
+
+
+def setup(shoppers: int, stock: int, qty: int) -> tuple[int, list[int]]:
+    models.Base.metadata.create_all(bind=database.engine)
+    db = database.SessionLocal()
+    try:
+        tag = int(time.time() * 1000)
+        hot = models.Product(name=f"Hot Item {tag}", price=9.99, stock_quantity=stock, category="Bench")
+        db.add(hot)
+        users = [
+            models.User(email=f"bench-{tag}-{i}@shop.com", password_hash="x")
+            for i in range(shoppers)
+        ]
+        db.add_all(users)
+        db.flush()
+        db.add_all(models.CartItem(user_id=u.id, product_id=hot.id, quantity=qty) for u in users)
+        db.commit()
+        return hot.id, [u.id for u in users]
+    finally:
+        db.close()
+
+
+def checkout_one(user_id: int) -> str:
+    db = database.SessionLocal()
+    try:
+        order = crud.create_order(db, user_id, schemas.OrderCreate(shipping_address="1 Bench Rd"))
+        return "ok" if order else "empty"
+    except checkout.InsufficientStockError:
+        return "out_of_stock"
+    except Exception:
+        return "error"
+    finally:
+        db.close()
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--shoppers", type=int, default=200)
+    parser.add_argument("--stock", type=int, default=150)
+    parser.add_argument("--qty", type=int, default=1)
+    parser.add_argument("--workers", type=int, default=16)
+    args = parser.parse_args()
+
+    product_id, user_ids = setup(args.shoppers, args.stock, args.qty)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.workers) as pool:
+        outcomes = list(pool.map(checkout_one, user_ids))
+    elapsed = time.perf_counter() - started
+
+    db = database.SessionLocal()
+    try:
+        remaining = db.get(models.Product, product_id).stock_quantity
+        sold = db.execute(
+            select(func.coalesce(func.sum(models.OrderItem.quantity), 0))
+            .where(models.OrderItem.product_id == product_id)
+        ).scalar_one()
+    finally:
+        db.close()
+
+    counts = {k: outcomes.count(k) for k in ("ok", "out_of_stock", "empty", "error")}
+    consistent = remaining >= 0 and sold + remaining == args.stock
+    print(f"database         {database.engine.url.render_as_string(hide_password=True)}")
+    print(f"shoppers         {args.shoppers} x {args.qty} unit(s), stock {args.stock}, {args.workers} workers")
+    print(f"outcomes         {counts}")
+    print(f"elapsed          {elapsed:.3f}s  ({len(outcomes) / elapsed:.1f} checkouts/s, "
+          f"{counts['ok'] / elapsed:.1f} orders/s)")
+    print(f"units sold       {sold}")
+    print(f"stock remaining  {remaining}")
+    print(f"oversell         {'NONE' if consistent else 'DETECTED'}")
+    return 0 if consistent else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
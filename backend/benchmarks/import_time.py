@@ -0,0 +1,116 @@
+"""
+import_time.py — Track worker cold-start cost
+
+Times, each in a fresh interpreter:
+  • import main                 — what every uvicorn worker / script pays
+  • import agents.agent_graph   — the agent module on its own
+  • agent_graph.warm_up()       — first-use build of LLM clients, tool
+                                  bindings and the compiled graph (paid by the
+                                  first /chat, or at startup with AGENT_WARMUP=1)
+
+and lists the slowest modules behind `import main` (python -X importtime).
+Provider API keys are stubbed with dummy values; nothing calls a provider.
+
+Usage (from backend/):
+    python benchmarks/import_time.py            # median of 5 runs
+    python benchmarks/import_time.py --runs 10 --json
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_ENV = {
+    **os.environ,
+    "DATABASE_URL": f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='it-'), 'import_time.db')}",
+    "GOOGLE_API_KEY": os.environ.get("GOOGLE_API_KEY", "bench"),
+    "GROQ_API_KEY": os.environ.get("GROQ_API_KEY", "bench"),
+    "AGENT_WARMUP": "0",
+}
+_ENV.pop("ASYNC_DATABASE_URL", None)
+
+_SCENARIOS = {
+    "import main": "import main",
+    "import agents.agent_graph": "import agents.agent_graph",
+    "agent_graph.warm_up()": "import agents.agent_graph as g",
+}
+# Code timed after the scenario's setup statement
+_TIMED = {
+    "agent_graph.warm_up()": "g.warm_up()",
+}
+
+_PROBE = """
+import sys, time
+sys.path.insert(0, {backend!r})
+{setup}
+started = time.perf_counter()
+{timed}
+print(time.perf_counter() - started)
+"""
+
+
+def _time_once(name: str) -> float:
+    timed = _TIMED.get(name)
+    setup, body = ("", _SCENARIOS[name]) if timed is None else (_SCENARIOS[name], timed)
+    code = _PROBE.format(backend=BACKEND, setup=setup, timed=body)
+    out = subprocess.run(
+        [sys.executable, "-c", code], cwd=BACKEND, env=_ENV,
+        capture_output=True, text=True, check=True,
+    )
+    return float(out.stdout.strip().splitlines()[-1])
+
+
+def _slowest_modules(top: int) -> list[dict]:
+    out = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"], cwd=BACKEND, env=_ENV,
+        capture_output=True, text=True, check=True,
+    )
+    rows = []
+    for line in out.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        # Only what `main` imports directly; deeper modules are inside their parent's cumulative time
+        if len(name) - len(name.lstrip()) != 3:
+            continue
+        rows.append({"module": name.strip(), "self_ms": int(self_us) / 1000, "cumulative_ms": int(cumulative_us) / 1000})
+    return sorted(rows, key=lambda r: r["cumulative_ms"], reverse=True)[:top]
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10, help="Slowest direct imports of main to list")
+    parser.add_argument("--json", action="store_true", help="Machine-readable output")
+    args = parser.parse_args()
+
+    results = {}
+    for name in _SCENARIOS:
+        samples = [_time_once(name) for _ in range(args.runs)]
+        results[name] = {
+            "median_ms": round(statistics.median(samples) * 1000, 1),
+            "min_ms": round(min(samples) * 1000, 1),
+            "max_ms": round(max(samples) * 1000, 1),
+        }
+    modules = _slowest_modules(args.top)
+
+    if args.json:
+        print(json.dumps({"runs": args.runs, "scenarios": results, "slowest_modules": modules}, indent=2))
+        return 0
+
+    print(f"{'scenario':28} {'median':>9} {'min':>9} {'max':>9}   ({args.runs} runs)")
+    for name, r in results.items():
+        print(f"{name:28} {r['median_ms']:>7.1f}ms {r['min_ms']:>7.1f}ms {r['max_ms']:>7.1f}ms")
+    print(f"\nslowest direct imports of `main` (cumulative):")
+    for m in modules:
+        print(f"  {m['cumulative_ms']:>8.1f}ms  {m['module']}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,149 @@
+"""
+inventory_contention.py — Stock holds on one hot product, row vs sharded
+
+A flash sale: --shoppers shoppers add the same product to their carts at
+once (each add takes a stock hold through crud.add_to_cart), then all of
+them check out (crud.create_order converts the holds). The sale runs once
+with the product's stock on its row and once for every --shards count, and
+reports holds/second and orders/second for each.
+
+After every run it folds the shard counters (inventory.maintain) and checks
+that units sold + stock left == initial stock, that nothing is still
+reserved and that no shard went negative. Exits non-zero on a mismatch.
+
+Runs against a throwaway SQLite database by default. SQLite serializes all
+writers, so there the shards can only show their overhead; set
+BENCH_DATABASE_URL to a scratch PostgreSQL database to measure the row-lock
+contention they remove.
+
+Usage (from backend/):
+    python benchmarks/inventory_contention.py --shoppers 400 --stock 300 --workers 16 --shards 8,32
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+_DEFAULT_URL = f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='inventory-'), 'bench.db')}"
+os.environ["DATABASE_URL"] = os.getenv("BENCH_DATABASE_URL", _DEFAULT_URL)
+os.environ.pop("ASYNC_DATABASE_URL", None)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import func, select
+
+import checkout, crud, database, inventory, models, schemas
+
+
+def setup(shoppers: int, stock: int, shards: int) -> tuple[int, list[int]]:
+    db = database.SessionLocal()
+    try:
+        tag = time.time_ns()
+        hot = models.Product(name=f"Hot Item {tag}", price=9.99, stock_quantity=stock, category="Bench")
+        db.add(hot)
+        users = [models.User(email=f"bench-{tag}-{i}@shop.com", password_hash="x") for i in range(shoppers)]
+        db.add_all(users)
+        db.commit()
+        product_id, user_ids = hot.id, [u.id for u in users]
+        if shards:
+            inventory.set_shards(db, product_id, shards)
+        return product_id, user_ids
+    finally:
+        db.close()
+
+
+def _run(pool: ThreadPoolExecutor, action, user_ids: list[int]) -> tuple[dict, float]:
+    started = time.perf_counter()
+    outcomes = list(pool.map(action, user_ids))
+    elapsed = time.perf_counter() - started
+    return {k: outcomes.count(k) for k in ("ok", "out_of_stock", "empty", "error")}, elapsed
+
+
+def sale(args, shards: int) -> dict:
+    product_id, user_ids = setup(args.shoppers, args.stock, shards)
+
+    def hold(user_id: int) -> str:
+        db = database.SessionLocal()
+        try:
+            crud.add_to_cart(db, user_id, schemas.CartItemCreate(product_id=product_id, quantity=args.qty))
+            return "ok"
+        except checkout.InsufficientStockError:
+            return "out_of_stock"
+        except Exception:
+            return "error"
+        finally:
+            db.close()
+
+    def buy(user_id: int) -> str:
+        db = database.SessionLocal()
+        try:
+            order = crud.create_order(db, user_id, schemas.OrderCreate(shipping_address="1 Bench Rd"))
+            return "ok" if order else "empty"
+        except checkout.InsufficientStockError:
+            return "out_of_stock"
+        except Exception:
+            return "error"
+        finally:
+            db.close()
+
+    with ThreadPoolExecutor(max_workers=args.workers) as pool:
+        holds, hold_s = _run(pool, hold, user_ids)
+        orders, order_s = _run(pool, buy, user_ids)
+
+    inventory.maintain()
+    db = database.SessionLocal()
+    try:
+        stock = inventory.status(db, product_id)
+        sold = db.execute(
+            select(func.coalesce(func.sum(models.OrderItem.quantity), 0))
+            .where(models.OrderItem.product_id == product_id)
+        ).scalar_one()
+    finally:
+        db.close()
+    consistent = (
+        sold + stock["stock_quantity"] == args.stock
+        and stock["reserved_quantity"] == 0 and stock["unfolded_sold"] == 0
+        and all(s["available"] >= 0 for s in stock["shards"])
+    )
+    return {
+        "shards": shards,
+        "holds": holds,
+        "holds_per_second": round(len(user_ids) / hold_s, 1),
+        "orders": orders,
+        "orders_per_second": round(orders["ok"] / order_s, 1),
+        "units_sold": sold,
+        "stock_left": stock["stock_quantity"],
+        "consistent": consistent,
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--shoppers", type=int, default=300)
+    parser.add_argument("--stock", type=int, default=200)
+    parser.add_argument("--qty", type=int, default=1)
+    parser.add_argument("--workers", type=int, default=16)
+    parser.add_argument("--shards", default="8", help="Comma-separated shard counts to compare with the row")
+    parser.add_argument("--json", action="store_true", help="Machine-readable output")
+    args = parser.parse_args()
+
+    models.Base.metadata.create_all(bind=database.engine)
+    runs = [sale(args, shards) for shards in [0] + [int(n) for n in args.shards.split(",") if n.strip()]]
+    if args.json:
+        print(json.dumps(runs, indent=2))
+    else:
+        print(f"database   {database.engine.url.render_as_string(hide_password=True)}")
+        print(f"sale       {args.shoppers} shoppers x {args.qty} unit(s), stock {args.stock}, {args.workers} workers\n")
+        print(f"{'stock on':10} {'holds/s':>9} {'orders/s':>9} {'held':>6} {'short':>6} {'errors':>7} {'sold':>6} {'left':>6}  consistent")
+        for run in runs:
+            print(f"{'row' if not run['shards'] else str(run['shards']) + ' shards':10} "
+                  f"{run['holds_per_second']:>9.1f} {run['orders_per_second']:>9.1f} {run['holds']['ok']:>6} "
+                  f"{run['holds']['out_of_stock']:>6} {run['holds']['error'] + run['orders']['error']:>7} "
+                  f"{run['units_sold']:>6} {run['stock_left']:>6}  {'yes' if run['consistent'] else 'NO'}")
+    return 0 if all(run["consistent"] for run in runs) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
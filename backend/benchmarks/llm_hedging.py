@@ -0,0 +1,163 @@
+"""
+llm_hedging.py — Plain fallbacks vs hedged provider routing, offline
+
+Both strategies call the same two fake providers (agents.fake_llm), so no
+network or API key is involved:
+
+  tail     the primary answers in --primary-ms but --tail-rate of its calls
+           take --tail-ms; the secondary answers in --secondary-ms.
+           `with_fallbacks` waits out every tail, HedgedLLM starts the
+           secondary once the primary passes its p95.
+  outage   the primary fails every call after --primary-ms, then recovers.
+           `with_fallbacks` pays for the failure on every call, HedgedLLM's
+           circuit breaker opens and skips the primary until a probe after
+           the cool-down finds it healthy again.
+
+Reports p50/p95/p99 per strategy, the extra provider calls hedging cost and
+the provider health that /metrics exports.
+
+Usage (from backend/):
+    python benchmarks/llm_hedging.py
+    python benchmarks/llm_hedging.py --calls 1000 --tail-rate 0.02 --tail-ms 3000 --json
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+os.environ["LLM_BACKEND"] = "fake"
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from langchain_core.messages import HumanMessage
+
+from agents import fake_llm, llm_router
+from benchmarks.latency import summarize
+
+PROMPT = [HumanMessage(content="show me wireless headphones")]
+
+
+async def _drive(llm, calls: int, concurrency: int, on_call=None) -> tuple[list[float], int]:
+    latencies: list[float] = []
+    errors = 0
+    next_call = 0
+
+    async def lane():
+        nonlocal next_call, errors
+        while next_call < calls:
+            i = next_call
+            next_call += 1
+            if on_call:
+                on_call(i)
+            started = time.perf_counter()
+            try:
+                await llm.ainvoke(PROMPT)
+            except Exception:
+                errors += 1
+            latencies.append(time.perf_counter() - started)
+
+    await asyncio.gather(*(lane() for _ in range(concurrency)))
+    return latencies, errors
+
+
+def _provider_calls() -> dict:
+    calls = {}
+    for (provider, outcome), value in llm_router._calls._values.items():
+        calls.setdefault(provider, {})[outcome] = int(value)
+    return calls
+
+
+async def tail_scenario(args) -> dict:
+    primary = fake_llm.chat_model("gemini", latency_ms=str(args.primary_ms),
+                                  tail_rate=args.tail_rate, tail_latency_ms=args.tail_ms)
+    secondary = fake_llm.chat_model("groq", latency_ms=str(args.secondary_ms))
+    report = {}
+
+    latencies, errors = await _drive(primary.with_fallbacks([secondary]), args.calls, args.concurrency)
+    report["with_fallbacks"] = {**summarize(latencies), "errors": errors}
+
+    llm_router.reset()
+    llm_router._calls._values.clear()
+    hedged = llm_router.hedged([("gemini", primary), ("groq", secondary)])
+    # Let the hedge delay learn the primary's p95 before measuring
+    await _drive(hedged, llm_router.HEDGE_MIN_SAMPLES * 2, args.concurrency)
+    llm_router._calls._values.clear()
+    latencies, errors = await _drive(hedged, args.calls, args.concurrency)
+    calls = _provider_calls()
+    report["hedged"] = {
+        **summarize(latencies),
+        "errors": errors,
+        "hedge_delay_ms": round(llm_router.health("gemini").hedge_delay() * 1000, 1),
+        "extra_calls_pct": round(100 * calls.get("groq", {}).get("success", 0) / max(1, len(latencies)), 2),
+        "provider_calls": calls,
+    }
+    return report
+
+
+async def outage_scenario(args) -> dict:
+    broken = fake_llm.chat_model("gemini", latency_ms=str(args.primary_ms), error_rate=1.0)
+    secondary = fake_llm.chat_model("groq", latency_ms=str(args.secondary_ms))
+    recover_at = args.calls // 2
+
+    def recover(i: int):
+        if i == recover_at:
+            broken.error_rate = 0.0
+
+    report = {}
+    latencies, errors = await _drive(broken.with_fallbacks([secondary]), args.calls, args.concurrency, recover)
+    report["with_fallbacks"] = {**summarize(latencies), "errors": errors}
+
+    broken.error_rate = 1.0
+    llm_router.reset()
+    llm_router._calls._values.clear()
+    cooldown = llm_router.BREAKER_COOLDOWN
+    # Short enough for the probe to find the recovered primary within the run
+    llm_router.BREAKER_COOLDOWN = args.cooldown
+    try:
+        hedged = llm_router.hedged([("gemini", broken), ("groq", secondary)])
+        latencies, errors = await _drive(hedged, args.calls, args.concurrency, recover)
+    finally:
+        llm_router.BREAKER_COOLDOWN = cooldown
+    report["hedged"] = {**summarize(latencies), "errors": errors, "provider_calls": _provider_calls(),
+                        "health": llm_router.snapshot()}
+    return report
+
+
+async def run(args) -> dict:
+    return {"tail": await tail_scenario(args), "outage": await outage_scenario(args)}
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--primary-ms", type=float, default=80)
+    parser.add_argument("--secondary-ms", type=float, default=150)
+    parser.add_argument("--tail-rate", type=float, default=0.04)
+    parser.add_argument("--tail-ms", type=float, default=2000)
+    parser.add_argument("--cooldown", type=float, default=1.0, help="Breaker cool-down for the outage run (s)")
+    parser.add_argument("--json", action="store_true", help="Machine-readable output")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return 0
+
+    print(f"{args.calls} calls, concurrency {args.concurrency}; primary {args.primary_ms:g}ms, "
+          f"secondary {args.secondary_ms:g}ms\n")
+    print(f"{'scenario':28} {'p50':>9} {'p95':>9} {'p99':>9} {'max':>9} {'errors':>7}")
+    for scenario, results in report.items():
+        for strategy, s in results.items():
+            print(f"{scenario + ' / ' + strategy:28} {s['p50_ms']:>7.1f}ms {s['p95_ms']:>7.1f}ms "
+                  f"{s['p99_ms']:>7.1f}ms {s['max_ms']:>7.1f}ms {s['errors']:>7}")
+    tail = report["tail"]["hedged"]
+    print(f"\ntail: hedge delay {tail['hedge_delay_ms']}ms, {tail['extra_calls_pct']}% of calls hedged")
+    print(f"outage provider calls: {report['outage']['hedged']['provider_calls']}")
+    print(f"provider health: {report['outage']['hedged']['health']}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,151 @@
+"""
+product_listing.py — Full product listings vs lean sparse-fieldset listings
+
+Fetches the same listing pages (GET /products?limit=--limit&skip=…, spread
+over --pages pages) in each variant and reports bytes on the wire per page,
+requests/second and p50/p95/p99:
+
+  full        today's listing: ORM rows → ProductResponse → JSON
+  lean        ?fields=--fields: selected columns → orjson
+  lean_gzip   lean with Accept-Encoding: gzip
+  lean_br     lean with Accept-Encoding: br (only when brotli is installed)
+
+Each variant runs twice: `cold` clears the catalog caches before every
+request, so it measures the query and serialization work; `warm` leaves
+them on, as a busy server would serve repeat pages.
+
+Runs in-process (httpx ASGITransport) against a throwaway SQLite database
+filled by synthetic_data.py at --scale; set BENCH_DATABASE_URL to use a
+prepared database instead.
+
+Usage (from backend/):
+    python benchmarks/product_listing.py
+    python benchmarks/product_listing.py --limit 100 --fields id,name,price --json
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+_DEFAULT_URL = f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='listing-bench-'), 'bench.db')}"
+os.environ["DATABASE_URL"] = os.getenv("BENCH_DATABASE_URL", _DEFAULT_URL)
+os.environ.pop("ASYNC_DATABASE_URL", None)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+from sqlalchemy import func, select
+
+import cache, database, http_cache, lean_listing, main as app_main, models
+import synthetic_data
+from latency import summarize
+
+DEFAULT_FIELDS = "id,name,price,image_url"
+
+
+def _variants(fields: str) -> dict:
+    variants = {
+        "full":      ({}, {"Accept-Encoding": "identity"}),
+        "lean":      ({"fields": fields}, {"Accept-Encoding": "identity"}),
+        "lean_gzip": ({"fields": fields}, {"Accept-Encoding": "gzip"}),
+    }
+    if lean_listing.brotli is not None:
+        variants["lean_br"] = ({"fields": fields}, {"Accept-Encoding": "br"})
+    return variants
+
+
+def _clear_caches():
+    cache.listing_cache.clear()
+    http_cache.validators.clear()
+
+
+async def run_variant(client: httpx.AsyncClient, params: dict, headers: dict, args, cold: bool) -> dict:
+    rng = random.Random(args.seed)
+    latencies: list[float] = []
+    wire_bytes: list[int] = []
+    errors = 0
+    remaining = iter(range(args.requests))
+
+    async def lane():
+        nonlocal errors
+        for _ in remaining:
+            skip = rng.randrange(args.pages) * args.limit
+            if cold:
+                _clear_caches()
+            started = time.perf_counter()
+            response = await client.get("/products", params={"limit": args.limit, "skip": skip, **params},
+                                        headers=headers)
+            latencies.append(time.perf_counter() - started)
+            if response.status_code != 200:
+                errors += 1
+            wire_bytes.append(response.num_bytes_downloaded)
+
+    _clear_caches()
+    started = time.perf_counter()
+    await asyncio.gather(*(lane() for _ in range(args.concurrency)))
+    elapsed = time.perf_counter() - started
+    return {
+        **summarize(latencies),
+        "requests_per_second": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        "avg_bytes": round(sum(wire_bytes) / len(wire_bytes)) if wire_bytes else 0,
+        "errors": errors,
+    }
+
+
+async def run(args) -> dict:
+    report = {}
+    transport = httpx.ASGITransport(app=app_main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as client:
+        for name, (params, headers) in _variants(args.fields).items():
+            await run_variant(client, params, headers, argparse.Namespace(**{**vars(args), "requests": 20}), False)
+            for mode in ("cold", "warm"):
+                report[f"{name}/{mode}"] = await run_variant(client, params, headers, args, mode == "cold")
+    return report
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=400, help="Requests per variant and mode")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--limit", type=int, default=50, help="Products per page")
+    parser.add_argument("--pages", type=int, default=40, help="Distinct pages the requests spread over")
+    parser.add_argument("--fields", default=DEFAULT_FIELDS, help="Sparse fieldset for the lean variants")
+    parser.add_argument("--scale", choices=sorted(synthetic_data.SCALES), default="small",
+                        help="Size of the generated catalog when the database is empty")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--json", action="store_true", help="Machine-readable output")
+    args = parser.parse_args()
+
+    app_main.init_db()
+    db = database.SessionLocal()
+    try:
+        empty = db.execute(select(func.count()).select_from(models.Product)).scalar_one() == 0
+    finally:
+        db.close()
+    if empty:
+        products, users, orders = synthetic_data.SCALES[args.scale]
+        log = (lambda *_: None) if args.json else print
+        synthetic_data.generate(products, users, orders, seed=args.seed, log=log)
+
+    report = asyncio.run(run(args))
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return 0
+
+    full = report["full/cold"]
+    print(f"\n{args.requests} requests per run, concurrency {args.concurrency}, {args.limit} products per page, "
+          f"fields={args.fields}\n")
+    print(f"{'variant':16} {'bytes':>9} {'size':>7} {'req/s':>9} {'speedup':>8} {'p50':>9} {'p95':>9} {'errors':>7}")
+    for name, r in report.items():
+        baseline = report["full/" + name.split("/")[1]]
+        print(f"{name:16} {r['avg_bytes']:>9} {r['avg_bytes'] / max(1, full['avg_bytes']):>7.1%} "
+              f"{r['requests_per_second']:>9.1f} {r['requests_per_second'] / max(0.01, baseline['requests_per_second']):>7.2f}x "
+              f"{r['p50_ms']:>7.1f}ms {r['p95_ms']:>7.1f}ms {r['errors']:>7}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
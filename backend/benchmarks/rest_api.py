@@ -0,0 +1,313 @@
+"""
+rest_api.py — Throughput and latency of the shop's REST endpoints
+
+Runs each scenario for --requests operations at --concurrency and reports
+requests/second, p50/p95/p99 and the status codes it saw:
+
+  products_list       GET /products?limit=20
+  products_category   GET /products?category=…&limit=20
+  products_search     GET /products?search=…&limit=20
+  products_paging     GET /products, then four more pages via X-Next-Cursor
+  product_detail      GET /products/{id}
+  products_revalidate GET /products?category=…&limit=20 with If-None-Match, as a
+                      browser or CDN revalidates a page it has cached
+  product_revalidate  GET /products/{id} with If-None-Match
+  cart_add            POST /cart
+  cart_view           GET /cart
+  cart_remove         DELETE /cart/{id}
+  orders_list         GET /orders?limit=20
+  checkout            POST /cart, then POST /orders
+
+By default it runs in-process (httpx ASGITransport) against a throwaway
+SQLite database filled by synthetic_data.py at --scale. Set
+BENCH_DATABASE_URL to use a prepared database (it is only generated into
+when it has no products), and --base-url to drive a running server instead;
+the server must share DATABASE_URL and SECRET_KEY, since bearer tokens for
+the benchmark users are minted locally.
+
+--output writes the results as JSON (run metadata, row counts, one entry
+per scenario). --compare checks them against an earlier file and exits
+non-zero when a scenario's p95 or throughput regressed by more than
+--tolerance.
+
+Usage (from backend/):
+    python benchmarks/rest_api.py --scale small --output bench.json
+    python benchmarks/rest_api.py --compare bench.json --tolerance 0.2
+    BENCH_DATABASE_URL=postgresql://… python benchmarks/rest_api.py --scenarios products_search,checkout
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from datetime import datetime
+
+_DEFAULT_URL = f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='rest-bench-'), 'bench.db')}"
+os.environ["DATABASE_URL"] = os.getenv("BENCH_DATABASE_URL", _DEFAULT_URL)
+os.environ.pop("ASYNC_DATABASE_URL", None)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+from sqlalchemy import func, select
+
+import auth, database, main as app_main, models
+import synthetic_data
+from latency import summarize
+
+PAGE = 20
+PAGING_DEPTH = 5
+
+
+class Context:
+    """Ids, tokens and query terms shared by the scenarios."""
+
+    def __init__(self, n_users: int, seed: int):
+        self.rng = random.Random(seed)
+        db = database.SessionLocal()
+        try:
+            users = db.execute(
+                select(models.User).where(models.User.role == "customer").order_by(models.User.id.desc()).limit(n_users)
+            ).scalars().all()
+            self.tokens = [auth.create_access_token(auth.user_claims(u)) for u in users]
+            self.product_ids = db.execute(
+                select(models.Product.id).where(models.Product.stock_quantity > 0).order_by(func.random()).limit(5000)
+            ).scalars().all()
+            # Checkout only buys products with plenty of stock, so 409s stay rare
+            self.stocked_ids = db.execute(
+                select(models.Product.id).where(models.Product.stock_quantity >= 200).order_by(func.random()).limit(2000)
+            ).scalars().all() or self.product_ids
+            self.categories = [c for c in db.execute(select(models.Product.category).distinct()).scalars() if c]
+        finally:
+            db.close()
+        if not self.tokens or not self.product_ids:
+            raise SystemExit("The benchmark database has no customers or no products in stock.")
+        self.terms = [n.split()[0].lower() for n in synthetic_data._NOUNS]
+        # Per-user queue of products cart_add put in, consumed by cart_remove
+        self.added: dict[int, list[int]] = defaultdict(list)
+        # ETag last seen per URL, for the revalidate scenarios
+        self.etags: dict[str, str] = {}
+
+    def headers(self, i: int) -> dict:
+        return {"Authorization": f"Bearer {self.tokens[i % len(self.tokens)]}"}
+
+    def product(self) -> int:
+        return self.rng.choice(self.product_ids)
+
+
+async def _products_paging(client: httpx.AsyncClient, ctx: Context, i: int) -> httpx.Response:
+    response = await client.get("/products", params={"limit": PAGE})
+    for _ in range(PAGING_DEPTH - 1):
+        cursor = response.headers.get("X-Next-Cursor")
+        if response.status_code != 200 or not cursor:
+            break
+        response = await client.get("/products", params={"limit": PAGE, "cursor": cursor})
+    return response
+
+
+async def _revalidate(client: httpx.AsyncClient, ctx: Context, url: str, params: dict = None) -> httpx.Response:
+    key = url + "?" + "&".join(f"{k}={v}" for k, v in sorted((params or {}).items()))
+    etag = ctx.etags.get(key)
+    response = await client.get(url, params=params, headers={"If-None-Match": etag} if etag else None)
+    if response.headers.get("ETag"):
+        ctx.etags[key] = response.headers["ETag"]
+    return response
+
+
+async def _cart_add(client: httpx.AsyncClient, ctx: Context, i: int) -> httpx.Response:
+    product_id = ctx.product()
+    ctx.added[i % len(ctx.tokens)].append(product_id)
+    return await client.post("/cart", json={"product_id": product_id, "quantity": 1}, headers=ctx.headers(i))
+
+
+async def _cart_remove(client: httpx.AsyncClient, ctx: Context, i: int) -> httpx.Response:
+    pending = ctx.added[i % len(ctx.tokens)]
+    product_id = pending.pop() if pending else ctx.product()
+    return await client.delete(f"/cart/{product_id}", headers=ctx.headers(i))
+
+
+async def _checkout(client: httpx.AsyncClient, ctx: Context, i: int) -> httpx.Response:
+    headers = ctx.headers(i)
+    added = await client.post(
+        "/cart", json={"product_id": ctx.rng.choice(ctx.stocked_ids), "quantity": 1}, headers=headers
+    )
+    if added.status_code != 200:
+        return added
+    return await client.post("/orders", json={"shipping_address": "1 Bench Rd"}, headers=headers)
+
+
+SCENARIOS = {
+    "products_list":     lambda c, ctx, i: c.get("/products", params={"limit": PAGE}),
+    "products_category": lambda c, ctx, i: c.get("/products", params={"limit": PAGE, "category": ctx.rng.choice(ctx.categories)}),
+    "products_search":   lambda c, ctx, i: c.get("/products", params={"limit": PAGE, "search": ctx.rng.choice(ctx.terms)}),
+    "products_paging":   _products_paging,
+    "product_detail":    lambda c, ctx, i: c.get(f"/products/{ctx.product()}"),
+    "products_revalidate": lambda c, ctx, i: _revalidate(c, ctx, "/products", {"limit": PAGE, "category": ctx.rng.choice(ctx.categories)}),
+    "product_revalidate":  lambda c, ctx, i: _revalidate(c, ctx, f"/products/{ctx.rng.choice(ctx.product_ids[:200])}"),
+    "cart_add":          _cart_add,
+    "cart_view":         lambda c, ctx, i: c.get("/cart", headers=ctx.headers(i)),
+    "cart_remove":       _cart_remove,
+    "orders_list":       lambda c, ctx, i: c.get("/orders", params={"limit": PAGE}, headers=ctx.headers(i)),
+    "checkout":          _checkout,
+}
+
+
+async def run_scenario(client: httpx.AsyncClient, ctx: Context, name: str, total: int, concurrency: int) -> dict:
+    operation = SCENARIOS[name]
+    latencies: list[float] = []
+    statuses: dict[str, int] = defaultdict(int)
+    next_index = iter(range(total))
+
+    # Each lane keeps to its own users so carts are not shared between concurrent operations
+    per_lane = max(1, len(ctx.tokens) // concurrency)
+
+    async def worker(lane: int):
+        for k, _ in enumerate(next_index):
+            user_slot = lane + concurrency * (k % per_lane)
+            started = time.perf_counter()
+            try:
+                response = await operation(client, ctx, user_slot)
+                statuses[str(response.status_code)] += 1
+            except httpx.HTTPError as exc:
+                statuses[type(exc).__name__] += 1
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(lane) for lane in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    ok = sum(n for status, n in statuses.items() if status.startswith("2") or status == "304")
+    return {
+        **summarize(latencies),
+        "elapsed_s": round(elapsed, 3),
+        "requests_per_second": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        "error_rate": round(1 - ok / len(latencies), 4) if latencies else 0.0,
+        "statuses": dict(statuses),
+    }
+
+
+async def run_all(names: list[str], ctx: Context, total: int, concurrency: int, base_url: str | None) -> dict:
+    if base_url:
+        client = httpx.AsyncClient(base_url=base_url, timeout=60)
+    else:
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app_main.app), base_url="http://bench", timeout=60)
+    results = {}
+    async with client:
+        # Warm connection pools, caches and the search index before timing
+        for name in names:
+            await run_scenario(client, ctx, name, min(20, total), min(4, concurrency))
+        for name in names:
+            results[name] = await run_scenario(client, ctx, name, total, concurrency)
+    return results
+
+
+def _row_counts() -> dict:
+    db = database.SessionLocal()
+    try:
+        return {
+            model.__tablename__: db.execute(select(func.count()).select_from(model)).scalar_one()
+            for model in (models.Product, models.User, models.CartItem, models.Order, models.OrderItem)
+        }
+    finally:
+        db.close()
+
+
+def _git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list[str]:
+    """Scenarios whose p95 grew or whose throughput fell by more than `tolerance`."""
+    regressions = []
+    for name, current in results["scenarios"].items():
+        before = baseline.get("scenarios", {}).get(name)
+        if not before:
+            continue
+        if before["p95_ms"] and current["p95_ms"] > before["p95_ms"] * (1 + tolerance):
+            regressions.append(f"{name}: p95 {before['p95_ms']}ms -> {current['p95_ms']}ms")
+        if before["requests_per_second"] and current["requests_per_second"] < before["requests_per_second"] * (1 - tolerance):
+            regressions.append(
+                f"{name}: throughput {before['requests_per_second']} -> {current['requests_per_second']} req/s"
+            )
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help="Comma-separated subset")
+    parser.add_argument("--requests", type=int, default=500, help="Operations per scenario")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--users", type=int, default=200, help="Benchmark users the operations rotate through")
+    parser.add_argument("--scale", choices=sorted(synthetic_data.SCALES), default="small",
+                        help="Synthetic data size, when the database has no products")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--base-url", help="Benchmark a running server instead of the in-process app")
+    parser.add_argument("--output", help="Write the JSON results here")
+    parser.add_argument("--json", action="store_true", help="Print the JSON results")
+    parser.add_argument("--compare", help="Baseline results file to check for regressions")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed relative regression (0.2 = 20%%)")
+    args = parser.parse_args()
+
+    names = [n.strip() for n in args.scenarios.split(",") if n.strip()]
+    unknown = [n for n in names if n not in SCENARIOS]
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(unknown)}")
+
+    app_main.init_db()
+    generated = None
+    if _row_counts()["products"] == 0:
+        products, users, orders = synthetic_data.SCALES[args.scale]
+        log = (lambda *_: None) if args.json else print
+        generated = synthetic_data.generate(products, users, orders, seed=args.seed, log=log)
+
+    ctx = Context(args.users, args.seed)
+    results = {
+        "benchmark": "rest_api",
+        "timestamp": datetime.utcnow().isoformat(timespec="seconds") + "Z",
+        "git_commit": _git_commit(),
+        "python": platform.python_version(),
+        "database": database.engine.dialect.name,
+        "target": args.base_url or "in-process",
+        "parameters": {"requests": args.requests, "concurrency": args.concurrency, "users": len(ctx.tokens),
+                       "scale": args.scale if generated else None, "seed": args.seed},
+        "rows": _row_counts(),
+        "scenarios": asyncio.run(run_all(names, ctx, args.requests, args.concurrency, args.base_url)),
+    }
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as fh:
+            json.dump(results, fh, indent=2)
+
+    regressions = []
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as fh:
+            regressions = compare(results, json.load(fh), args.tolerance)
+        results["regressions"] = regressions
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print(f"\ndatabase  {results['database']}  rows {results['rows']}")
+        print(f"load      {args.requests} operations per scenario, concurrency {args.concurrency}\n")
+        print(f"{'scenario':18} {'req/s':>9} {'p50':>9} {'p95':>9} {'p99':>9} {'errors':>7}")
+        for name, r in results["scenarios"].items():
+            print(f"{name:18} {r['requests_per_second']:>9.1f} {r['p50_ms']:>7.1f}ms {r['p95_ms']:>7.1f}ms "
+                  f"{r['p99_ms']:>7.1f}ms {r['error_rate']:>7.1%}")
+        if args.compare:
+            print("\nregressions:" if regressions else f"\nno regressions beyond {args.tolerance:.0%}")
+            for line in regressions:
+                print(f"  {line}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,291 @@
+"""
+synthetic_data.py — Bulk-load a large synthetic shop for benchmarking
+
+Unlike seed.py this never drops anything: it appends `--products` products,
+`--users` customers (all with the password "bench123"), a cart for a share
+of them and `--orders` orders with one to five items each, in batches of
+`--batch` rows through Core executemany. Primary keys are assigned here,
+so the run needs no round trip per row; PostgreSQL sequences are moved past
+them at the end. The sales rollups are rebuilt afterwards unless
+--skip-rollups is given.
+
+Data is deterministic for a given --seed: categories, prices and stock
+follow skewed distributions so filters and hot products behave like a real
+catalog, and product names use a small vocabulary so full-text searches
+return many candidates.
+
+Usage (from backend/), against DATABASE_URL:
+    python benchmarks/synthetic_data.py --products 1000000 --users 200000 --orders 500000
+    python benchmarks/synthetic_data.py --scale small      # 20k products, 2k users, 5k orders
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from array import array
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import func, insert, select, text
+
+import analytics, auth, database, models
+
+BENCH_PASSWORD = "bench123"
+
+SCALES = {
+    #          products,  users,   orders
+    "small":  (20_000,    2_000,   5_000),
+    "medium": (200_000,   20_000,  50_000),
+    "large":  (2_000_000, 200_000, 1_000_000),
+}
+
+CATEGORIES = [
+    "Electronics", "Clothing", "Home", "Sports", "Books", "Beauty", "Toys", "Grocery",
+    "Garden", "Automotive", "Footwear", "Accessories",
+]
+_ADJECTIVES = [
+    "Premium", "Classic", "Wireless", "Organic", "Compact", "Deluxe", "Smart", "Vintage",
+    "Ultra", "Eco", "Pro", "Lightweight", "Waterproof", "Portable", "Ergonomic", "Handmade",
+]
+_NOUNS = [
+    "Headphones", "Jacket", "Lamp", "Backpack", "Novel", "Serum", "Puzzle", "Coffee", "Planter",
+    "Charger", "Sneakers", "Watch", "Keyboard", "Blender", "Yoga Mat", "Sunglasses", "Speaker",
+    "Notebook", "Candle", "Bottle",
+]
+_STATUSES = ["Processing", "Shipped", "Delivered", "Delivered", "Delivered", "Cancelled"]
+
+
+def _max_id(conn, model) -> int:
+    return conn.execute(select(func.coalesce(func.max(model.id), 0))).scalar_one()
+
+
+def _insert_batches(conn, table, rows, batch: int) -> int:
+    buffer, total = [], 0
+    for row in rows:
+        buffer.append(row)
+        if len(buffer) >= batch:
+            conn.execute(insert(table), buffer)
+            total += len(buffer)
+            buffer = []
+    if buffer:
+        conn.execute(insert(table), buffer)
+        total += len(buffer)
+    return total
+
+
+def _category(rng: random.Random) -> str:
+    # Zipf-like: the first categories hold most of the catalog
+    return CATEGORIES[min(int(rng.paretovariate(1.2)) - 1, len(CATEGORIES) - 1)]
+
+
+def _products(rng: random.Random, first_id: int, count: int, run_tag: str, now: datetime):
+    for i in range(count):
+        pid = first_id + i
+        name = f"{rng.choice(_ADJECTIVES)} {rng.choice(_ADJECTIVES)} {rng.choice(_NOUNS)} {pid}"
+        yield {
+            "id": pid,
+            "name": name,
+            "description": f"{name} — {rng.choice(_ADJECTIVES).lower()} quality, ships in {rng.randint(1, 9)} days.",
+            "price": round(rng.lognormvariate(3.4, 0.9), 2),
+            "stock_quantity": 0 if rng.random() < 0.05 else rng.randint(1, 500),
+            "category": _category(rng),
+            "sku": f"SYN-{run_tag}-{pid}",
+            "created_at": now - timedelta(seconds=rng.randint(0, 365 * 86400)),
+        }
+
+
+def _users(first_id: int, count: int, run_tag: str, password_hash: str, now: datetime):
+    for i in range(count):
+        uid = first_id + i
+        yield {
+            "id": uid,
+            "email": f"bench-{run_tag}-{uid}@shop.com",
+            "password_hash": password_hash,
+            "full_name": f"Bench User {uid}",
+            "role": "customer",
+            "created_at": now,
+        }
+
+
+def _hot_product(rng: random.Random, product_ids: range) -> int:
+    # A tenth of the catalog gets most of the traffic
+    if rng.random() < 0.8:
+        return product_ids[rng.randrange(max(1, len(product_ids) // 10))]
+    return product_ids[rng.randrange(len(product_ids))]
+
+
+def _cart_items(rng: random.Random, first_id: int, user_ids: range, product_ids: range, share: float):
+    cid = first_id
+    for uid in user_ids:
+        if rng.random() >= share:
+            continue
+        for pid in {_hot_product(rng, product_ids) for _ in range(rng.randint(1, 4))}:
+            yield {"id": cid, "user_id": uid, "product_id": pid, "quantity": rng.randint(1, 3)}
+            cid += 1
+
+
+def _orders_and_items(rng, first_order_id, first_item_id, count, user_ids, product_ids, prices, now):
+    """Yield ("order", row) and ("item", row) pairs; totals match the items."""
+    item_id = first_item_id
+    for i in range(count):
+        oid = first_order_id + i
+        items = []
+        for pid in {_hot_product(rng, product_ids) for _ in range(rng.randint(1, 5))}:
+            qty = rng.randint(1, 3)
+            items.append({
+                "id": item_id, "order_id": oid, "product_id": pid, "quantity": qty,
+                "price_at_purchase": prices(pid),
+            })
+            item_id += 1
+        yield "order", {
+            "id": oid,
+            "user_id": user_ids[rng.randrange(len(user_ids))],
+            "total_amount": round(sum(it["price_at_purchase"] * it["quantity"] for it in items), 2),
+            "status": rng.choice(_STATUSES),
+            "shipping_address": f"{rng.randint(1, 9999)} Benchmark Ave",
+            "created_at": now - timedelta(seconds=rng.randint(0, 365 * 86400)),
+        }
+        for it in items:
+            yield "item", it
+
+
+def _sync_sequences(conn):
+    if conn.dialect.name != "postgresql":
+        return
+    for model in (models.Product, models.User, models.CartItem, models.Order, models.OrderItem):
+        table = model.__tablename__
+        conn.execute(text(
+            f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), "
+            f"(SELECT COALESCE(MAX(id), 1) FROM {table}))"
+        ))
+
+
+def generate(
+    products: int,
+    users: int,
+    orders: int,
+    cart_share: float = 0.3,
+    batch: int = 10_000,
+    seed: int = 42,
+    rollups: bool = True,
+    log=print,
+) -> dict:
+    """Append synthetic rows to the database; returns the id ranges and timings."""
+    rng = random.Random(seed)
+    run_tag = f"{seed}-{int(time.time())}"
+    now = datetime.utcnow()
+    password_hash = auth.get_password_hash(BENCH_PASSWORD)
+    report: dict = {"seed": seed, "tables": {}}
+
+    def timed(name: str, fn):
+        started = time.perf_counter()
+        rows = fn()
+        seconds = time.perf_counter() - started
+        report["tables"][name] = {"rows": rows, "seconds": round(seconds, 3),
+                                  "rows_per_second": round(rows / seconds) if seconds else rows}
+        log(f"{name:12} {rows:>10,} rows  {seconds:8.2f}s")
+
+    with database.engine.begin() as conn:
+        first_product = _max_id(conn, models.Product) + 1
+        first_user = _max_id(conn, models.User) + 1
+        first_cart = _max_id(conn, models.CartItem) + 1
+        first_order = _max_id(conn, models.Order) + 1
+        first_item = _max_id(conn, models.OrderItem) + 1
+
+    product_ids = range(first_product, first_product + products)
+    user_ids = range(first_user, first_user + users)
+    # Prices are needed again for order items; keep them compactly instead of re-querying
+    prices = array("d")
+
+    def load_products():
+        with database.engine.begin() as conn:
+            def rows():
+                for row in _products(rng, first_product, products, run_tag, now):
+                    prices.append(row["price"])
+                    yield row
+            return _insert_batches(conn, models.Product.__table__, rows(), batch)
+
+    def load_users():
+        with database.engine.begin() as conn:
+            return _insert_batches(conn, models.User.__table__, _users(first_user, users, run_tag, password_hash, now), batch)
+
+    def load_carts():
+        with database.engine.begin() as conn:
+            return _insert_batches(conn, models.CartItem.__table__,
+                                   _cart_items(rng, first_cart, user_ids, product_ids, cart_share), batch)
+
+    def load_orders():
+        order_rows, item_rows, total = [], [], 0
+        with database.engine.begin() as conn:
+            for kind, row in _orders_and_items(rng, first_order, first_item, orders, user_ids, product_ids,
+                                               lambda pid: prices[pid - first_product], now):
+                (order_rows if kind == "order" else item_rows).append(row)
+                if len(item_rows) >= batch:
+                    total += _flush_orders(conn, order_rows, item_rows)
+                    order_rows, item_rows = [], []
+            total += _flush_orders(conn, order_rows, item_rows)
+        return total
+
+    timed("products", load_products)
+    timed("users", load_users)
+    timed("cart_items", load_carts)
+    timed("orders+items", load_orders)
+    with database.engine.begin() as conn:
+        _sync_sequences(conn)
+
+    if rollups and orders:
+        db = database.SessionLocal()
+        try:
+            def rebuild_rollups():
+                analytics.rebuild(db)
+                return db.execute(select(func.count()).select_from(models.SalesDailyProduct)).scalar_one()
+            timed("rollups", rebuild_rollups)
+        finally:
+            db.close()
+
+    report["product_ids"] = [product_ids.start, product_ids.stop - 1] if products else []
+    report["user_ids"] = [user_ids.start, user_ids.stop - 1] if users else []
+    report["user_email_pattern"] = f"bench-{run_tag}-{{id}}@shop.com"
+    return report
+
+
+def _flush_orders(conn, order_rows: list[dict], item_rows: list[dict]) -> int:
+    if order_rows:
+        conn.execute(insert(models.Order.__table__), order_rows)
+    if item_rows:
+        conn.execute(insert(models.OrderItem.__table__), item_rows)
+    return len(order_rows)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", choices=sorted(SCALES), help="Preset sizes (overridden by explicit counts)")
+    parser.add_argument("--products", type=int)
+    parser.add_argument("--users", type=int)
+    parser.add_argument("--orders", type=int)
+    parser.add_argument("--cart-share", type=float, default=0.3, help="Fraction of users with a cart")
+    parser.add_argument("--batch", type=int, default=10_000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--skip-rollups", action="store_true")
+    args = parser.parse_args()
+
+    products, users, orders = SCALES[args.scale or "small"]
+    products = args.products if args.products is not None else products
+    users = args.users if args.users is not None else users
+    orders = args.orders if args.orders is not None else orders
+    if orders and not (products and users):
+        parser.error("orders need at least one product and one user")
+
+    import main as app_main  # schema, late columns, indexes and the search index
+    app_main.init_db()
+
+    print(f"database     {database.engine.url.render_as_string(hide_password=True)}")
+    report = generate(products, users, orders, args.cart_share, args.batch, args.seed, not args.skip_rollups)
+    print(f"users log in as {report['user_email_pattern']} / {BENCH_PASSWORD}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
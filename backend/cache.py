@@ -0,0 +1,169 @@
+"""
+In-process catalog and user caches.
+
+Product rows and whole listing pages are cached as immutable
+`schemas.ProductResponse` snapshots, authenticated users as
+`schemas.UserResponse` snapshots (never live ORM objects, which are bound
+to a session). Any insert/update/delete of a Product — including stock
+changes — or of a User invalidates the affected entries via SQLAlchemy mapper
+events; code that changes rows with bulk UPDATE statements must call
+`invalidate_product` / `invalidate_user` itself.
+
+Every product invalidation also bumps `catalog_version()`, which lets
+http_cache answer conditional requests without looking anything up while
+the catalog is unchanged.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session, object_session
+
+import models, schemas
+
+_MISSING = object()
+
+
+class TTLCache:
+    """Thread-safe LRU cache whose entries also expire after `ttl` seconds."""
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 60.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is not _MISSING:
+                expires_at, value = entry
+                if expires_at > time.monotonic():
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+            self.misses += 1
+            return default
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            }
+
+
+_TTL = float(os.getenv("CATALOG_CACHE_TTL", "60"))
+
+product_cache = TTLCache(maxsize=int(os.getenv("PRODUCT_CACHE_SIZE", "4096")), ttl=_TTL)
+listing_cache = TTLCache(maxsize=int(os.getenv("LISTING_CACHE_SIZE", "512")), ttl=_TTL)
+user_cache    = TTLCache(
+    maxsize=int(os.getenv("USER_CACHE_SIZE", "10000")),
+    ttl=float(os.getenv("USER_CACHE_TTL", "30")),
+)
+
+
+def snapshot(product: models.Product) -> schemas.ProductResponse:
+    return schemas.ProductResponse.model_validate(product)
+
+
+def listing_key(skip: int, limit: int, category: str = None, search: str = None, cursor: str = None) -> tuple:
+    return (category, search, skip, limit, cursor)
+
+
+_catalog_version = 0
+_version_lock = threading.Lock()
+
+
+def catalog_version() -> int:
+    """Bumped by every product change this process sees."""
+    return _catalog_version
+
+
+def invalidate_product(product_id: int = None):
+    """Drop a product row (or every row when `product_id` is None) and all listing pages."""
+    global _catalog_version
+    if product_id is None:
+        product_cache.clear()
+    else:
+        product_cache.pop(product_id)
+    listing_cache.clear()
+    # After the entries are gone: a reader that sees the new version cannot get a stale page
+    with _version_lock:
+        _catalog_version += 1
+
+
+def invalidate_user(user_id: int = None):
+    if user_id is None:
+        user_cache.clear()
+    else:
+        user_cache.pop(user_id)
+
+
+def stats() -> dict:
+    return {
+        "products": product_cache.stats(),
+        "listings": listing_cache.stats(),
+        "users":    user_cache.stats(),
+        "catalog_version": _catalog_version,
+    }
+
+
+@event.listens_for(models.Product, "after_insert")
+@event.listens_for(models.Product, "after_update")
+@event.listens_for(models.Product, "after_delete")
+def _on_product_change(mapper, connection, target):
+    invalidate_product(target.id)
+    # Invalidate again once the change is visible, so a concurrent reader that
+    # repopulated the cache between flush and commit cannot pin a stale row.
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault("changed_products", set()).add(target.id)
+
+
+@event.listens_for(models.User, "after_update")
+@event.listens_for(models.User, "after_delete")
+def _on_user_change(mapper, connection, target):
+    invalidate_user(target.id)
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault("changed_users", set()).add(target.id)
+
+
+@event.listens_for(Session, "after_commit")
+def _on_commit(session):
+    for product_id in session.info.pop("changed_products", ()):
+        invalidate_product(product_id)
+    for user_id in session.info.pop("changed_users", ()):
+        invalidate_user(user_id)
+
+
+@event.listens_for(Session, "after_rollback")
+def _on_rollback(session):
+    session.info.pop("changed_products", None)
+    session.info.pop("changed_users", None)
@@ -0,0 +1,330 @@
+"""
+Streaming bulk catalog import.
+
+Reads a supplier catalog as CSV (header row) or JSON Lines and upserts it
+into `products` by SKU, the natural key. Rows flow through in chunks, so
+memory stays bounded by the chunk size whatever the size of the file:
+
+  1. parse `chunk_size` rows from the stream
+  2. validate them against `schemas.ProductCreate` in one call, re-checking
+     row by row only when the chunk has errors
+  3. upsert the valid rows in one statement per chunk and commit:
+       • PostgreSQL + psycopg2 — COPY into a temp table, then INSERT … SELECT
+         … ON CONFLICT (sku) DO UPDATE
+       • PostgreSQL / SQLite   — executemany INSERT … ON CONFLICT (sku)
+       • anything else         — executemany UPDATE, then INSERT of new SKUs
+
+Each chunk commits on its own, so an interrupted import keeps the chunks that
+already landed and can simply be re-run. The report counts inserted, updated
+and rejected rows (with line numbers and validation errors) and throughput.
+
+    python catalog_import.py products.csv
+    python catalog_import.py products.jsonl --chunk-size 5000
+    python catalog_import.py products.csv --dry-run     # validate only
+"""
+import csv
+import io
+import json
+import os
+import time
+from datetime import datetime
+from typing import Callable, Iterator, TextIO
+
+from pydantic import TypeAdapter, ValidationError
+from sqlalchemy import bindparam, insert, select, text, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+import cache, models, schemas
+
+DEFAULT_CHUNK_SIZE = int(os.getenv("IMPORT_CHUNK_SIZE", "1000"))
+MAX_CHUNK_SIZE = 10000
+MAX_REJECTIONS = 100  # rejected rows listed in the report; all are counted
+
+FORMATS = ("csv", "jsonl")
+_EXTENSIONS = {".csv": "csv", ".jsonl": "jsonl", ".ndjson": "jsonl"}
+
+_COLUMNS = ("sku", "name", "description", "price", "stock_quantity", "category", "image_url")
+_UPDATED = _COLUMNS[1:]
+
+_validate_chunk = TypeAdapter(list[schemas.ProductCreate]).validate_python
+
+
+def detect_format(filename: str | None) -> str:
+    """Infer the input format from a file name; raises ValueError if unknown."""
+    ext = os.path.splitext(filename or "")[1].lower()
+    if ext not in _EXTENSIONS:
+        raise ValueError("Cannot infer the import format; pass format=csv or format=jsonl")
+    return _EXTENSIONS[ext]
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Parsing
+# ─────────────────────────────────────────────────────────────────────────────
+
+def _iter_csv(stream: TextIO) -> Iterator[tuple[int, dict | None, str | None]]:
+    reader = csv.DictReader(stream)
+    try:
+        for row in reader:
+            # Empty cells mean "not given", not an empty string
+            yield reader.line_num, {k: (v if v != "" else None) for k, v in row.items() if k}, None
+    except csv.Error as exc:
+        raise ValueError(f"line {reader.line_num}: {exc}") from exc
+
+
+def _iter_jsonl(stream: TextIO) -> Iterator[tuple[int, dict | None, str | None]]:
+    for line_no, line in enumerate(stream, start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except json.JSONDecodeError as exc:
+            yield line_no, None, f"invalid JSON: {exc.msg}"
+            continue
+        if not isinstance(row, dict):
+            yield line_no, None, "expected a JSON object"
+            continue
+        yield line_no, row, None
+
+
+def _chunks(rows: Iterator, size: int) -> Iterator[list]:
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Validation
+# ─────────────────────────────────────────────────────────────────────────────
+
+def _error_text(error: dict) -> str:
+    field = ".".join(str(part) for part in error["loc"])
+    return f"{field}: {error['msg']}" if field else error["msg"]
+
+
+def _validate(parsed: list[tuple[int, dict, None]]) -> tuple[list[dict], list[tuple[int, dict, list[str]]]]:
+    """Split a chunk of parsed rows into valid product dicts and (line, row, errors) rejections."""
+    raw = [row for _, row, _ in parsed]
+    try:
+        products = _validate_chunk(raw)
+        errors_by_row: dict[int, list[str]] = {}
+    except ValidationError as exc:
+        # Only a chunk with errors pays for per-row bookkeeping
+        products = None
+        errors_by_row = {}
+        for error in exc.errors():
+            index, *loc = error["loc"]
+            errors_by_row.setdefault(index, []).append(_error_text({**error, "loc": loc}))
+
+    valid, rejected = [], []
+    for index, (line_no, row, _) in enumerate(parsed):
+        errors = list(errors_by_row.get(index, ()))
+        product = None
+        if not errors:
+            product = products[index] if products is not None else schemas.ProductCreate.model_validate(row)
+            if not (product.sku or "").strip():
+                errors.append("sku: required for import")
+            if product.price < 0:
+                errors.append("price: must not be negative")
+            if product.stock_quantity < 0:
+                errors.append("stock_quantity: must not be negative")
+        if errors:
+            rejected.append((line_no, row, errors))
+        else:
+            values = product.model_dump(include=set(_COLUMNS))
+            values["sku"] = values["sku"].strip()
+            valid.append(values)
+    return valid, rejected
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Upsert
+# ─────────────────────────────────────────────────────────────────────────────
+
+def _copy_upsert(db: Session, rows: list[dict]):
+    """COPY the chunk into a session-local staging table and merge it in one statement."""
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows([row[c] for c in _COLUMNS] for row in rows)
+    buffer.seek(0)
+
+    columns = ", ".join(_COLUMNS)
+    raw = db.connection().connection.driver_connection
+    with raw.cursor() as cur:
+        cur.execute(
+            "CREATE TEMP TABLE IF NOT EXISTS products_import ("
+            "sku text, name text, description text, price double precision, "
+            "stock_quantity integer, category text, image_url text"
+            ") ON COMMIT DELETE ROWS"
+        )
+        cur.copy_expert(f"COPY products_import ({columns}) FROM STDIN WITH (FORMAT csv)", buffer)
+    db.execute(text(
+        f"INSERT INTO products ({columns}, created_at, updated_at) "
+        f"SELECT {columns}, timezone('utc', now()), timezone('utc', now()) FROM products_import "
+        f"ON CONFLICT (sku) DO UPDATE SET "
+        + ", ".join(f"{c} = EXCLUDED.{c}" for c in _UPDATED)
+        + ", updated_at = EXCLUDED.updated_at"
+    ))
+
+
+def _upsert(db: Session, rows: list[dict], existing: set[str]):
+    table = models.Product.__table__
+    bind = db.get_bind()
+    dialect = bind.dialect.name
+
+    if dialect == "postgresql" and bind.dialect.driver == "psycopg2":
+        _copy_upsert(db, rows)
+        return
+    if dialect in ("postgresql", "sqlite"):
+        insert_fn = postgresql.insert if dialect == "postgresql" else sqlite.insert
+        stmt = insert_fn(table)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["sku"],
+            # ON CONFLICT DO UPDATE does not apply the column's onupdate
+            set_={**{c: stmt.excluded[c] for c in _UPDATED}, "updated_at": datetime.utcnow()},
+        )
+        db.execute(stmt, rows)
+        return
+
+    updates = [{**row, "b_sku": row["sku"]} for row in rows if row["sku"] in existing]
+    inserts = [row for row in rows if row["sku"] not in existing]
+    if updates:
+        db.execute(
+            update(table)
+            .where(table.c.sku == bindparam("b_sku"))
+            .values({c: bindparam(c) for c in _UPDATED}),
+            updates,
+        )
+    if inserts:
+        db.execute(insert(table), inserts)
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Driver
+# ─────────────────────────────────────────────────────────────────────────────
+
+def import_products(
+    db: Session,
+    stream: TextIO,
+    fmt: str = "csv",
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    dry_run: bool = False,
+    on_chunk: Callable[[dict], None] = None,
+) -> dict:
+    """
+    Stream `stream` into the catalog and return an import report
+    (see `schemas.ImportReport`). Raises ValueError for an unknown format or
+    input that cannot be parsed at all (bad encoding, broken CSV quoting).
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Unsupported import format '{fmt}'; expected one of {', '.join(FORMATS)}")
+    chunk_size = max(1, min(chunk_size, MAX_CHUNK_SIZE))
+    rows_iter = _iter_csv(stream) if fmt == "csv" else _iter_jsonl(stream)
+
+    report = {
+        "rows": 0, "inserted": 0, "updated": 0, "rejected": 0, "duplicates": 0,
+        "chunks": 0, "seconds": 0.0, "rows_per_second": 0.0,
+        "dry_run": dry_run, "rejections": [],
+    }
+
+    def reject(line_no: int, row: dict | None, errors: list[str]):
+        report["rejected"] += 1
+        if len(report["rejections"]) < MAX_REJECTIONS:
+            sku = row.get("sku") if row else None
+            report["rejections"].append({
+                "line": line_no,
+                "sku": str(sku) if sku is not None else None,
+                "errors": errors,
+            })
+
+    started = time.perf_counter()
+    try:
+        for chunk in _chunks(rows_iter, chunk_size):
+            report["rows"] += len(chunk)
+            parsed = []
+            for line_no, row, error in chunk:
+                if error:
+                    reject(line_no, row, [error])
+                else:
+                    parsed.append((line_no, row, None))
+
+            valid, rejected = _validate(parsed) if parsed else ([], [])
+            for line_no, row, errors in rejected:
+                reject(line_no, row, errors)
+
+            # A SKU repeated within a chunk: the last occurrence wins
+            by_sku = {row["sku"]: row for row in valid}
+            report["duplicates"] += len(valid) - len(by_sku)
+            rows = list(by_sku.values())
+
+            if rows:
+                existing = set(db.execute(
+                    select(models.Product.sku).where(models.Product.sku.in_(by_sku))
+                ).scalars())
+                if not dry_run:
+                    try:
+                        _upsert(db, rows, existing)
+                        db.commit()
+                    except Exception:
+                        db.rollback()
+                        raise
+                    # Bulk statements bypass the mapper events that keep the cache fresh
+                    cache.invalidate_product()
+                report["updated"] += len(existing)
+                report["inserted"] += len(rows) - len(existing)
+
+            report["chunks"] += 1
+            if on_chunk:
+                on_chunk(report)
+    finally:
+        elapsed = time.perf_counter() - started
+        report["seconds"] = round(elapsed, 3)
+        report["rows_per_second"] = round(report["rows"] / elapsed, 1) if elapsed else 0.0
+    return report
+
+
+if __name__ == "__main__":
+    import argparse
+    import sys
+    import product_search
+    from database import SessionLocal, engine
+
+    parser = argparse.ArgumentParser(description="Bulk-import a product catalog (CSV or JSON Lines), upserting by SKU.")
+    parser.add_argument("path", help="Catalog file, or - for stdin")
+    parser.add_argument("--format", choices=FORMATS, help="Input format (default: from the file extension)")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="Rows per validation/upsert batch")
+    parser.add_argument("--dry-run", action="store_true", help="Validate and count without writing")
+    args = parser.parse_args()
+
+    fmt = args.format or detect_format(args.path)
+    models.Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        product_search.ensure_search_index(conn)
+    session = SessionLocal()
+    source = (
+        io.TextIOWrapper(sys.stdin.buffer, encoding="utf-8-sig", newline="") if args.path == "-"
+        else open(args.path, encoding="utf-8-sig", newline="")
+    )
+
+    def progress(r: dict):
+        print(f"  chunk {r['chunks']}: {r['rows']} rows, {r['inserted']} new, "
+              f"{r['updated']} updated, {r['rejected']} rejected", file=sys.stderr)
+
+    try:
+        result = import_products(session, source, fmt, args.chunk_size, args.dry_run, on_chunk=progress)
+    finally:
+        source.close()
+        session.close()
+
+    for rejection in result["rejections"]:
+        print(f"  ✗ line {rejection['line']} ({rejection['sku'] or 'no sku'}): {'; '.join(rejection['errors'])}", file=sys.stderr)
+    print(
+        f"✅ {'Validated' if args.dry_run else 'Imported'} {result['rows']} rows in {result['seconds']}s "
+        f"({result['rows_per_second']} rows/s): {result['inserted']} new, {result['updated']} updated, "
+        f"{result['rejected']} rejected, {result['duplicates']} duplicate SKUs"
+    )
+    sys.exit(1 if result["rejected"] else 0)
@@ -0,0 +1,187 @@
+"""
+Server-side conversation sessions for /chat.
+
+The client sends only the new message plus a `session_id`; the server keeps
+the last HISTORY_WINDOW messages of the conversation and their formatted
+"Customer: … / Assistant: …" lines, appending the new turn after every reply
+instead of re-parsing the whole history on each request.
+
+Sessions expire after CHAT_SESSION_TTL seconds without a turn. The backend is
+chosen with CHAT_SESSION_BACKEND:
+
+  • memory (default) — an LRU in this process (cache.TTLCache); sessions are
+    lost on restart and not shared between workers
+  • db               — the `chat_sessions` table, for multi-worker deployments
+"""
+import json
+import os
+import secrets
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, select
+
+import cache, database, models
+
+# The agents only ever see this many of the most recent messages
+HISTORY_WINDOW = 10
+
+SESSION_TTL = float(os.getenv("CHAT_SESSION_TTL", "1800"))
+SESSION_BACKEND = os.getenv("CHAT_SESSION_BACKEND", "memory").lower()
+MAX_MEMORY_SESSIONS = int(os.getenv("CHAT_SESSION_CACHE_SIZE", "10000"))
+
+# The DB backend deletes expired rows once every this many saves
+_PURGE_EVERY = 200
+
+
+def history_line(message: dict) -> str:
+    role = "Customer" if message.get("role") == "user" else "Assistant"
+    return f"{role}: {message.get('content', '')}"
+
+
+class ChatSession:
+    """One conversation: its recent messages and their formatted history lines."""
+
+    def __init__(self, session_id: str, user_id: int, messages: list[dict] = None):
+        self.id = session_id
+        self.user_id = user_id
+        self.messages: list[dict] = [
+            {"role": m.get("role", "user"), "content": m.get("content", "")}
+            for m in (messages or [])[-HISTORY_WINDOW:]
+        ]
+        self._lines = [history_line(m) for m in self.messages]
+
+    @property
+    def history_str(self) -> str:
+        return "\n".join(self._lines)
+
+    def append(self, role: str, content: str):
+        message = {"role": role, "content": content}
+        self.messages.append(message)
+        self._lines.append(history_line(message))
+        overflow = len(self.messages) - HISTORY_WINDOW
+        if overflow > 0:
+            del self.messages[:overflow]
+            del self._lines[:overflow]
+
+    def record_turn(self, user_content: str, reply: str):
+        self.append("user", user_content)
+        self.append("assistant", reply)
+
+    def copy(self) -> "ChatSession":
+        clone = ChatSession.__new__(ChatSession)
+        clone.id, clone.user_id = self.id, self.user_id
+        clone.messages, clone._lines = list(self.messages), list(self._lines)
+        return clone
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Backends
+# ─────────────────────────────────────────────────────────────────────────────
+
+class MemorySessionStore:
+    """Process-local LRU; every save restarts the session's TTL."""
+
+    def __init__(self, maxsize: int = MAX_MEMORY_SESSIONS, ttl: float = SESSION_TTL):
+        self._cache = cache.TTLCache(maxsize=maxsize, ttl=ttl)
+
+    async def get(self, session_id: str) -> ChatSession | None:
+        session = self._cache.get(session_id)
+        # Hand out copies so two requests on one session never share a list
+        return session.copy() if session is not None else None
+
+    async def save(self, session: ChatSession):
+        self._cache.set(session.id, session.copy())
+
+    async def delete(self, session_id: str):
+        self._cache.pop(session_id)
+
+    def stats(self) -> dict:
+        return {"backend": "memory", **self._cache.stats()}
+
+
+class DatabaseSessionStore:
+    """`chat_sessions` table, one row per session, shared by all workers."""
+
+    def __init__(self, ttl: float = SESSION_TTL):
+        self.ttl = ttl
+        self._saves = 0
+
+    def _sessionmaker(self):
+        if database.AsyncSessionLocal is None:
+            raise RuntimeError("The db chat session backend needs an async database driver.")
+        return database.AsyncSessionLocal
+
+    async def get(self, session_id: str) -> ChatSession | None:
+        async with self._sessionmaker()() as db:
+            row = (await db.execute(
+                select(models.ChatSession).where(
+                    models.ChatSession.id == session_id,
+                    models.ChatSession.expires_at > datetime.utcnow(),
+                )
+            )).scalar_one_or_none()
+        if row is None:
+            return None
+        return ChatSession(row.id, row.user_id, json.loads(row.messages))
+
+    async def save(self, session: ChatSession):
+        now = datetime.utcnow()
+        async with self._sessionmaker()() as db:
+            await db.merge(models.ChatSession(
+                id=session.id,
+                user_id=session.user_id,
+                messages=json.dumps(session.messages, ensure_ascii=False),
+                updated_at=now,
+                expires_at=now + timedelta(seconds=self.ttl),
+            ))
+            self._saves += 1
+            if self._saves % _PURGE_EVERY == 0:
+                await db.execute(delete(models.ChatSession).where(models.ChatSession.expires_at <= now))
+            await db.commit()
+
+    async def delete(self, session_id: str):
+        async with self._sessionmaker()() as db:
+            await db.execute(delete(models.ChatSession).where(models.ChatSession.id == session_id))
+            await db.commit()
+
+    def stats(self) -> dict:
+        return {"backend": "db", "ttl": self.ttl, "saves": self._saves}
+
+
+def _make_store():
+    if SESSION_BACKEND == "db":
+        return DatabaseSessionStore()
+    if SESSION_BACKEND != "memory":
+        raise ValueError(f"Unknown CHAT_SESSION_BACKEND '{SESSION_BACKEND}'; expected 'memory' or 'db'")
+    return MemorySessionStore()
+
+
+store = _make_store()
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# API used by the /chat routes
+# ─────────────────────────────────────────────────────────────────────────────
+
+async def load(session_id: str | None, user_id: int, history: list[dict] = None) -> ChatSession:
+    """
+    The caller's session, or a new one when the id is unknown, expired or
+    belongs to another user. A new session is seeded from `history` so clients
+    that still send the full history keep working.
+    """
+    if session_id:
+        session = await store.get(session_id)
+        if session is not None and session.user_id == user_id:
+            return session
+    return ChatSession(secrets.token_urlsafe(16), user_id, history)
+
+
+async def save(session: ChatSession):
+    await store.save(session)
+
+
+async def discard(session_id: str, user_id: int) -> bool:
+    session = await store.get(session_id)
+    if session is None or session.user_id != user_id:
+        return False
+    await store.delete(session_id)
+    return True
@@ -0,0 +1,93 @@
+"""
+Single-transaction checkout engine.
+
+`place_order` turns a user's cart into an order with one commit:
+
+  1. read the cart lines (product_id, quantity) grouped per product
+  2. convert the user's stock holds into sales (inventory.convert) — ONE
+     guarded UPDATE for every line, with the free stock re-checked under the
+     row lock for units the holds do not cover, so concurrent checkouts can
+     never oversell; if any line is short the whole transaction is rolled back
+  3. compute the total in SQL and insert the order
+  4. bulk-insert the order items with INSERT … SELECT from the cart
+  5. clear the cart
+
+The sales rollups are not touched here: analytics.run_refresh rebuilds them
+in the background.
+
+Used by both `POST /orders` (through crud_async / AsyncSession.run_sync) and
+the agent's `perform_checkout` tool (through crud.create_order).
+"""
+from sqlalchemy import delete, func, insert, literal, select
+from sqlalchemy.orm import Session
+
+import cache, inventory, models
+
+
+# Raised by place_order; lives with the reservations that also raise it
+InsufficientStockError = inventory.InsufficientStockError
+
+
+def _cart_lines(user_id: int):
+    return (
+        select(
+            models.CartItem.product_id,
+            func.sum(models.CartItem.quantity).label("quantity"),
+        )
+        .where(models.CartItem.user_id == user_id)
+        .group_by(models.CartItem.product_id)
+    )
+
+
+def place_order(db: Session, user_id: int, shipping_address: str):
+    """Check out the user's cart. Returns the new Order, or None if the cart is empty."""
+    lines = db.execute(_cart_lines(user_id)).all()
+    if not lines:
+        return None
+
+    try:
+        inventory.convert(db, user_id, {line.product_id: line.quantity for line in lines})
+
+        total_amount = db.execute(
+            select(func.sum(models.CartItem.quantity * models.Product.price))
+            .join(models.Product, models.Product.id == models.CartItem.product_id)
+            .where(models.CartItem.user_id == user_id)
+        ).scalar_one()
+
+        db_order = models.Order(
+            user_id=user_id,
+            total_amount=total_amount,
+            shipping_address=shipping_address,
+        )
+        db.add(db_order)
+        db.flush()
+
+        db.execute(
+            insert(models.OrderItem).from_select(
+                ["order_id", "product_id", "quantity", "price_at_purchase"],
+                select(
+                    literal(db_order.id).label("order_id"),
+                    models.CartItem.product_id,
+                    func.sum(models.CartItem.quantity),
+                    models.Product.price,
+                )
+                .join(models.Product, models.Product.id == models.CartItem.product_id)
+                .where(models.CartItem.user_id == user_id)
+                .group_by(models.CartItem.product_id, models.Product.price),
+            )
+        )
+        db.execute(
+            delete(models.CartItem)
+            .where(models.CartItem.user_id == user_id)
+            .execution_options(synchronize_session=False)
+        )
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+
+    # The bulk UPDATE bypasses the mapper events that normally invalidate the cache
+    for line in lines:
+        cache.invalidate_product(line.product_id)
+    return db_order
+
@@ -1,5 +1,6 @@
-from sqlalchemy.orm import Session
-import models, schemas, auth
+from sqlalchemy import bindparam, func, insert, select, update
+from sqlalchemy.orm import Session, selectinload
+import models, schemas, auth, cache, checkout, inventory, pagination, product_search
 
 # User CRUD
 def get_user_by_email(db: Session, email: str):
@@ -19,16 +20,32 @@ def create_user(db: Session, user: schemas.UserCreate):
     return db_user
 
 # Product CRUD
-def get_products(db: Session, skip: int = 0, limit: int = 100, category: str = None, search: str = None):
+def get_products(db: Session, skip: int = 0, limit: int = 100, category: str = None, search: str = None, cursor: str = None):
+    key = cache.listing_key(skip, limit, category, search, cursor)
+    cached = cache.listing_cache.get(key)
+    if cached is not None:
+        return list(cached)
     query = db.query(models.Product)
     if category:
         query = query.filter(models.Product.category == category)
-    if search:
-        query = query.filter(models.Product.name.contains(search) | models.Product.description.contains(search))
-    return query.offset(skip).limit(limit).all()
+    ranked = product_search.has_terms(search)
+    if ranked:
+        query = product_search.apply_search(query, search, db.get_bind().dialect.name)
+    query = pagination.paginate(query, models.Product, pagination.decode_cursor(cursor), skip, ranked=ranked)
+    products = tuple(cache.snapshot(p) for p in query.limit(limit).all())
+    cache.listing_cache.set(key, products)
+    return list(products)
 
 def get_product(db: Session, product_id: int):
-    return db.query(models.Product).filter(models.Product.id == product_id).first()
+    cached = cache.product_cache.get(product_id)
+    if cached is not None:
+        return cached
+    product = db.query(models.Product).filter(models.Product.id == product_id).first()
+    if product is None:
+        return None
+    cached = cache.snapshot(product)
+    cache.product_cache.set(product_id, cached)
+    return cached
 
 def create_product(db: Session, product: schemas.ProductCreate):
     db_product = models.Product(**product.dict())
@@ -39,22 +56,84 @@ def create_product(db: Session, product: schemas.ProductCreate):
 
 # Cart CRUD
 def get_cart_items(db: Session, user_id: int):
-    return db.query(models.CartItem).filter(models.CartItem.user_id == user_id).all()
+    return (
+        db.query(models.CartItem)
+        .options(selectinload(models.CartItem.product))
+        .filter(models.CartItem.user_id == user_id)
+        .all()
+    )
 
 def add_to_cart(db: Session, user_id: int, item: schemas.CartItemCreate):
-    db_item = db.query(models.CartItem).filter(
-        models.CartItem.user_id == user_id, 
-        models.CartItem.product_id == item.product_id
-    ).first()
-    if db_item:
-        db_item.quantity += item.quantity
-    else:
-        db_item = models.CartItem(user_id=user_id, **item.dict())
-        db.add(db_item)
-    db.commit()
+    """Raises checkout.InsufficientStockError if the units cannot be held for the cart."""
+    try:
+        inventory.reserve(db, user_id, {item.product_id: item.quantity})
+        db_item = db.query(models.CartItem).filter(
+            models.CartItem.user_id == user_id,
+            models.CartItem.product_id == item.product_id
+        ).first()
+        if db_item:
+            db_item.quantity += item.quantity
+        else:
+            db_item = models.CartItem(user_id=user_id, **item.dict())
+            db.add(db_item)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
     db.refresh(db_item)
     return db_item
 
+def add_items_to_cart(db: Session, user_id: int, items: list[schemas.CartItemCreate]):
+    """
+    Add several products in one transaction: every line is held
+    (inventory.reserve), then all cart rows are updated/inserted with one
+    executemany each and a single commit.
+    Raises checkout.InsufficientStockError if any line is unknown or short.
+    Returns the affected cart rows with their products loaded.
+    """
+    wanted: dict[int, int] = {}
+    for item in items:
+        wanted[item.product_id] = wanted.get(item.product_id, 0) + item.quantity
+
+    try:
+        inventory.reserve(db, user_id, wanted)
+        in_cart = dict(db.execute(
+            select(models.CartItem.product_id, func.min(models.CartItem.id))
+            .where(models.CartItem.user_id == user_id, models.CartItem.product_id.in_(wanted))
+            .group_by(models.CartItem.product_id)
+        ).all())
+
+        table = models.CartItem.__table__
+        updates = [
+            {"b_id": in_cart[pid], "b_add": qty}
+            for pid, qty in wanted.items() if pid in in_cart
+        ]
+        inserts = [
+            {"user_id": user_id, "product_id": pid, "quantity": qty}
+            for pid, qty in wanted.items() if pid not in in_cart
+        ]
+        if updates:
+            db.execute(
+                update(table)
+                .where(table.c.id == bindparam("b_id"))
+                .values(quantity=table.c.quantity + bindparam("b_add")),
+                updates,
+            )
+        if inserts:
+            db.execute(insert(table), inserts)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+
+    return (
+        db.query(models.CartItem)
+        .options(selectinload(models.CartItem.product))
+        .filter(models.CartItem.user_id == user_id, models.CartItem.product_id.in_(wanted))
+        .order_by(models.CartItem.id)
+        .all()
+    )
+
 def remove_from_cart(db: Session, user_id: int, product_id: int):
     db_item = db.query(models.CartItem).filter(
         models.CartItem.user_id == user_id, 
@@ -62,41 +141,34 @@ def remove_from_cart(db: Session, user_id: int, product_id: int):
     ).first()
     if db_item:
         db.delete(db_item)
-        db.commit()
+    inventory.release(db, user_id, [product_id])
+    db.commit()
     return True
 
 # Order CRUD
 def create_order(db: Session, user_id: int, order_data: schemas.OrderCreate):
-    cart_items = get_cart_items(db, user_id)
-    if not cart_items:
-        return None
-    
-    total_amount = sum(item.product.price * item.quantity for item in cart_items)
-    db_order = models.Order(
-        user_id=user_id,
-        total_amount=total_amount,
-        shipping_address=order_data.shipping_address
+    """Raises checkout.InsufficientStockError if any cart line exceeds available stock."""
+    return checkout.place_order(db, user_id, order_data.shipping_address)
+
+# Orders are always serialized with their items and products, so load both
+# up front: 3 queries in total instead of 1 + orders + items.
+def _orders_query(db: Session):
+    return db.query(models.Order).options(
+        selectinload(models.Order.items).selectinload(models.OrderItem.product)
     )
-    db.add(db_order)
-    db.commit()
-    db.refresh(db_order)
-
-    for item in cart_items:
-        order_item = models.OrderItem(
-            order_id=db_order.id,
-            product_id=item.product_id,
-            quantity=item.quantity,
-            price_at_purchase=item.product.price
-        )
-        db.add(order_item)
-        db.delete(item) # Clear cart after order
-    
-    db.commit()
-    db.refresh(db_order)
-    return db_order
 
-def get_user_orders(db: Session, user_id: int):
-    return db.query(models.Order).filter(models.Order.user_id == user_id).all()
+def _orders_page(query, limit: int = None, cursor: str = None, skip: int = 0):
+    # Newest first, keyset-paged on (created_at, id)
+    query = pagination.paginate(query, models.Order, pagination.decode_cursor(cursor), skip, descending=True)
+    if limit is not None:
+        query = query.limit(limit)
+    return query.all()
+
+def get_user_orders(db: Session, user_id: int, limit: int = None, cursor: str = None, skip: int = 0):
+    return _orders_page(_orders_query(db).filter(models.Order.user_id == user_id), limit, cursor, skip)
+
+def count_user_orders(db: Session, user_id: int) -> int:
+    return db.query(func.count(models.Order.id)).filter(models.Order.user_id == user_id).scalar()
 
-def get_all_orders(db: Session):
-    return db.query(models.Order).all()
+def get_all_orders(db: Session, limit: int = None, cursor: str = None):
+    return _orders_page(_orders_query(db), limit, cursor)
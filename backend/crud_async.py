@@ -0,0 +1,178 @@
+"""
+Async counterparts of crud.py for use with database.AsyncSession.
+
+Relationships are eager-loaded here because lazy loads cannot run once an
+async session hands objects back to FastAPI for serialization.
+"""
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import select, delete, func
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+import models, schemas, auth, cache, checkout, crud, inventory, pagination, product_search
+
+# User CRUD
+async def get_user_by_email(db: AsyncSession, email: str):
+    result = await db.execute(select(models.User).where(models.User.email == email))
+    return result.scalars().first()
+
+async def get_user(db: AsyncSession, user_id: int):
+    """Cached user record (schemas.UserResponse) for authentication and role checks."""
+    cached = cache.user_cache.get(user_id)
+    if cached is not None:
+        return cached
+    user = await db.get(models.User, user_id)
+    if user is None:
+        return None
+    cached = schemas.UserResponse.model_validate(user)
+    cache.user_cache.set(user_id, cached)
+    return cached
+
+async def create_user(db: AsyncSession, user: schemas.UserCreate):
+    # PBKDF2 takes tens of milliseconds of CPU; keep it off the event loop
+    hashed_password = await run_in_threadpool(auth.get_password_hash, user.password)
+    db_user = models.User(
+        email=user.email,
+        password_hash=hashed_password,
+        full_name=user.full_name,
+        role=user.role
+    )
+    db.add(db_user)
+    await db.commit()
+    await db.refresh(db_user)
+    return db_user
+
+# Product CRUD
+async def get_products(db: AsyncSession, skip: int = 0, limit: int = 100, category: str = None, search: str = None, cursor: str = None):
+    key = cache.listing_key(skip, limit, category, search, cursor)
+    cached = cache.listing_cache.get(key)
+    if cached is not None:
+        return list(cached)
+    query = select(models.Product)
+    if category:
+        query = query.where(models.Product.category == category)
+    ranked = product_search.has_terms(search)
+    if ranked:
+        query = product_search.apply_search(query, search, db.get_bind().dialect.name)
+    query = pagination.paginate(query, models.Product, pagination.decode_cursor(cursor), skip, ranked=ranked)
+    result = await db.execute(query.limit(limit))
+    products = tuple(cache.snapshot(p) for p in result.scalars().all())
+    cache.listing_cache.set(key, products)
+    return list(products)
+
+async def get_product_rows(db: AsyncSession, columns: tuple[str, ...], skip: int = 0, limit: int = 100, category: str = None, search: str = None, cursor: str = None):
+    """
+    The listing `get_products` would return, as plain rows holding only
+    `columns` (plus created_at and id, which the next cursor needs). Uncached:
+    lean_listing caches the encoded pages.
+    """
+    selected = dict.fromkeys((*columns, "created_at", "id"))
+    query = select(*(getattr(models.Product, c) for c in selected))
+    if category:
+        query = query.where(models.Product.category == category)
+    ranked = product_search.has_terms(search)
+    if ranked:
+        query = product_search.apply_search(query, search, db.get_bind().dialect.name)
+    query = pagination.paginate(query, models.Product, pagination.decode_cursor(cursor), skip, ranked=ranked)
+    result = await db.execute(query.limit(limit))
+    return result.all()
+
+async def get_product(db: AsyncSession, product_id: int):
+    cached = cache.product_cache.get(product_id)
+    if cached is not None:
+        return cached
+    product = await db.get(models.Product, product_id)
+    if product is None:
+        return None
+    cached = cache.snapshot(product)
+    cache.product_cache.set(product_id, cached)
+    return cached
+
+async def create_product(db: AsyncSession, product: schemas.ProductCreate):
+    db_product = models.Product(**product.dict())
+    db.add(db_product)
+    await db.commit()
+    await db.refresh(db_product)
+    return db_product
+
+# Cart CRUD
+async def get_cart_items(db: AsyncSession, user_id: int):
+    result = await db.execute(
+        select(models.CartItem)
+        .where(models.CartItem.user_id == user_id)
+        .options(selectinload(models.CartItem.product))
+    )
+    return result.scalars().all()
+
+async def add_to_cart(db: AsyncSession, user_id: int, item: schemas.CartItemCreate):
+    """Raises checkout.InsufficientStockError if the units cannot be held for the cart."""
+    try:
+        await db.run_sync(inventory.reserve, user_id, {item.product_id: item.quantity})
+        result = await db.execute(
+            select(models.CartItem).where(
+                models.CartItem.user_id == user_id,
+                models.CartItem.product_id == item.product_id
+            )
+        )
+        db_item = result.scalars().first()
+        if db_item:
+            db_item.quantity += item.quantity
+        else:
+            db_item = models.CartItem(user_id=user_id, **item.dict())
+            db.add(db_item)
+        await db.commit()
+    except Exception:
+        await db.rollback()
+        raise
+    await db.refresh(db_item, attribute_names=["id", "quantity", "product"])
+    return db_item
+
+async def add_items_to_cart(db: AsyncSession, user_id: int, items: list[schemas.CartItemCreate]):
+    """Raises checkout.InsufficientStockError if any line is unknown or exceeds available stock."""
+    return await db.run_sync(crud.add_items_to_cart, user_id, items)
+
+async def remove_from_cart(db: AsyncSession, user_id: int, product_id: int):
+    await db.execute(
+        delete(models.CartItem).where(
+            models.CartItem.user_id == user_id,
+            models.CartItem.product_id == product_id
+        )
+    )
+    await db.run_sync(inventory.release, user_id, [product_id])
+    await db.commit()
+    return True
+
+# Order CRUD
+def _orders_query():
+    return select(models.Order).options(
+        selectinload(models.Order.items).selectinload(models.OrderItem.product)
+    )
+
+async def create_order(db: AsyncSession, user_id: int, order_data: schemas.OrderCreate):
+    """Raises checkout.InsufficientStockError if any cart line exceeds available stock."""
+    db_order = await db.run_sync(checkout.place_order, user_id, order_data.shipping_address)
+    if db_order is None:
+        return None
+    result = await db.execute(
+        _orders_query()
+        .where(models.Order.id == db_order.id)
+        .execution_options(populate_existing=True)
+    )
+    return result.scalars().first()
+
+async def _orders_page(db: AsyncSession, query, limit: int = None, cursor: str = None, skip: int = 0):
+    # Newest first, keyset-paged on (created_at, id)
+    query = pagination.paginate(query, models.Order, pagination.decode_cursor(cursor), skip, descending=True)
+    if limit is not None:
+        query = query.limit(limit)
+    result = await db.execute(query)
+    return result.scalars().all()
+
+async def get_user_orders(db: AsyncSession, user_id: int, limit: int = None, cursor: str = None, skip: int = 0):
+    return await _orders_page(db, _orders_query().where(models.Order.user_id == user_id), limit, cursor, skip)
+
+async def count_user_orders(db: AsyncSession, user_id: int) -> int:
+    result = await db.execute(select(func.count(models.Order.id)).where(models.Order.user_id == user_id))
+    return result.scalar_one()
+
+async def get_all_orders(db: AsyncSession, limit: int = None, cursor: str = None):
+    return await _orders_page(db, _orders_query(), limit, cursor)
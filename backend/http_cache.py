@@ -0,0 +1,128 @@
+"""
+Conditional GETs for the catalog endpoints.
+
+Responses from GET /products and GET /products/{id} carry:
+
+  • ETag           a product page: "p<id>.<updated_at in ms>"; a listing: a
+                   hash of its products' ids and timestamps and its next
+                   cursor. Both come from row data, so every worker computes
+                   the same tag for the same content.
+  • Last-Modified  product pages only (a listing can change by losing a row,
+                   which no timestamp records)
+  • Cache-Control  public, max-age=CATALOG_MAX_AGE,
+                   stale-while-revalidate=CATALOG_STALE_WHILE_REVALIDATE
+
+A request whose If-None-Match (or, without one, If-Modified-Since) matches
+gets a 304 without the body being serialized.
+
+The validators of recent responses are also remembered together with the
+catalog version (`cache.catalog_version()`) they were computed under. While
+no product has changed, a repeat conditional request is answered 304 by
+`precondition` before the route reaches the catalog cache or the database.
+Changes made through other workers are picked up once the remembered entry
+expires (CATALOG_CACHE_TTL), the same bound the catalog caches have.
+
+Bump CATALOG_ETAG_SALT when the product representation changes shape, so
+clients do not revalidate bodies of the old shape.
+"""
+import hashlib
+import os
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+
+from fastapi import Request, Response
+
+import cache
+
+CATALOG_MAX_AGE = int(os.getenv("CATALOG_MAX_AGE", "30"))
+CATALOG_STALE_WHILE_REVALIDATE = int(os.getenv("CATALOG_STALE_WHILE_REVALIDATE", "60"))
+CATALOG_ETAG_SALT = os.getenv("CATALOG_ETAG_SALT", "1")
+
+CACHE_CONTROL = f"public, max-age={CATALOG_MAX_AGE}, stale-while-revalidate={CATALOG_STALE_WHILE_REVALIDATE}"
+
+# request key -> (catalog version, headers of the full response)
+validators = cache.TTLCache(
+    maxsize=int(os.getenv("PRODUCT_CACHE_SIZE", "4096")) + int(os.getenv("LISTING_CACHE_SIZE", "512")),
+    ttl=cache._TTL,
+)
+
+
+def _changed_at(product) -> datetime:
+    stamp = product.updated_at or product.created_at
+    return stamp.replace(tzinfo=timezone.utc) if stamp.tzinfo is None else stamp
+
+
+def product_etag(product) -> str:
+    return f'"p{product.id}.{int(_changed_at(product).timestamp() * 1000)}.{CATALOG_ETAG_SALT}"'
+
+
+def listing_etag(products, next_cursor: str | None = None) -> str:
+    digest = hashlib.blake2b(digest_size=12)
+    digest.update(f"{CATALOG_ETAG_SALT}|{next_cursor or ''}".encode())
+    for p in products:
+        digest.update(f"|{p.id}.{int(_changed_at(p).timestamp() * 1000)}".encode())
+    return f'"l{digest.hexdigest()}"'
+
+
+def last_modified(product) -> str:
+    return format_datetime(_changed_at(product), usegmt=True)
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    # Weak comparison, as RFC 9110 prescribes for If-None-Match
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in candidates or etag.removeprefix("W/") in (c.removeprefix("W/") for c in candidates)
+
+
+def _not_modified_since(if_modified_since: str, modified: str) -> bool:
+    try:
+        return parsedate_to_datetime(modified) <= parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+
+
+def _is_fresh(request: Request, headers: dict) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        return _etag_matches(if_none_match, headers["ETag"])
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and "Last-Modified" in headers:
+        return _not_modified_since(if_modified_since, headers["Last-Modified"])
+    return False
+
+
+def precondition(request: Request, key) -> Response | None:
+    """A 304 for a conditional request matching what was last served for `key` at the current catalog version."""
+    if "if-none-match" not in request.headers and "if-modified-since" not in request.headers:
+        return None
+    remembered = validators.get(key)
+    if remembered is None:
+        return None
+    version, headers = remembered
+    if version != cache.catalog_version() or not _is_fresh(request, headers):
+        return None
+    return Response(status_code=304, headers=headers)
+
+
+def remember(request: Request, key, version: int, etag: str,
+             modified: str | None = None, extra_headers: dict | None = None) -> tuple[dict, bool]:
+    """
+    Remember the validators for `key` under the catalog `version` read before
+    the content was loaded. Returns the caching headers for the response and
+    whether the request's validators match them (so a 304 will do).
+    """
+    headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL, **(extra_headers or {})}
+    if modified:
+        headers["Last-Modified"] = modified
+    validators.set(key, (version, headers))
+    return headers, _is_fresh(request, headers)
+
+
+def respond(request: Request, response: Response, key, version: int, etag: str,
+            modified: str | None = None, extra_headers: dict | None = None) -> Response | None:
+    """`remember`, then set the headers on `response`, or return the 304 to send instead."""
+    headers, fresh = remember(request, key, version, etag, modified, extra_headers)
+    if fresh:
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return None
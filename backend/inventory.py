@@ -0,0 +1,596 @@
+"""
+Inventory reservations: time-limited stock holds for carts.
+
+Putting a product in a cart takes a hold on its units (`reserve`), so what a
+shopper has in their cart is still in stock at checkout:
+
+  • a hold is a stock_holds row that lasts INVENTORY_HOLD_TTL seconds; every
+    further add to the cart extends all of the user's live holds
+  • free stock is stock_quantity − reserved_quantity; a hold moves units into
+    reserved_quantity with one guarded UPDATE, so two carts can never hold
+    the same unit
+  • checkout.place_order converts the user's holds (`convert`): stock and
+    reserved_quantity drop together. Cart units without a hold (it expired
+    and was swept) need free stock, as before
+  • removing a cart line gives its hold back (`release`); expired holds are
+    given back by `sweep`, for one product when a hold on it comes up short,
+    and for all products by the server's maintenance task (`maintain`)
+
+Hot products
+    Every hold on a product updates its row, so a flash sale queues on one row
+    lock. `set_shards(product_id, n)` splits the product's free stock over n
+    stock_shards rows. A hold takes units from a random shard that has them,
+    and locks all of the product's shards only when no single shard does.
+    Checkout adds the units sold to the shard's `sold` counter instead of
+    updating the product row, and `fold` moves those counters into
+    stock_quantity in batches. The stock_quantity of a sharded product
+    therefore lags its sales by up to INVENTORY_MAINTENANCE_INTERVAL. After
+    restocking a sharded product, call set_shards again to re-split its free
+    stock; it folds the shards' sales while holding their locks, so none are
+    lost when the old shards are dropped.
+
+The functions take the caller's Session and leave committing to it (except
+set_shards and maintain), so holds commit together with the cart change.
+
+    python inventory.py sweep                 # give back expired holds, fold counters
+    python inventory.py shard 42 --count 16   # split product 42's stock over 16 shards
+    python inventory.py shard 42 --count 0    # back to the product row
+    python inventory.py status 42
+"""
+import asyncio
+import logging
+import os
+import random
+from collections import defaultdict, namedtuple
+from datetime import datetime, timedelta
+
+from sqlalchemy import bindparam, case, delete, exists, func, insert, literal, select, tuple_, update
+from sqlalchemy.orm import Session, aliased
+
+import cache, database, metrics, models
+
+HOLD_TTL = int(os.getenv("INVENTORY_HOLD_TTL", "900"))
+DEFAULT_SHARDS = int(os.getenv("INVENTORY_SHARDS", "8"))
+MAINTENANCE_INTERVAL = float(os.getenv("INVENTORY_MAINTENANCE_INTERVAL", "30"))
+SWEEP_BATCH = int(os.getenv("INVENTORY_SWEEP_BATCH", "1000"))
+
+logger = logging.getLogger(__name__)
+
+_units = metrics.counter(
+    "inventory_hold_units", "Units by hold outcome: held, short, converted, released, expired", ("outcome",))
+
+_Units = namedtuple("_Units", "product_id shard quantity")
+
+_reserved = func.coalesce(models.Product.reserved_quantity, 0)
+_free = func.coalesce(models.Product.stock_quantity, 0) - _reserved
+_sharded = exists().where(models.StockShard.product_id == models.Product.id)
+_HOLD_COLUMNS = (models.StockHold.product_id, models.StockHold.shard, models.StockHold.quantity)
+
+
+class InsufficientStockError(Exception):
+    """Raised when at least one cart line exceeds the stock left for its product."""
+
+    def __init__(self, shortages: list[dict]):
+        self.shortages = shortages
+        names = ", ".join(f"'{s['name']}' (only {s['available']} left)" for s in shortages)
+        super().__init__(f"Not enough stock for {names}.")
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Taking and giving back units
+# ─────────────────────────────────────────────────────────────────────────────
+
+def _take_from_rows(db: Session, wanted: dict[int, int]) -> set[int]:
+    """Hold units on the rows of unsharded products, all in ONE guarded UPDATE. Returns the ids held."""
+    units = case(wanted, value=models.Product.id)
+    return set(db.execute(
+        update(models.Product)
+        .where(models.Product.id.in_(wanted), ~_sharded, _free >= units)
+        # Holds do not change anything the catalog shows, so the ETag stays put
+        .values(reserved_quantity=_reserved + units, updated_at=models.Product.updated_at)
+        .returning(models.Product.id)
+        .execution_options(synchronize_session=False)
+    ).scalars())
+
+
+def _sharded_ids(db: Session, product_ids) -> set[int]:
+    return set(db.execute(
+        select(models.StockShard.product_id).where(models.StockShard.product_id.in_(product_ids)).distinct()
+    ).scalars())
+
+
+def _take_from_shards(db: Session, wanted: dict[int, int], sell: bool = False) -> dict[int, list[tuple[int, int]]]:
+    """
+    Take each product's units from ONE random shard that has them, for all
+    products in a single guarded UPDATE. Returns {product_id: [(shard, units)]}
+    for the products served; the rest are unsharded, short or fragmented.
+    """
+    candidates = aliased(models.StockShard)
+    ranked = (
+        select(
+            candidates.product_id,
+            candidates.shard,
+            func.row_number().over(partition_by=candidates.product_id, order_by=func.random()).label("pick"),
+        )
+        .where(candidates.product_id.in_(wanted),
+               candidates.available >= case(wanted, value=candidates.product_id))
+        .subquery()
+    )
+    units = case(wanted, value=models.StockShard.product_id)
+    values = {"available": models.StockShard.available - units}
+    if sell:
+        values["sold"] = models.StockShard.sold + units
+    taken = db.execute(
+        update(models.StockShard)
+        .where(
+            tuple_(models.StockShard.product_id, models.StockShard.shard).in_(
+                select(ranked.c.product_id, ranked.c.shard).where(ranked.c.pick == 1)),
+            # Re-checked under the row lock, in case another cart emptied the shard meanwhile
+            models.StockShard.available >= units,
+        )
+        .values(**values)
+        .returning(models.StockShard.product_id, models.StockShard.shard)
+        .execution_options(synchronize_session=False)
+    ).all()
+    return {row.product_id: [(row.shard, wanted[row.product_id])] for row in taken}
+
+
+def _gather_from_shards(db: Session, wanted: dict[int, int], sell: bool = False) -> dict[int, list[tuple[int, int]]]:
+    """
+    Take each product's units from as many of its shards as it takes, locking
+    the shards of all `wanted` products with one SELECT and updating them with
+    one executemany. For when no single shard has enough.
+    """
+    rows = db.execute(
+        select(models.StockShard.product_id, models.StockShard.shard, models.StockShard.available)
+        .where(models.StockShard.product_id.in_(wanted), models.StockShard.available > 0)
+        .order_by(models.StockShard.product_id, models.StockShard.shard)
+        .with_for_update()
+    ).all()
+    by_product: dict[int, list] = defaultdict(list)
+    for row in rows:
+        by_product[row.product_id].append(row)
+
+    taken: dict[int, list[tuple[int, int]]] = {}
+    for product_id, shards in by_product.items():
+        remaining = wanted[product_id]
+        if sum(row.available for row in shards) < remaining:
+            continue
+        taken[product_id] = []
+        for row in shards:
+            units = min(row.available, remaining)
+            taken[product_id].append((row.shard, units))
+            remaining -= units
+            if not remaining:
+                break
+    if taken:
+        shards = models.StockShard.__table__
+        units = bindparam("b_units")
+        values = {"available": shards.c.available - units}
+        if sell:
+            values["sold"] = shards.c.sold + units
+        db.execute(
+            update(shards)
+            .where(shards.c.product_id == bindparam("b_product"), shards.c.shard == bindparam("b_shard"))
+            .values(**values),
+            [{"b_product": pid, "b_shard": shard, "b_units": n} for pid, parts in taken.items() for shard, n in parts],
+        )
+    return taken
+
+
+def _take(db: Session, wanted: dict[int, int]) -> dict[int, list[tuple[int | None, int]]]:
+    """
+    Free units for each product: {product_id: [(shard, or None for the
+    product row, units)]} for the products served. A fixed number of
+    statements however many products there are: one UPDATE for the
+    unsharded rows, one for single shards, then gathering across shards.
+    """
+    taken = {product_id: [(None, wanted[product_id])] for product_id in _take_from_rows(db, wanted)}
+    rest = {product_id: units for product_id, units in wanted.items() if product_id not in taken}
+    if rest:
+        taken.update(_take_from_shards(db, rest))
+        rest = {product_id: units for product_id, units in rest.items() if product_id not in taken}
+    if rest:
+        taken.update(_gather_from_shards(db, rest))
+    return taken
+
+
+def _give_back(db: Session, holds):
+    """Return the units of claimed (deleted) holds to the row or shard they came from."""
+    to_rows: dict[int, int] = defaultdict(int)
+    to_shards: dict[tuple[int, int], int] = defaultdict(int)
+    for hold in holds:
+        if hold.shard is None:
+            to_rows[hold.product_id] += hold.quantity
+        else:
+            to_shards[(hold.product_id, hold.shard)] += hold.quantity
+    if to_rows:
+        products = models.Product.__table__
+        db.execute(
+            update(products)
+            .where(products.c.id == bindparam("b_id"))
+            .values(reserved_quantity=func.coalesce(products.c.reserved_quantity, 0) - bindparam("b_units"),
+                    updated_at=products.c.updated_at),
+            [{"b_id": pid, "b_units": units} for pid, units in sorted(to_rows.items())],
+        )
+    if to_shards:
+        shards = models.StockShard.__table__
+        db.execute(
+            update(shards)
+            .where(shards.c.product_id == bindparam("b_product"), shards.c.shard == bindparam("b_shard"))
+            .values(available=shards.c.available + bindparam("b_units")),
+            [{"b_product": pid, "b_shard": shard, "b_units": units} for (pid, shard), units in sorted(to_shards.items())],
+        )
+
+
+def _shortages(db: Session, requested: dict[int, int], held: dict[int, int] = None) -> list[dict]:
+    held = held or {}
+    in_shards = (
+        select(func.sum(models.StockShard.available))
+        .where(models.StockShard.product_id == models.Product.id)
+        .scalar_subquery()
+    )
+    found = {
+        row.id: row
+        for row in db.execute(
+            select(models.Product.id, models.Product.name, func.coalesce(in_shards, _free).label("free"))
+            .where(models.Product.id.in_(requested))
+        ).all()
+    }
+    shortages = []
+    for product_id, quantity in requested.items():
+        product = found.get(product_id)
+        shortages.append({
+            "product_id": product_id,
+            "name": product.name if product else f"Product #{product_id}",
+            "requested": quantity,
+            "available": max(product.free or 0, 0) + held.get(product_id, 0) if product else 0,
+        })
+    return shortages
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Holds
+# ─────────────────────────────────────────────────────────────────────────────
+
+def reserve(db: Session, user_id: int, wanted: dict[int, int]):
+    """
+    Hold `wanted` ({product_id: units}) for the user's cart and extend the
+    user's other live holds. Raises InsufficientStockError when any product
+    is short; the caller's rollback then undoes the holds already taken.
+    """
+    now = datetime.utcnow()
+    expires_at = now + timedelta(seconds=HOLD_TTL)
+    wanted = {product_id: quantity for product_id, quantity in wanted.items() if quantity > 0}
+    taken = _take(db, wanted) if wanted else {}
+    short = {product_id: units for product_id, units in wanted.items() if product_id not in taken}
+    # Expired holds may be keeping the units: give them back and try once more
+    if short and sweep(db, product_ids=list(short), now=now):
+        taken.update(_take(db, short))
+        short = {product_id: units for product_id, units in short.items() if product_id not in taken}
+    if short:
+        _units.inc(sum(short.values()), outcome="short")
+        raise InsufficientStockError(_shortages(db, short))
+
+    db.execute(
+        update(models.StockHold)
+        .where(models.StockHold.user_id == user_id, models.StockHold.expires_at > now)
+        .values(expires_at=expires_at)
+        .execution_options(synchronize_session=False)
+    )
+    holds = [
+        {"user_id": user_id, "product_id": product_id, "shard": shard, "quantity": units, "expires_at": expires_at}
+        for product_id, parts in sorted(taken.items()) for shard, units in parts
+    ]
+    if holds:
+        db.execute(insert(models.StockHold), holds)
+        _units.inc(sum(hold["quantity"] for hold in holds), outcome="held")
+
+
+def release(db: Session, user_id: int, product_ids=None):
+    """Give back the user's holds on `product_ids` (all of them when None)."""
+    query = delete(models.StockHold).where(models.StockHold.user_id == user_id)
+    if product_ids is not None:
+        query = query.where(models.StockHold.product_id.in_(product_ids))
+    claimed = db.execute(query.returning(*_HOLD_COLUMNS).execution_options(synchronize_session=False)).all()
+    _give_back(db, claimed)
+    if claimed:
+        _units.inc(sum(hold.quantity for hold in claimed), outcome="released")
+
+
+def sweep(db: Session, product_ids=None, now: datetime = None, limit: int = SWEEP_BATCH) -> int:
+    """Give back up to `limit` expired holds, of `product_ids` or of any product. Returns how many."""
+    expired = select(models.StockHold.id).where(models.StockHold.expires_at <= (now or datetime.utcnow()))
+    if product_ids is not None:
+        expired = expired.where(models.StockHold.product_id.in_(product_ids))
+    # Deleting claims a hold: a hold converted or released meanwhile is simply not returned
+    claimed = db.execute(
+        delete(models.StockHold)
+        .where(models.StockHold.id.in_(expired.limit(limit).scalar_subquery()))
+        .returning(*_HOLD_COLUMNS)
+        .execution_options(synchronize_session=False)
+    ).all()
+    _give_back(db, claimed)
+    if claimed:
+        _units.inc(sum(hold.quantity for hold in claimed), outcome="expired")
+    return len(claimed)
+
+
+def convert(db: Session, user_id: int, wanted: dict[int, int]):
+    """
+    Take `wanted` ({product_id: units}) out of stock for good, inside the
+    checkout transaction. The user's holds on those products are used first
+    (expired ones too, until they are swept), free stock covers the rest and
+    held units beyond `wanted` are given back. Raises InsufficientStockError
+    when any product is short.
+    """
+    claimed = db.execute(
+        delete(models.StockHold)
+        .where(models.StockHold.user_id == user_id, models.StockHold.product_id.in_(wanted))
+        .returning(*_HOLD_COLUMNS)
+        .execution_options(synchronize_session=False)
+    ).all()
+    row_held: dict[int, int] = defaultdict(int)
+    shard_holds: dict[int, list] = defaultdict(list)
+    for hold in claimed:
+        if hold.shard is None:
+            row_held[hold.product_id] += hold.quantity
+        else:
+            shard_holds[hold.product_id].append(hold)
+
+    # Every unsharded product in ONE guarded UPDATE; the guard is re-checked under the row lock
+    units = case(wanted, value=models.Product.id)
+    held = case(dict(row_held), value=models.Product.id, else_=0) if row_held else literal(0)
+    done = set(db.execute(
+        update(models.Product)
+        .where(models.Product.id.in_(wanted), ~_sharded, _free + held >= units)
+        .values(stock_quantity=models.Product.stock_quantity - units, reserved_quantity=_reserved - held)
+        .returning(models.Product.id)
+        .execution_options(synchronize_session=False)
+    ).scalars())
+
+    rest = {product_id: units for product_id, units in wanted.items() if product_id not in done}
+    sharded = _sharded_ids(db, rest) if rest else set()
+    short = {product_id: units for product_id, units in rest.items() if product_id not in sharded}
+    if sharded:
+        short.update(_convert_sharded(db, {product_id: rest[product_id] for product_id in sharded},
+                                      row_held, shard_holds))
+    if short:
+        _units.inc(sum(short.values()), outcome="short")
+        raise InsufficientStockError(_shortages(db, short, held={
+            product_id: row_held[product_id] + sum(hold.quantity for hold in shard_holds[product_id])
+            for product_id in short
+        }))
+    _units.inc(sum(wanted.values()), outcome="converted")
+
+
+def _convert_sharded(db: Session, wanted: dict[int, int], row_held: dict, shard_holds: dict) -> dict[int, int]:
+    """Sell `wanted` of sharded products, all of them in a fixed number of statements. Returns the short ones."""
+    from_row, sold, leftover, uncovered = {}, [], [], {}
+    for product_id, quantity in wanted.items():
+        from_row[product_id] = min(row_held[product_id], quantity)
+        remaining = quantity - from_row[product_id]
+        for hold in shard_holds[product_id]:
+            used = min(hold.quantity, remaining)
+            remaining -= used
+            if used:
+                sold.append({"b_product": product_id, "b_shard": hold.shard, "b_units": used})
+            if hold.quantity > used:
+                leftover.append(_Units(product_id, hold.shard, hold.quantity - used))
+        if remaining:
+            uncovered[product_id] = remaining
+
+    # Units no hold covers come from (and are sold on) free shards; this is the only step that can fail
+    if uncovered:
+        taken = _take_from_shards(db, uncovered, sell=True)
+        rest = {product_id: units for product_id, units in uncovered.items() if product_id not in taken}
+        if rest:
+            taken.update(_gather_from_shards(db, rest, sell=True))
+        short = {product_id: wanted[product_id] for product_id in uncovered if product_id not in taken}
+        if short:
+            return short
+
+    moved = {product_id: units for product_id, units in row_held.items() if units and product_id in wanted}
+    if moved:
+        # Holds taken before the product was sharded still sit on its row
+        products = models.Product.__table__
+        db.execute(
+            update(products)
+            .where(products.c.id == bindparam("b_id"))
+            .values(stock_quantity=products.c.stock_quantity - bindparam("b_sold"),
+                    reserved_quantity=func.coalesce(products.c.reserved_quantity, 0) - bindparam("b_held")),
+            [{"b_id": pid, "b_sold": from_row[pid], "b_held": held} for pid, held in sorted(moved.items())],
+        )
+    if sold:
+        shards = models.StockShard.__table__
+        db.execute(
+            update(shards)
+            .where(shards.c.product_id == bindparam("b_product"), shards.c.shard == bindparam("b_shard"))
+            .values(sold=shards.c.sold + bindparam("b_units")),
+            sold,
+        )
+    _give_back(db, leftover)
+    return {}
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Shards
+# ─────────────────────────────────────────────────────────────────────────────
+
+def fold(db: Session, product_id: int = None) -> dict[int, int]:
+    """Move the shards' sold counters into stock_quantity. Returns {product_id: units folded}."""
+    query = select(models.StockShard.product_id, models.StockShard.shard, models.StockShard.sold).where(
+        models.StockShard.sold > 0)
+    if product_id is not None:
+        query = query.where(models.StockShard.product_id == product_id)
+    rows = db.execute(query).all()
+    if not rows:
+        return {}
+    folded: dict[int, int] = defaultdict(int)
+    for row in rows:
+        folded[row.product_id] += row.sold
+
+    # Subtract what was read, so sales counted meanwhile are kept for the next fold
+    shards = models.StockShard.__table__
+    db.execute(
+        update(shards)
+        .where(shards.c.product_id == bindparam("b_product"), shards.c.shard == bindparam("b_shard"))
+        .values(sold=shards.c.sold - bindparam("b_units")),
+        [{"b_product": row.product_id, "b_shard": row.shard, "b_units": row.sold} for row in rows],
+    )
+    products = models.Product.__table__
+    db.execute(
+        update(products)
+        .where(products.c.id == bindparam("b_id"))
+        .values(stock_quantity=products.c.stock_quantity - bindparam("b_units")),
+        [{"b_id": pid, "b_units": units} for pid, units in sorted(folded.items())],
+    )
+    return dict(folded)
+
+
+def set_shards(db: Session, product_id: int, count: int = DEFAULT_SHARDS) -> dict | None:
+    """
+    Split the product's free stock evenly over `count` shards, or move it back
+    to the product row when `count` is 0. Commits. Returns `status`, or None
+    when there is no such product.
+    """
+    try:
+        # Shards before the product row, in the order checkout locks them. Once
+        # the shards are locked no sale can be counted on them, so the fold
+        # below takes every sale they hold before they are dropped.
+        db.execute(
+            select(models.StockShard.shard).where(models.StockShard.product_id == product_id).with_for_update()
+        ).all()
+        found = db.execute(
+            select(models.Product.id).where(models.Product.id == product_id).with_for_update()
+        ).scalar_one_or_none()
+        if found is None:
+            return None
+        fold(db, product_id)
+        in_shards = (models.StockHold.product_id == product_id, models.StockHold.shard.is_not(None))
+        shard_held = db.execute(
+            select(func.coalesce(func.sum(models.StockHold.quantity), 0)).where(*in_shards)
+        ).scalar_one()
+        db.execute(delete(models.StockShard).where(models.StockShard.product_id == product_id))
+
+        if count <= 0:
+            # Holds on the shards become holds on the row
+            db.execute(update(models.StockHold).where(*in_shards).values(shard=None)
+                       .execution_options(synchronize_session=False))
+            db.execute(
+                update(models.Product)
+                .where(models.Product.id == product_id)
+                .values(reserved_quantity=_reserved + shard_held, updated_at=models.Product.updated_at)
+                .execution_options(synchronize_session=False)
+            )
+        else:
+            db.execute(update(models.StockHold).where(*in_shards).values(shard=models.StockHold.shard % count)
+                       .execution_options(synchronize_session=False))
+            free = db.execute(select(_free).where(models.Product.id == product_id)).scalar_one() - shard_held
+            free = max(free, 0)
+            db.execute(insert(models.StockShard), [
+                {"product_id": product_id, "shard": i, "available": free // count + (i < free % count), "sold": 0}
+                for i in range(count)
+            ])
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    cache.invalidate_product(product_id)
+    return status(db, product_id)
+
+
+def status(db: Session, product_id: int) -> dict | None:
+    """Stock, holds and shards of one product."""
+    product = db.execute(
+        select(models.Product.stock_quantity, _reserved.label("reserved"))
+        .where(models.Product.id == product_id)
+    ).one_or_none()
+    if product is None:
+        return None
+    shards = db.execute(
+        select(models.StockShard.shard, models.StockShard.available, models.StockShard.sold)
+        .where(models.StockShard.product_id == product_id)
+        .order_by(models.StockShard.shard)
+    ).all()
+    holds, held = db.execute(
+        select(func.count(), func.coalesce(func.sum(models.StockHold.quantity), 0))
+        .where(models.StockHold.product_id == product_id, models.StockHold.expires_at > datetime.utcnow())
+    ).one()
+    unfolded = sum(s.sold for s in shards)
+    return {
+        "product_id": product_id,
+        "stock_quantity": (product.stock_quantity or 0) - unfolded,
+        "reserved_quantity": product.reserved,
+        "available": sum(s.available for s in shards) if shards else (product.stock_quantity or 0) - product.reserved,
+        "active_holds": holds,
+        "held_units": held,
+        "unfolded_sold": unfolded,
+        "shards": [{"shard": s.shard, "available": s.available, "sold": s.sold} for s in shards],
+    }
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Maintenance
+# ─────────────────────────────────────────────────────────────────────────────
+
+def maintain() -> dict:
+    """Give back every expired hold and fold the shard counters, in sessions of its own."""
+    db = database.SessionLocal()
+    try:
+        expired = 0
+        while True:
+            swept = sweep(db)
+            db.commit()
+            expired += swept
+            if swept < SWEEP_BATCH:
+                break
+        folded = fold(db)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+    for product_id in folded:
+        cache.invalidate_product(product_id)
+    return {"expired_holds": expired, "folded_units": sum(folded.values())}
+
+
+async def run_maintenance(interval: float = MAINTENANCE_INTERVAL):
+    """Server background task: `maintain` every `interval` seconds, until cancelled."""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await asyncio.to_thread(maintain)
+        except Exception:
+            logger.exception("Inventory maintenance failed")
+
+
+if __name__ == "__main__":
+    import argparse
+    import json
+
+    parser = argparse.ArgumentParser(description="Maintain stock holds and stock shards.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("sweep", help="Give back expired holds and fold the shard counters")
+    shard_cmd = sub.add_parser("shard", help="Split a product's free stock over shards")
+    shard_cmd.add_argument("product_id", type=int)
+    shard_cmd.add_argument("--count", type=int, default=DEFAULT_SHARDS, help="Number of shards (0: none)")
+    status_cmd = sub.add_parser("status", help="Show a product's stock, holds and shards")
+    status_cmd.add_argument("product_id", type=int)
+    args = parser.parse_args()
+
+    models.Base.metadata.create_all(bind=database.engine)
+    if args.command == "sweep":
+        print(f"✅ {maintain()}")
+    else:
+        session = database.SessionLocal()
+        try:
+            if args.command == "shard":
+                result = set_shards(session, args.product_id, args.count)
+            else:
+                result = status(session, args.product_id)
+            print(json.dumps(result, indent=2) if result else f"Product #{args.product_id} not found.")
+        finally:
+            session.close()
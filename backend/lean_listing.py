@@ -0,0 +1,119 @@
+"""
+Lean product listings: GET /products?fields=id,name,price,image_url
+
+The product grid needs a handful of columns, not the full ProductResponse
+with its long description. With `fields` the listing:
+
+  • selects only those columns (crud_async.get_product_rows), so no ORM
+    object or Pydantic model is built per row
+  • encodes the rows with orjson (the stdlib json module when it is not
+    installed) straight into the response body
+  • compresses the body with brotli or gzip, as the client's
+    Accept-Encoding allows, once it is at least COMPRESS_MIN_BYTES
+
+Encoded pages, and each compressed variant, are kept in
+`cache.listing_cache` next to the full listings, so they are dropped by the
+same product invalidation. The ETag is a hash of the uncompressed body,
+suffixed with the content coding for compressed variants.
+
+brotli is optional: without the package only gzip is offered.
+"""
+import gzip
+import hashlib
+import json
+import os
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import cache, crud_async, pagination, product_search, schemas
+
+try:
+    import orjson
+except ImportError:  # stdlib fallback
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+FIELDS = tuple(schemas.ProductResponse.model_fields)
+COMPRESS_MIN_BYTES = int(os.getenv("COMPRESS_MIN_BYTES", "1024"))
+GZIP_LEVEL = int(os.getenv("GZIP_LEVEL", "6"))
+BROTLI_QUALITY = int(os.getenv("BROTLI_QUALITY", "5"))
+
+
+def parse_fields(raw: str) -> tuple[str, ...]:
+    """`id,name,price` -> ("id", "name", "price"); raises ValueError for unknown fields."""
+    fields = tuple(dict.fromkeys(f.strip() for f in raw.split(",") if f.strip()))
+    unknown = [f for f in fields if f not in FIELDS]
+    if unknown or not fields:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}; choose from {', '.join(FIELDS)}"
+                         if unknown else "No fields given")
+    return fields
+
+
+def dumps(value) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(value)
+    return json.dumps(value, separators=(",", ":"), default=lambda v: v.isoformat()).encode()
+
+
+def negotiate(accept_encoding: str | None) -> str | None:
+    """The content coding to use: "br", "gzip" or None (identity)."""
+    offered = {}
+    for part in (accept_encoding or "").split(","):
+        coding, _, params = part.strip().partition(";")
+        q = 1.0
+        if params.strip().startswith("q="):
+            try:
+                q = float(params.strip()[2:])
+            except ValueError:
+                q = 0.0
+        if coding:
+            offered[coding.strip().lower()] = q
+    for coding in (("br",) if brotli is not None else ()) + ("gzip",):
+        if offered.get(coding, offered.get("*", 0.0)) > 0:
+            return coding
+    return None
+
+
+class Page:
+    """One encoded listing page and its compressed variants."""
+
+    __slots__ = ("body", "next_cursor", "digest", "_encoded")
+
+    def __init__(self, body: bytes, next_cursor: str | None):
+        self.body = body
+        self.next_cursor = next_cursor
+        self.digest = hashlib.blake2b(body, digest_size=12).hexdigest()
+        self._encoded: dict[str, bytes] = {}
+
+    def encoded(self, coding: str | None) -> tuple[bytes, str | None, str]:
+        """(body, content coding actually applied, ETag) for the negotiated coding."""
+        if coding is None or len(self.body) < COMPRESS_MIN_BYTES:
+            return self.body, None, f'"s{self.digest}"'
+        body = self._encoded.get(coding)
+        if body is None:
+            if coding == "br":
+                body = brotli.compress(self.body, quality=BROTLI_QUALITY)
+            else:
+                body = gzip.compress(self.body, compresslevel=GZIP_LEVEL, mtime=0)
+            self._encoded[coding] = body  # idempotent, so concurrent writers are harmless
+        return body, coding, f'"s{self.digest}-{coding}"'
+
+
+async def get_page(db: AsyncSession, fields: tuple[str, ...], skip: int = 0, limit: int = 100,
+                   category: str = None, search: str = None, cursor: str = None) -> Page:
+    key = ("lean", fields) + cache.listing_key(skip, limit, category, search, cursor)
+    page = cache.listing_cache.get(key)
+    if page is not None:
+        return page
+    position = pagination.decode_cursor(cursor)
+    rows = await crud_async.get_product_rows(db, fields, skip=skip, limit=limit, category=category,
+                                             search=search, cursor=cursor)
+    # The requested fields lead each row; zip drops the trailing cursor columns
+    body = dumps([dict(zip(fields, row)) for row in rows])
+    page = Page(body, pagination.next_cursor(rows, limit, position, skip, ranked=product_search.has_terms(search)))
+    cache.listing_cache.set(key, page)
+    return page
@@ -1,18 +1,72 @@
-from fastapi import FastAPI, Depends, HTTPException, status, Header
+from fastapi import FastAPI, Depends, HTTPException, status, Header, Request, Response, UploadFile, File
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from fastapi.middleware.cors import CORSMiddleware
-from sqlalchemy.orm import Session
-from datetime import timedelta
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from starlette.background import BackgroundTask
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import inspect
+from sqlalchemy.ext.asyncio import AsyncSession
+from datetime import date, timedelta
+import asyncio
+import io
+import json
+import os
+from contextlib import asynccontextmanager, nullcontext
 from pydantic import BaseModel as PydanticBaseModel
-import models, schemas, crud, auth, database
-from database import engine, get_db
+import models, schemas, crud_async, admission, analytics, auth, cache, catalog_import, chat_sessions, checkout, database, http_cache, inventory, lean_listing, metrics, pagination, product_search, query_stats
+from database import engine, get_async_db
 from jose import JWTError, jwt
-from agents.agent_graph import run_agent
+from agents import agent_graph, llm_router, registry, tracing
+from agents.agent_graph import run_agent, stream_agent
+from agents.fast_router import route_stats
+from agents.tool_budget import budget_stats
 
-# Create tables
-models.Base.metadata.create_all(bind=engine)
+def init_db():
+    """Create tables (and any nullable columns / indexes added to existing tables since)."""
+    models.Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        preparer = conn.dialect.identifier_preparer
+        inspector = inspect(conn)
+        for table in models.Base.metadata.sorted_tables:
+            existing = {c["name"] for c in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name not in existing and column.nullable:
+                    conn.exec_driver_sql(
+                        f"ALTER TABLE {preparer.format_table(table)} ADD COLUMN "
+                        f"{preparer.format_column(column)} {column.type.compile(conn.dialect)}"
+                    )
+        for table in models.Base.metadata.sorted_tables:
+            for index in table.indexes:
+                index.create(conn, checkfirst=True)
+        product_search.ensure_search_index(conn)
 
-app = FastAPI(title="E-commerce Multi-Agent API")
+def _backfill_analytics():
+    """Fill the sales rollups on a database whose orders predate them."""
+    db = database.SessionLocal()
+    try:
+        analytics.backfill(db)
+    finally:
+        db.close()
+
+# Build the LLM clients and agent graph at startup instead of on the first /chat
+AGENT_WARMUP = os.getenv("AGENT_WARMUP", "0").lower() in ("1", "true", "yes")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Runs when the server starts, not when `main` is imported
+    await run_in_threadpool(init_db)
+    await run_in_threadpool(_backfill_analytics)
+    if AGENT_WARMUP:
+        await run_in_threadpool(agent_graph.warm_up)
+    # Gives back expired stock holds and folds the stock shard counters
+    maintenance = asyncio.create_task(inventory.run_maintenance())
+    # Adds recent orders to the sales rollups, outside the checkout transaction
+    rollups = asyncio.create_task(analytics.run_refresh())
+    yield
+    maintenance.cancel()
+    rollups.cancel()
+
+app = FastAPI(title="E-commerce Multi-Agent API", lifespan=lifespan)
 
 # CORS
 app.add_middleware(
@@ -21,11 +75,29 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[
+        pagination.NEXT_CURSOR_HEADER,
+        query_stats.COUNT_HEADER, query_stats.TIME_HEADER, query_stats.REPEATED_HEADER,
+        "Retry-After", "ETag",
+    ],
 )
+# Outermost, so the counts cover every dependency and the response serialization
+app.add_middleware(query_stats.QueryAccountingMiddleware)
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
-async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+async def _user_from_claims(db: AsyncSession, payload: dict):
+    # Tokens carrying a `uid` claim resolve through the user cache; older
+    # tokens with only `sub` still fall back to an email lookup.
+    user_id = payload.get("uid")
+    if user_id is not None:
+        return await crud_async.get_user(db, user_id=user_id)
+    email = payload.get("sub")
+    if email is None:
+        return None
+    return await crud_async.get_user_by_email(db, email=email)
+
+async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_async_db)):
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -33,17 +105,14 @@ async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = De
     )
     try:
         payload = jwt.decode(token, auth.SECRET_KEY, algorithms=[auth.ALGORITHM])
-        email: str = payload.get("sub")
-        if email is None:
-            raise credentials_exception
     except JWTError:
         raise credentials_exception
-    user = crud.get_user_by_email(db, email=email)
+    user = await _user_from_claims(db, payload)
     if user is None:
         raise credentials_exception
     return user
 
-async def get_current_user_optional(authorization: str = Header(None), db: Session = Depends(get_db)):
+async def get_current_user_optional(authorization: str = Header(None), db: AsyncSession = Depends(get_async_db)):
     """Optional authentication - returns user if token is valid, None otherwise"""
     if not authorization:
         return None
@@ -51,13 +120,14 @@ async def get_current_user_optional(authorization: str = Header(None), db: Sessi
         # Extract token from Authorization header
         token = authorization.replace("Bearer ", "") if authorization.startswith("Bearer ") else authorization
         payload = jwt.decode(token, auth.SECRET_KEY, algorithms=[auth.ALGORITHM])
-        email: str = payload.get("sub")
-        if email is None:
-            return None
-        user = crud.get_user_by_email(db, email=email)
-        return user
+        return await _user_from_claims(db, payload)
     except (JWTError, Exception):
         return None
+    finally:
+        # Only the chat routes use this, and a turn lasts seconds: hand the
+        # connection back now instead of holding it (possibly while queued for
+        # admission) while the agents' tools wait for theirs
+        await db.close()
 
 def get_admin_user(current_user: models.User = Depends(get_current_user)):
     if current_user.role != "admin":
@@ -66,71 +136,260 @@ def get_admin_user(current_user: models.User = Depends(get_current_user)):
 
 # Auth Routes
 @app.post("/register", response_model=schemas.UserResponse)
-def register(user: schemas.UserCreate, db: Session = Depends(get_db)):
-    db_user = crud.get_user_by_email(db, email=user.email)
+@query_stats.query_budget(3)
+async def register(user: schemas.UserCreate, db: AsyncSession = Depends(get_async_db)):
+    db_user = await crud_async.get_user_by_email(db, email=user.email)
     if db_user:
         raise HTTPException(status_code=400, detail="Email already registered")
-    return crud.create_user(db=db, user=user)
+    return await crud_async.create_user(db=db, user=user)
 
 @app.post("/token", response_model=schemas.Token)
-def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
-    user = crud.get_user_by_email(db, email=form_data.username)
-    if not user or not auth.verify_password(form_data.password, user.password_hash):
+@query_stats.query_budget(2)
+async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(get_async_db)):
+    user = await crud_async.get_user_by_email(db, email=form_data.username)
+    # PBKDF2 takes tens of milliseconds of CPU; keep it off the event loop
+    if not user or not await run_in_threadpool(auth.verify_password, form_data.password, user.password_hash):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
-    access_token = auth.create_access_token(data={"sub": user.email})
+    access_token = auth.create_access_token(data=auth.user_claims(user))
     return {"access_token": access_token, "token_type": "bearer"}
 
 @app.get("/users/me", response_model=schemas.UserResponse)
+@query_stats.query_budget(2)
 def read_users_me(current_user: models.User = Depends(get_current_user)):
     return current_user
 
 # Product Routes
+def _decode_cursor(cursor: str | None):
+    try:
+        return pagination.decode_cursor(cursor)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+async def _read_products_lean(request: Request, fields: str, skip: int, limit: int, category: str, search: str, cursor: str, db: AsyncSession) -> Response:
+    try:
+        selected = lean_listing.parse_fields(fields)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    _decode_cursor(cursor)
+    coding = lean_listing.negotiate(request.headers.get("accept-encoding"))
+    key = ("products", selected, coding) + cache.listing_key(skip, limit, category, search, cursor)
+    not_modified = http_cache.precondition(request, key)
+    if not_modified is not None:
+        return not_modified
+    version = cache.catalog_version()
+    page = await lean_listing.get_page(db, selected, skip=skip, limit=limit, category=category, search=search, cursor=cursor)
+    body, applied, etag = page.encoded(coding)
+    extra_headers = {"Vary": "Accept-Encoding"}
+    if page.next_cursor:
+        extra_headers[pagination.NEXT_CURSOR_HEADER] = page.next_cursor
+    headers, fresh = http_cache.remember(request, key, version, etag, extra_headers=extra_headers)
+    if fresh:
+        return Response(status_code=304, headers=headers)
+    if applied:
+        headers["Content-Encoding"] = applied
+    return Response(content=body, media_type="application/json", headers=headers)
+
 @app.get("/products", response_model=list[schemas.ProductResponse])
-def read_products(skip: int = 0, limit: int = 100, category: str = None, search: str = None, db: Session = Depends(get_db)):
-    return crud.get_products(db, skip=skip, limit=limit, category=category, search=search)
+@query_stats.query_budget(3)
+async def read_products(request: Request, response: Response, skip: int = 0, limit: int = 100, category: str = None, search: str = None, cursor: str = None, fields: str = None, db: AsyncSession = Depends(get_async_db)):
+    """
+    Pass the `X-Next-Cursor` response header back as `cursor` to fetch the next page.
+    Send the `ETag` back as `If-None-Match` to get a 304 while the page is unchanged.
+    `fields=id,name,price,image_url` returns only those fields (see lean_listing).
+    """
+    if not product_search.has_terms(search):
+        search = None  # e.g. "!!!": the default listing, keyset-paged, not an unranked "search"
+    if fields:
+        return await _read_products_lean(request, fields, skip, limit, category, search, cursor, db)
+    key = ("products",) + cache.listing_key(skip, limit, category, search, cursor)
+    not_modified = http_cache.precondition(request, key)
+    if not_modified is not None:
+        return not_modified
+    version = cache.catalog_version()
+    position = _decode_cursor(cursor)
+    products = await crud_async.get_products(db, skip=skip, limit=limit, category=category, search=search, cursor=cursor)
+    next_cursor = pagination.next_cursor(products, limit, position, skip, ranked=product_search.has_terms(search))
+    extra_headers = {pagination.NEXT_CURSOR_HEADER: next_cursor} if next_cursor else None
+    not_modified = http_cache.respond(request, response, key, version, http_cache.listing_etag(products, next_cursor),
+                                      extra_headers=extra_headers)
+    return not_modified or products
 
 @app.get("/products/{product_id}", response_model=schemas.ProductResponse)
-def read_product(product_id: int, db: Session = Depends(get_db)):
-    product = crud.get_product(db, product_id=product_id)
+@query_stats.query_budget(2)
+async def read_product(product_id: int, request: Request, response: Response, db: AsyncSession = Depends(get_async_db)):
+    key = ("product", product_id)
+    not_modified = http_cache.precondition(request, key)
+    if not_modified is not None:
+        return not_modified
+    version = cache.catalog_version()
+    product = await crud_async.get_product(db, product_id=product_id)
     if not product:
         raise HTTPException(status_code=404, detail="Product not found")
-    return product
+    not_modified = http_cache.respond(request, response, key, version, http_cache.product_etag(product),
+                                      http_cache.last_modified(product))
+    return not_modified or product
 
 @app.post("/products", response_model=schemas.ProductResponse)
-def create_product(product: schemas.ProductCreate, db: Session = Depends(get_db), admin: models.User = Depends(get_admin_user)):
-    return crud.create_product(db=db, product=product)
+@query_stats.query_budget(3)
+async def create_product(product: schemas.ProductCreate, db: AsyncSession = Depends(get_async_db), admin: models.User = Depends(get_admin_user)):
+    return await crud_async.create_product(db=db, product=product)
+
+def _run_catalog_import(upload: UploadFile, fmt: str, chunk_size: int, dry_run: bool) -> dict:
+    db = database.SessionLocal()
+    stream = io.TextIOWrapper(upload.file, encoding="utf-8-sig", newline="")
+    try:
+        return catalog_import.import_products(db, stream, fmt, chunk_size, dry_run)
+    finally:
+        stream.detach()
+        db.close()
+
+@app.post("/admin/products/import", response_model=schemas.ImportReport)
+async def import_products(
+    file: UploadFile = File(...),
+    format: str = None,
+    chunk_size: int = catalog_import.DEFAULT_CHUNK_SIZE,
+    dry_run: bool = False,
+    admin: models.User = Depends(get_admin_user),
+):
+    """Upsert a CSV / JSON Lines catalog by SKU; see catalog_import for the pipeline."""
+    try:
+        fmt = format or catalog_import.detect_format(file.filename)
+        # The import is long-running sync DB work; keep it off the event loop
+        return await run_in_threadpool(_run_catalog_import, file, fmt, chunk_size, dry_run)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.get("/admin/inventory/{product_id}")
+async def read_inventory(product_id: int, db: AsyncSession = Depends(get_async_db), admin: models.User = Depends(get_admin_user)):
+    stock = await db.run_sync(inventory.status, product_id)
+    if stock is None:
+        raise HTTPException(status_code=404, detail="Product not found")
+    return stock
+
+@app.put("/admin/inventory/{product_id}/shards")
+async def set_stock_shards(product_id: int, count: int = inventory.DEFAULT_SHARDS, db: AsyncSession = Depends(get_async_db), admin: models.User = Depends(get_admin_user)):
+    """Split a hot product's free stock over `count` stock shards (0: back to the product row); see inventory."""
+    if count < 0:
+        raise HTTPException(status_code=400, detail="count must be 0 or more")
+    stock = await db.run_sync(inventory.set_shards, product_id, count)
+    if stock is None:
+        raise HTTPException(status_code=404, detail="Product not found")
+    return stock
+
+@app.get("/admin/cache-stats")
+async def read_cache_stats(admin: models.User = Depends(get_admin_user)):
+    return {**cache.stats(), "chat_sessions": chat_sessions.store.stats()}
+
+@app.get("/admin/routing-stats")
+async def read_routing_stats(admin: models.User = Depends(get_admin_user)):
+    return {
+        **route_stats.snapshot(),
+        "agent_components": registry.stats(),
+        "llm_providers": llm_router.snapshot(),
+        "admission": admission.snapshot(),
+    }
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def read_metrics():
+    """Prometheus scrape endpoint (this worker's agent, tool and LLM timings)."""
+    return PlainTextResponse(metrics.render(), media_type=metrics.CONTENT_TYPE)
+
+@app.get("/admin/tool-output-stats")
+async def read_tool_output_stats(admin: models.User = Depends(get_admin_user)):
+    return budget_stats.snapshot()
 
 # Cart Routes
 @app.get("/cart", response_model=list[schemas.CartItemResponse])
-def get_cart(current_user: models.User = Depends(get_current_user), db: Session = Depends(get_db)):
-    return crud.get_cart_items(db, user_id=current_user.id)
+@query_stats.query_budget(3)
+async def get_cart(current_user: models.User = Depends(get_current_user), db: AsyncSession = Depends(get_async_db)):
+    return await crud_async.get_cart_items(db, user_id=current_user.id)
 
 @app.post("/cart", response_model=schemas.CartItemResponse)
-def add_to_cart(item: schemas.CartItemCreate, current_user: models.User = Depends(get_current_user), db: Session = Depends(get_db)):
-    return crud.add_to_cart(db, user_id=current_user.id, item=item)
+@query_stats.query_budget(18)
+async def add_to_cart(item: schemas.CartItemCreate, current_user: models.User = Depends(get_current_user), db: AsyncSession = Depends(get_async_db)):
+    """Holds the units for INVENTORY_HOLD_TTL seconds, extended by every further add; 409 when they are not in stock."""
+    if item.quantity < 1:
+        raise HTTPException(status_code=400, detail="Quantity must be at least 1")
+    try:
+        return await crud_async.add_to_cart(db, user_id=current_user.id, item=item)
+    except checkout.InsufficientStockError as exc:
+        raise HTTPException(status_code=409, detail=str(exc))
+
+@app.post("/cart/batch", response_model=list[schemas.CartItemResponse])
+@query_stats.query_budget(18)
+async def add_items_to_cart(items: list[schemas.CartItemCreate], current_user: models.User = Depends(get_current_user), db: AsyncSession = Depends(get_async_db)):
+    if not items:
+        raise HTTPException(status_code=400, detail="No items given")
+    if any(item.quantity < 1 for item in items):
+        raise HTTPException(status_code=400, detail="Quantities must be at least 1")
+    try:
+        return await crud_async.add_items_to_cart(db, user_id=current_user.id, items=items)
+    except checkout.InsufficientStockError as exc:
+        raise HTTPException(status_code=409, detail=str(exc))
 
 @app.delete("/cart/{product_id}")
-def remove_from_cart(product_id: int, current_user: models.User = Depends(get_current_user), db: Session = Depends(get_db)):
-    crud.remove_from_cart(db, user_id=current_user.id, product_id=product_id)
+@query_stats.query_budget(5)
+async def remove_from_cart(product_id: int, current_user: models.User = Depends(get_current_user), db: AsyncSession = Depends(get_async_db)):
+    await crud_async.remove_from_cart(db, user_id=current_user.id, product_id=product_id)
     return {"detail": "Item removed from cart"}
 
 # Order Routes
 @app.post("/orders", response_model=schemas.OrderResponse)
-def place_order(order_data: schemas.OrderCreate, current_user: models.User = Depends(get_current_user), db: Session = Depends(get_db)):
-    order = crud.create_order(db, user_id=current_user.id, order_data=order_data)
+@query_stats.query_budget(18)
+async def place_order(order_data: schemas.OrderCreate, current_user: models.User = Depends(get_current_user), db: AsyncSession = Depends(get_async_db)):
+    try:
+        order = await crud_async.create_order(db, user_id=current_user.id, order_data=order_data)
+    except checkout.InsufficientStockError as exc:
+        raise HTTPException(status_code=409, detail=str(exc))
     if not order:
         raise HTTPException(status_code=400, detail="Cart is empty")
     return order
 
+MAX_ORDERS_PAGE = 500
+
 @app.get("/orders", response_model=list[schemas.OrderResponse])
-def get_orders(current_user: models.User = Depends(get_current_user), db: Session = Depends(get_db)):
+@query_stats.query_budget(5)
+async def get_orders(response: Response, limit: int = 100, cursor: str = None, current_user: models.User = Depends(get_current_user), db: AsyncSession = Depends(get_async_db)):
+    """Newest first. Pass the `X-Next-Cursor` response header back as `cursor` to fetch the next page."""
+    position = _decode_cursor(cursor)
+    limit = max(1, min(limit, MAX_ORDERS_PAGE))
     if current_user.role == "admin":
-        return crud.get_all_orders(db)
-    return crud.get_user_orders(db, user_id=current_user.id)
+        orders = await crud_async.get_all_orders(db, limit=limit, cursor=cursor)
+    else:
+        orders = await crud_async.get_user_orders(db, user_id=current_user.id, limit=limit, cursor=cursor)
+    next_cursor = pagination.next_cursor(orders, limit, position)
+    if next_cursor:
+        response.headers[pagination.NEXT_CURSOR_HEADER] = next_cursor
+    return orders
+
+# Analytics Routes (admin) — served from the sales rollups, not the order history.
+# A background task rebuilds the last two days every ANALYTICS_REFRESH_INTERVAL
+# seconds, and startup backfills everything once when the rollups are empty.
+# Older orders imported or edited later only show up after `python analytics.py rebuild`.
+@app.get("/admin/analytics/summary", response_model=schemas.SalesSummary)
+@query_stats.query_budget(2)
+async def analytics_summary(start: date = None, end: date = None, db: AsyncSession = Depends(get_async_db), admin: models.User = Depends(get_admin_user)):
+    """Totals for [start, end] from the rollups; see `python analytics.py rebuild` when they look short."""
+    return await db.run_sync(analytics.summary, start, end)
+
+@app.get("/admin/analytics/daily", response_model=list[schemas.DailySales])
+@query_stats.query_budget(2)
+async def analytics_daily(start: date = None, end: date = None, db: AsyncSession = Depends(get_async_db), admin: models.User = Depends(get_admin_user)):
+    return await db.run_sync(analytics.daily, start, end)
+
+@app.get("/admin/analytics/categories", response_model=list[schemas.CategorySales])
+@query_stats.query_budget(2)
+async def analytics_categories(start: date = None, end: date = None, db: AsyncSession = Depends(get_async_db), admin: models.User = Depends(get_admin_user)):
+    return await db.run_sync(analytics.by_category, start, end)
+
+@app.get("/admin/analytics/products", response_model=list[schemas.ProductSales])
+@query_stats.query_budget(2)
+async def analytics_products(start: date = None, end: date = None, limit: int = 10, db: AsyncSession = Depends(get_async_db), admin: models.User = Depends(get_admin_user)):
+    return await db.run_sync(analytics.top_products, start, end, max(1, min(limit, 100)))
 
 # AI Agent Route
 class HistoryMessage(PydanticBaseModel):
@@ -139,16 +398,84 @@ class HistoryMessage(PydanticBaseModel):
 
 class ChatQuery(PydanticBaseModel):
     content: str
-    history: list[HistoryMessage] = []  # full conversation history
+    session_id: str | None = None       # returned by the previous turn; the server keeps the history
+    history: list[HistoryMessage] = []  # legacy: full history, only used to seed a new session
+    debug: bool = False                 # include per-node / tool / LLM timings in the reply
+
+async def _chat_session(query: ChatQuery, user_id: int) -> chat_sessions.ChatSession:
+    history = [{"role": m.role, "content": m.content} for m in query.history]
+    return await chat_sessions.load(query.session_id, user_id, history)
+
+async def _admit_chat(request: Request, current_user: models.User | None) -> admission.Ticket:
+    # Anonymous turns all run as user 1, so they are rate limited per client address instead
+    client_key = f"user:{current_user.id}" if current_user else f"addr:{request.client.host if request.client else ''}"
+    try:
+        return await admission.admit(client_key)
+    except admission.AdmissionRejected as exc:
+        raise HTTPException(status_code=exc.status_code, detail=exc.detail,
+                            headers={"Retry-After": str(exc.retry_after)})
 
 @app.post("/chat")
-async def chat_with_agent(query: ChatQuery, current_user: models.User = Depends(get_current_user_optional)):
+async def chat_with_agent(query: ChatQuery, request: Request, current_user: models.User = Depends(get_current_user_optional)):
     user_id = current_user.id if current_user else 1
-    history = [{"role": m.role, "content": m.content} for m in query.history]
-    response, agents_used, actions = await run_agent(query.content, user_id, history)
-    return {
+    async with await _admit_chat(request, current_user):
+        session = await _chat_session(query, user_id)
+        with tracing.collect() if query.debug else nullcontext() as trace:
+            response, agents_used, actions, route_path = await run_agent(
+                query.content, user_id, session.messages, session.history_str
+            )
+    session.record_turn(query.content, response)
+    await chat_sessions.save(session)
+    reply = {
         "response":    response,
         "agents_used": agents_used,
         "actions":     actions,
+        "route":       route_path,
+        "session_id":  session.id,
     }
+    if trace is not None:
+        reply["timings"] = trace.timings()
+        reply["trace"] = trace.otlp()
+    return reply
+
+@app.delete("/chat/sessions/{session_id}")
+async def delete_chat_session(session_id: str, current_user: models.User = Depends(get_current_user_optional)):
+    user_id = current_user.id if current_user else 1
+    if not await chat_sessions.discard(session_id, user_id):
+        raise HTTPException(status_code=404, detail="Chat session not found")
+    return {"detail": "Chat session deleted"}
 
+@app.post("/chat/stream")
+async def chat_with_agent_stream(query: ChatQuery, request: Request, current_user: models.User = Depends(get_current_user_optional)):
+    """Server-Sent Events variant of /chat — see agents.agent_graph.stream_agent for the event types."""
+    user_id = current_user.id if current_user else 1
+    # Admitted before the response starts, so a rejection is a real 429/503; held until the stream ends
+    ticket = await _admit_chat(request, current_user)
+    try:
+        session = await _chat_session(query, user_id)
+    except BaseException:
+        ticket.release()
+        raise
+
+    async def event_source():
+        try:
+            with tracing.collect() if query.debug else nullcontext() as trace:
+                async for event in stream_agent(query.content, user_id, session.messages, session.history_str):
+                    if event["event"] == "done":
+                        session.record_turn(query.content, event["response"])
+                        await chat_sessions.save(session)
+                        event = {**event, "session_id": session.id}
+                        if trace is not None:
+                            event["timings"] = trace.timings()
+                    yield f"event: {event['event']}\ndata: {json.dumps(event, ensure_ascii=False)}\n\n"
+        except Exception as exc:
+            yield f"event: error\ndata: {json.dumps({'event': 'error', 'detail': str(exc)})}\n\n"
+        finally:
+            ticket.release()
+
+    return StreamingResponse(
+        event_source(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        background=BackgroundTask(ticket.release),  # in case the body is never iterated
+    )
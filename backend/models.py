@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, ForeignKey, DateTime, Text, Boolean
+from sqlalchemy import Column, Integer, String, Float, ForeignKey, Date, DateTime, Text, Boolean, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from database import Base
@@ -24,7 +24,18 @@ class Product(Base):
     stock_quantity = Column(Integer, default=0)
     category = Column(String, index=True)
     image_url = Column(String)
+    sku = Column(String)  # supplier stock-keeping unit; natural key for bulk imports
     created_at = Column(DateTime, default=datetime.utcnow)
+    # Drives the catalog ETag / Last-Modified (http_cache); NULL on rows untouched since it was added
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    # Units held for carts by stock holds counted on this row (inventory.py); NULL reads as 0
+    reserved_quantity = Column(Integer, default=0)
+
+    # Keyset pagination on (created_at, id)
+    __table_args__ = (
+        Index("ix_products_created_at_id", "created_at", "id"),
+        Index("ux_products_sku", "sku", unique=True),
+    )
 
 class Order(Base):
     __tablename__ = "orders"
@@ -35,6 +46,12 @@ class Order(Base):
     shipping_address = Column(Text, nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow)
 
+    # Keyset pagination on (created_at, id), overall and per user
+    __table_args__ = (
+        Index("ix_orders_created_at_id", "created_at", "id"),
+        Index("ix_orders_user_id_created_at_id", "user_id", "created_at", "id"),
+    )
+
     user = relationship("User", back_populates="orders")
     items = relationship("OrderItem", back_populates="order")
 
@@ -58,3 +75,60 @@ class CartItem(Base):
 
     user = relationship("User", back_populates="cart_items")
     product = relationship("Product")
+
+# Time-limited stock reservations taken when a product goes into a cart (inventory.py)
+class StockHold(Base):
+    __tablename__ = "stock_holds"
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    product_id = Column(Integer, ForeignKey("products.id"), nullable=False)
+    shard = Column(Integer) # StockShard the units came from; NULL when counted in products.reserved_quantity
+    quantity = Column(Integer, nullable=False)
+    expires_at = Column(DateTime, index=True, nullable=False)
+
+    __table_args__ = (
+        Index("ix_stock_holds_user_id_product_id", "user_id", "product_id"),
+    )
+
+# Free stock of a hot product split over several rows, so holds do not all
+# queue on the product row; `sold` is folded into products.stock_quantity later
+class StockShard(Base):
+    __tablename__ = "stock_shards"
+    product_id = Column(Integer, ForeignKey("products.id"), primary_key=True)
+    shard = Column(Integer, primary_key=True)
+    available = Column(Integer, nullable=False, default=0)
+    sold = Column(Integer, nullable=False, default=0)
+
+# Sales rollups — rebuilt from orders/order_items for recent days by the server's
+# analytics.run_refresh task, and for any range by `python analytics.py rebuild`
+class SalesDaily(Base):
+    __tablename__ = "sales_daily"
+    day = Column(Date, primary_key=True)
+    orders = Column(Integer, nullable=False, default=0)
+    units = Column(Integer, nullable=False, default=0)
+    revenue = Column(Float, nullable=False, default=0.0)
+
+class SalesDailyCategory(Base):
+    __tablename__ = "sales_daily_category"
+    day = Column(Date, primary_key=True)
+    category = Column(String, primary_key=True) # "" for uncategorised products
+    orders = Column(Integer, nullable=False, default=0)
+    units = Column(Integer, nullable=False, default=0)
+    revenue = Column(Float, nullable=False, default=0.0)
+
+class SalesDailyProduct(Base):
+    __tablename__ = "sales_daily_product"
+    day = Column(Date, primary_key=True)
+    product_id = Column(Integer, ForeignKey("products.id"), primary_key=True)
+    orders = Column(Integer, nullable=False, default=0)
+    units = Column(Integer, nullable=False, default=0)
+    revenue = Column(Float, nullable=False, default=0.0)
+
+# Server-side /chat conversation state (chat_sessions.DatabaseSessionStore)
+class ChatSession(Base):
+    __tablename__ = "chat_sessions"
+    id = Column(String, primary_key=True)
+    user_id = Column(Integer, index=True)
+    messages = Column(Text, nullable=False, default="[]") # JSON list of {role, content}, newest last
+    updated_at = Column(DateTime, default=datetime.utcnow)
+    expires_at = Column(DateTime, index=True, nullable=False)
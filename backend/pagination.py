@@ -0,0 +1,95 @@
+"""
+Opaque cursors for keyset pagination.
+
+Listings are ordered by (created_at, id) and a page continues strictly after
+(or before, for newest-first listings) the last row of the previous one, so
+the cost of a page does not grow with how deep the client has paged. Ranked
+search results have no stable keyset, so their cursors carry an offset
+instead — clients cannot tell the difference.
+
+Cursors are URL-safe base64 JSON and are returned in the `X-Next-Cursor`
+response header; an absent header means there are no more rows.
+"""
+import base64
+import json
+from datetime import datetime
+
+from sqlalchemy import tuple_
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(payload: dict) -> str:
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str | None) -> dict | None:
+    """Raises ValueError for anything that is not a cursor we issued."""
+    if not cursor:
+        return None
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded))
+    except Exception as exc:
+        raise ValueError("Invalid cursor") from exc
+    if not isinstance(payload, dict) or not ({"k", "o"} & payload.keys()):
+        raise ValueError("Invalid cursor")
+    try:
+        if "k" in payload:
+            created_at, row_id = payload["k"]
+            payload["k"] = [datetime.fromisoformat(created_at), int(row_id)]
+        else:
+            payload["o"] = max(int(payload["o"]), 0)
+    except (TypeError, ValueError) as exc:
+        raise ValueError("Invalid cursor") from exc
+    return payload
+
+
+def keyset_cursor(row) -> str:
+    return encode_cursor({"k": [row.created_at.isoformat(), row.id]})
+
+
+def offset_cursor(offset: int) -> str:
+    return encode_cursor({"o": offset})
+
+
+def cursor_offset(cursor: dict | None, default: int = 0) -> int:
+    if cursor and "o" in cursor:
+        return int(cursor["o"])
+    return default
+
+
+def _apply_keyset(query, model, cursor: dict | None, descending: bool = False):
+    """Order `query` by (created_at, id) and resume after the cursor position, if any."""
+    key = tuple_(model.created_at, model.id)
+    if cursor and "k" in cursor:
+        position = tuple_(*cursor["k"])
+        query = query.where(key < position if descending else key > position)
+    if descending:
+        return query.order_by(model.created_at.desc(), model.id.desc())
+    return query.order_by(model.created_at, model.id)
+
+
+def paginate(query, model, cursor: dict | None, skip: int = 0, ranked: bool = False, descending: bool = False):
+    """
+    Apply cursor pagination to a `select()` / `Query` (the caller applies LIMIT).
+    `ranked` listings (search results) keep their relevance order and page by
+    offset; all others are keyset-paged. `skip` is honoured on the first page
+    for clients that still page by offset.
+    """
+    if ranked:
+        return query.offset(cursor_offset(cursor, skip))
+    query = _apply_keyset(query, model, cursor, descending)
+    if cursor is None and skip:
+        query = query.offset(skip)
+    return query
+
+
+def next_cursor(rows, limit: int | None, cursor: dict | None = None, skip: int = 0, ranked: bool = False) -> str | None:
+    """Cursor for the page after `rows`, or None when this was the last page."""
+    if not rows or limit is None or len(rows) < limit:
+        return None
+    if ranked:
+        return offset_cursor(cursor_offset(cursor, skip) + len(rows))
+    return keyset_cursor(rows[-1])
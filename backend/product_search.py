@@ -0,0 +1,137 @@
+"""
+Indexed full-text product search.
+
+  • PostgreSQL — a generated `search_vector` tsvector column with a GIN index.
+  • SQLite     — an FTS5 `products_fts` mirror kept in sync by triggers.
+  • Anything else falls back to the old `LIKE '%term%'` scan.
+
+The index DDL is attached to the `products` table so `metadata.create_all`
+builds it, and `ensure_search_index` back-fills it on existing databases.
+Because the index is maintained by the database itself (generated column /
+triggers), every insert or update — including `crud.create_product` — is
+searchable immediately.
+"""
+import re
+
+from sqlalchemy import DDL, event, literal_column, select, table, column, func, text
+from sqlalchemy.engine import Connection
+
+import models
+
+_TS_CONFIG = "english"
+
+_PG_DDL = [
+    f"""
+    ALTER TABLE products ADD COLUMN IF NOT EXISTS search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('{_TS_CONFIG}', coalesce(name, '')), 'A') ||
+        setweight(to_tsvector('{_TS_CONFIG}', coalesce(description, '')), 'B')
+    ) STORED
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_products_search_vector ON products USING GIN (search_vector)",
+]
+
+_SQLITE_DDL = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS products_fts USING fts5(
+        name, description, content='products', content_rowid='id',
+        tokenize='porter unicode61'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS products_fts_ai AFTER INSERT ON products BEGIN
+        INSERT INTO products_fts(rowid, name, description)
+        VALUES (new.id, new.name, new.description);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS products_fts_ad AFTER DELETE ON products BEGIN
+        INSERT INTO products_fts(products_fts, rowid, name, description)
+        VALUES ('delete', old.id, old.name, old.description);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS products_fts_au AFTER UPDATE OF name, description ON products BEGIN
+        INSERT INTO products_fts(products_fts, rowid, name, description)
+        VALUES ('delete', old.id, old.name, old.description);
+        INSERT INTO products_fts(rowid, name, description)
+        VALUES (new.id, new.name, new.description);
+    END
+    """,
+]
+
+for _stmt in _PG_DDL:
+    event.listen(models.Product.__table__, "after_create", DDL(_stmt).execute_if(dialect="postgresql"))
+for _stmt in _SQLITE_DDL:
+    event.listen(models.Product.__table__, "after_create", DDL(_stmt).execute_if(dialect="sqlite"))
+event.listen(
+    models.Product.__table__, "before_drop",
+    DDL("DROP TABLE IF EXISTS products_fts").execute_if(dialect="sqlite"),
+)
+
+
+def ensure_search_index(conn: Connection):
+    """Create the search index on an existing `products` table (idempotent)."""
+    dialect = conn.dialect.name
+    if dialect == "postgresql":
+        for stmt in _PG_DDL:
+            conn.execute(text(stmt))
+    elif dialect == "sqlite":
+        exists = conn.execute(
+            text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'products_fts'")
+        ).first()
+        for stmt in _SQLITE_DDL:
+            conn.execute(text(stmt))
+        if not exists:
+            conn.execute(text("INSERT INTO products_fts(products_fts) VALUES ('rebuild')"))
+
+
+_TERM_RE = re.compile(r"\w+", re.UNICODE)
+
+def _terms(search: str) -> list[str]:
+    return _TERM_RE.findall(search.lower())
+
+
+def has_terms(search: str | None) -> bool:
+    """
+    Whether `search` has anything to match. One without terms (e.g. "!!!") is
+    no search at all: list the catalog in its default keyset order instead of
+    treating the unfiltered rows as ranked results.
+    """
+    return bool(search) and bool(_terms(search))
+
+
+_fts = table("products_fts", column("rowid"), column("rank"))
+
+def apply_search(query, search: str, dialect: str):
+    """
+    Restrict a Product `select()` / `Query` to rows matching `search`,
+    ordered by relevance. Every term must match (as a prefix).
+    """
+    terms = _terms(search)
+    if not terms:
+        return query
+
+    if dialect == "postgresql":
+        tsquery = func.to_tsquery(_TS_CONFIG, " & ".join(f"{t}:*" for t in terms))
+        vector = literal_column("products.search_vector")
+        return (
+            query.where(vector.op("@@")(tsquery))
+            .order_by(func.ts_rank_cd(vector, tsquery).desc(), models.Product.id)
+        )
+
+    if dialect == "sqlite":
+        match = " ".join(f'"{t}"*' for t in terms)
+        hits = (
+            select(_fts.c.rowid, _fts.c.rank)
+            .where(literal_column("products_fts").op("MATCH")(match))
+            .subquery()
+        )
+        return (
+            query.join(hits, hits.c.rowid == models.Product.id)
+            .order_by(hits.c.rank, models.Product.id)
+        )
+
+    return query.where(
+        models.Product.name.contains(search) | models.Product.description.contains(search)
+    )
@@ -0,0 +1,267 @@
+"""
+Per-request and per-tool SQL query accounting.
+
+SQLAlchemy cursor events on both engines (sync and async) count every
+statement, its time and its normalized text (literals and bind parameters
+stripped, IN lists collapsed) into whichever scopes are active:
+
+  • QueryAccountingMiddleware opens one scope per HTTP request and adds
+      X-DB-Query-Count, X-DB-Query-Time-Ms and X-DB-Repeated-Queries
+    to the response (QUERY_STATS_HEADERS=0 to leave them out)
+  • `track(name, kind)` opens one anywhere else — the agents open one per
+    tool call
+
+Scopes nest: a tool call's queries also count toward its request. A
+SELECT pattern run N_PLUS_ONE_THRESHOLD or more times in one scope is
+reported as a repeated statement — usually a lazy relationship loaded per
+row. Finished scopes feed the db_* metrics at /metrics.
+
+Every route has a query budget: DEFAULT_QUERY_BUDGET, or the number given
+with the `@query_budget(n)` decorator; every agent tool call has
+TOOL_QUERY_BUDGET. With QUERY_BUDGET_STRICT=1 (tests,
+benchmarks, CI) exceeding a budget or repeating a statement raises
+QueryBudgetExceeded from the offending query, so the request fails loudly;
+otherwise it is only counted and logged.
+
+QUERY_ACCOUNTING=0 removes the listeners entirely.
+"""
+import contextlib
+import contextvars
+import logging
+import os
+import re
+import time
+from collections import Counter
+
+from sqlalchemy import event
+
+import database, metrics
+
+QUERY_ACCOUNTING = os.getenv("QUERY_ACCOUNTING", "1").lower() not in ("0", "false", "no")
+QUERY_STATS_HEADERS = os.getenv("QUERY_STATS_HEADERS", "1").lower() not in ("0", "false", "no")
+QUERY_BUDGET_STRICT = os.getenv("QUERY_BUDGET_STRICT", "0").lower() in ("1", "true", "yes")
+DEFAULT_QUERY_BUDGET = int(os.getenv("DEFAULT_QUERY_BUDGET", "20"))
+TOOL_QUERY_BUDGET = int(os.getenv("TOOL_QUERY_BUDGET", "10"))
+N_PLUS_ONE_THRESHOLD = int(os.getenv("N_PLUS_ONE_THRESHOLD", "5"))
+
+COUNT_HEADER = "X-DB-Query-Count"
+TIME_HEADER = "X-DB-Query-Time-Ms"
+REPEATED_HEADER = "X-DB-Repeated-Queries"
+
+logger = logging.getLogger(__name__)
+
+_queries_per_scope = metrics.histogram(
+    "db_queries_per_scope", "SQL statements per HTTP request or agent tool call", ("kind", "name"),
+    buckets=(1, 2, 3, 5, 8, 13, 21, 34, 55, 100),
+)
+_db_seconds = metrics.histogram(
+    "db_time_seconds", "Time spent in SQL statements per HTTP request or agent tool call", ("kind", "name"),
+)
+_repeated_statements = metrics.counter(
+    "db_repeated_statements", "Statement patterns repeated N_PLUS_ONE_THRESHOLD+ times in one scope", ("kind", "name"),
+)
+_budget_exceeded = metrics.counter(
+    "db_query_budget_exceeded", "Scopes that issued more statements than their budget", ("kind", "name"),
+)
+
+
+class QueryBudgetExceeded(RuntimeError):
+    """Raised in strict mode when a scope goes over its query budget or repeats a statement."""
+
+
+_PARAM_RE = re.compile(r"%\(\w+\)s|\$\d+|:\w+|%s")
+_NUMBER_RE = re.compile(r"\b\d+(\.\d+)?\b")
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_LIST_RE = re.compile(r"\?(?:\s*,\s*\?)+")
+_SPACE_RE = re.compile(r"\s+")
+
+
+def normalize(statement: str) -> str:
+    """The statement's shape: bind parameters and literals become ?, IN lists one ?…"""
+    text = _STRING_RE.sub("?", statement)
+    text = _PARAM_RE.sub("?", text)
+    text = _NUMBER_RE.sub("?", text)
+    text = _LIST_RE.sub("?…", text)
+    return _SPACE_RE.sub(" ", text).strip()
+
+
+class QueryStats:
+    """Statements seen by one scope."""
+
+    __slots__ = ("kind", "name", "budget", "count", "seconds", "patterns", "_flagged", "asgi_scope")
+
+    def __init__(self, kind: str, name: str, budget: int | None = None, asgi_scope: dict = None):
+        self.kind = kind
+        self.name = name
+        self.budget = budget
+        # Request scopes learn their route (and its budget) once the router has matched it
+        self.asgi_scope = asgi_scope
+        self.count = 0
+        self.seconds = 0.0
+        self.patterns: Counter = Counter()
+        self._flagged: set[str] = set()
+
+    def record(self, pattern: str, seconds: float):
+        self.count += 1
+        self.seconds += seconds
+        self.patterns[pattern] += 1
+
+    def check(self, pattern: str):
+        """Budget and repetition checks for the statement about to run."""
+        if self.budget is None and self.asgi_scope is not None:
+            _apply_route(self.asgi_scope, self)
+        if self.budget is not None and self.count + 1 > self.budget and "budget" not in self._flagged:
+            self._flagged.add("budget")
+            _budget_exceeded.inc(kind=self.kind, name=self.name)
+            self._violation(f"{self.kind} {self.name!r} exceeded its query budget of {self.budget}")
+        repeats = self.patterns[pattern] + 1
+        if (repeats >= N_PLUS_ONE_THRESHOLD and pattern.startswith("SELECT")
+                and pattern not in self._flagged):
+            self._flagged.add(pattern)
+            self._violation(
+                f"{self.kind} {self.name!r} ran the same statement {repeats} times "
+                f"(N+1 query?): {pattern[:300]}"
+            )
+
+    def _violation(self, message: str):
+        if QUERY_BUDGET_STRICT:
+            raise QueryBudgetExceeded(message)
+        logger.warning(message)
+
+    def repeated(self) -> dict[str, int]:
+        return {
+            pattern: n for pattern, n in self.patterns.most_common()
+            if n >= N_PLUS_ONE_THRESHOLD and pattern.startswith("SELECT")
+        }
+
+    def snapshot(self) -> dict:
+        return {
+            "count": self.count,
+            "time_ms": round(self.seconds * 1000, 3),
+            "budget": self.budget,
+            "repeated": self.repeated(),
+        }
+
+
+# Every open scope, innermost last
+_scopes: contextvars.ContextVar[tuple[QueryStats, ...]] = contextvars.ContextVar("query_scopes", default=())
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    scopes = _scopes.get()
+    if not scopes:
+        return
+    pattern = normalize(statement)
+    for scope in scopes:
+        scope.check(pattern)
+    conn.info.setdefault("query_stats_started", []).append((pattern, time.perf_counter()))
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info.get("query_stats_started")
+    if not started:
+        return
+    pattern, at = started.pop()
+    elapsed = time.perf_counter() - at
+    for scope in _scopes.get():
+        scope.record(pattern, elapsed)
+
+
+def _handle_error(exception_context):
+    # The statement failed: drop its pending timer so the stack stays aligned
+    conn = exception_context.connection
+    if conn is not None and conn.info.get("query_stats_started"):
+        conn.info["query_stats_started"].pop()
+
+
+def instrument(engine):
+    """Attach the accounting listeners to a (sync) Engine."""
+    if engine is None or event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        return
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "handle_error", _handle_error)
+
+
+if QUERY_ACCOUNTING:
+    instrument(database.engine)
+    if database.async_engine is not None:
+        instrument(database.async_engine.sync_engine)
+
+
+def _finish(stats: QueryStats):
+    _queries_per_scope.observe(stats.count, kind=stats.kind, name=stats.name)
+    _db_seconds.observe(stats.seconds, kind=stats.kind, name=stats.name)
+    if stats.repeated():
+        _repeated_statements.inc(len(stats.repeated()), kind=stats.kind, name=stats.name)
+
+
+@contextlib.contextmanager
+def track(name: str, kind: str = "block", budget: int | None = None):
+    """Account the statements run inside the block (and report them to /metrics)."""
+    stats = QueryStats(kind, name, budget)
+    token = _scopes.set(_scopes.get() + (stats,))
+    try:
+        yield stats
+    finally:
+        _scopes.reset(token)
+        _finish(stats)
+
+
+def current() -> QueryStats | None:
+    """The innermost open scope, if any."""
+    scopes = _scopes.get()
+    return scopes[-1] if scopes else None
+
+
+def query_budget(n: int):
+    """Route decorator: allow the endpoint at most `n` SQL statements per request."""
+    def decorate(endpoint):
+        endpoint.__query_budget__ = n
+        return endpoint
+    return decorate
+
+
+class QueryAccountingMiddleware:
+    """ASGI middleware: one accounting scope per HTTP request, reported in response headers."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not QUERY_ACCOUNTING:
+            await self.app(scope, receive, send)
+            return
+
+        stats = QueryStats("request", scope.get("path", ""), asgi_scope=scope)
+        token = _scopes.set(_scopes.get() + (stats,))
+
+        async def send_with_headers(message):
+            if message["type"] == "http.response.start":
+                _apply_route(scope, stats)
+                if QUERY_STATS_HEADERS:
+                    headers = list(message.get("headers", []))
+                    headers.append((COUNT_HEADER.lower().encode(), str(stats.count).encode()))
+                    headers.append((TIME_HEADER.lower().encode(), f"{stats.seconds * 1000:.3f}".encode()))
+                    headers.append((REPEATED_HEADER.lower().encode(), str(len(stats.repeated())).encode()))
+                    message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_headers)
+        finally:
+            _scopes.reset(token)
+            _apply_route(scope, stats)
+            if scope.get("route") is None:
+                stats.name = "unmatched"  # keep 404 paths out of the metric labels
+            _finish(stats)
+
+
+def _apply_route(scope, stats: QueryStats):
+    """Label the scope with the matched route template and adopt the endpoint's budget."""
+    route = scope.get("route")
+    if route is None or stats.budget is not None:
+        return
+    stats.name = f"{scope.get('method', '')} {getattr(route, 'path', stats.name)}"
+    endpoint = scope.get("endpoint")
+    stats.budget = getattr(endpoint, "__query_budget__", DEFAULT_QUERY_BUDGET)
@@ -1,6 +1,6 @@
 from pydantic import BaseModel, EmailStr
 from typing import List, Optional
-from datetime import datetime
+from datetime import date, datetime
 
 # User Schemas
 class UserBase(BaseModel):
@@ -33,6 +33,7 @@ class ProductBase(BaseModel):
     stock_quantity: int
     category: Optional[str] = None
     image_url: Optional[str] = None
+    sku: Optional[str] = None
 
 class ProductCreate(ProductBase):
     pass
@@ -40,6 +41,7 @@ class ProductCreate(ProductBase):
 class ProductResponse(ProductBase):
     id: int
     created_at: datetime
+    updated_at: Optional[datetime] = None
     class Config:
         from_attributes = True
 
@@ -78,3 +80,42 @@ class OrderResponse(BaseModel):
     items: List[OrderItemResponse]
     class Config:
         from_attributes = True
+
+# Analytics Schemas
+class SalesTotals(BaseModel):
+    orders: int
+    units: int
+    revenue: float
+
+class SalesSummary(SalesTotals):
+    start: Optional[date] = None
+    end: Optional[date] = None
+    average_order_value: float
+
+class DailySales(SalesTotals):
+    day: date
+
+class CategorySales(SalesTotals):
+    category: str
+
+class ProductSales(SalesTotals):
+    product_id: int
+    name: Optional[str] = None
+
+# Bulk Import Schemas
+class ImportRejection(BaseModel):
+    line: int
+    sku: Optional[str] = None
+    errors: List[str]
+
+class ImportReport(BaseModel):
+    rows: int
+    inserted: int
+    updated: int
+    rejected: int
+    duplicates: int
+    chunks: int
+    seconds: float
+    rows_per_second: float
+    dry_run: bool = False
+    rejections: List[ImportRejection]
@@ -1,5 +1,5 @@
 from sqlalchemy.orm import Session
-import models, auth, database
+import models, auth, database, product_search  # product_search registers the full-text index DDL
 from database import engine
 
 def seed_db():
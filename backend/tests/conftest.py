@@ -0,0 +1,23 @@
+"""
+Shared test setup. The suite runs against a throwaway SQLite database:
+DATABASE_URL has to be set before the app modules are imported, because
+database.py creates its engines at import time.
+"""
+import os
+import sys
+import tempfile
+
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='tests-'), 'test.db')}"
+os.environ.pop("ASYNC_DATABASE_URL", None)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+import database, models
+
+
+@pytest.fixture(scope="session", autouse=True)
+def schema():
+    models.Base.metadata.create_all(bind=database.engine)
+    yield
+    database.engine.dispose()
@@ -0,0 +1,47 @@
+"""Sales rollups: startup backfill and the background refresh."""
+from sqlalchemy import delete, func, select
+
+import analytics, crud, database, models, schemas
+
+
+def test_backfill_fills_empty_rollups_once():
+    db = database.SessionLocal()
+    try:
+        user = models.User(email="analytics@shop.com", password_hash="x")
+        product = models.Product(name="Analytics Product", price=2.5, stock_quantity=10, category="QC")
+        db.add_all([user, product])
+        db.flush()
+        order = models.Order(user_id=user.id, total_amount=5.0, shipping_address="1 Test St")
+        db.add(order)
+        db.flush()
+        db.add(models.OrderItem(order_id=order.id, product_id=product.id, quantity=2, price_at_purchase=2.5))
+        for model in (models.SalesDaily, models.SalesDailyCategory, models.SalesDailyProduct):
+            db.execute(delete(model))
+        db.commit()
+        orders = db.execute(select(func.count()).select_from(models.Order)).scalar_one()
+
+        assert analytics.backfill(db)
+        assert analytics.summary(db)["orders"] == orders
+        assert not analytics.backfill(db)
+    finally:
+        db.close()
+
+
+def test_checkout_leaves_rollups_to_the_refresh():
+    db = database.SessionLocal()
+    try:
+        user = models.User(email="refresh@shop.com", password_hash="x")
+        product = models.Product(name="Refresh Product", price=4.0, stock_quantity=10, category="QC")
+        db.add_all([user, product])
+        db.commit()
+        analytics.refresh()
+        before = analytics.summary(db)["orders"]
+
+        crud.add_items_to_cart(db, user.id, [schemas.CartItemCreate(product_id=product.id, quantity=1)])
+        assert crud.create_order(db, user.id, schemas.OrderCreate(shipping_address="1 Test St"))
+        assert analytics.summary(db)["orders"] == before
+
+        analytics.refresh()
+        assert analytics.summary(db)["orders"] == before + 1
+    finally:
+        db.close()
@@ -0,0 +1,32 @@
+"""Register and login must hash passwords in the threadpool, not on the event loop."""
+import asyncio
+import threading
+
+import httpx
+
+import auth, database, main
+
+
+def test_password_hashing_runs_off_the_event_loop(monkeypatch):
+    threads = []
+
+    def spy(fn):
+        def wrapper(*args):
+            threads.append(threading.current_thread())
+            return fn(*args)
+        return wrapper
+
+    monkeypatch.setattr(auth, "get_password_hash", spy(auth.get_password_hash))
+    monkeypatch.setattr(auth, "verify_password", spy(auth.verify_password))
+
+    async def run():
+        loop_thread = threading.current_thread()
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=main.app), base_url="http://test") as client:
+            registered = await client.post("/register", json={"email": "hash@shop.com", "password": "s3cret!"})
+            token = await client.post("/token", data={"username": "hash@shop.com", "password": "s3cret!"})
+        await database.async_engine.dispose()
+        return loop_thread, registered, token
+
+    loop_thread, registered, token = asyncio.run(run())
+    assert registered.status_code == 200 and token.status_code == 200
+    assert len(threads) == 2 and loop_thread not in threads
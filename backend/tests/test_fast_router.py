@@ -0,0 +1,33 @@
+"""The keyword router must leave anything it cannot route with confidence to the LLM."""
+import pytest
+
+from agents import fast_router
+
+
+@pytest.mark.parametrize("message", [
+    "what is your return policy",
+    "show me how to reset my password",
+    "any discounts for students?",
+    "do you have a return policy",
+    "I'm looking for help with my account",
+    "is it any good?",
+])
+def test_non_product_questions_go_to_the_llm(message):
+    assert fast_router.classify(message) is None
+
+
+@pytest.mark.parametrize("message", [
+    "show me headphones",
+    "what laptops do you have under $500",
+    "any shirts in size M",
+    "find black and white shoes",
+    "do you have leather boots",
+    "looking for a backpack under $60",
+])
+def test_product_questions_go_to_product_search(message):
+    assert fast_router.classify(message) == (["ProductSearch"], [message])
+
+
+def test_mixed_message_is_split():
+    assert fast_router.classify("where is my order and show me wallets") == (
+        ["OrderTracker", "ProductSearch"], ["where is my order", "show me wallets"])
@@ -0,0 +1,27 @@
+"""Stock holds and sharded stock."""
+import crud, database, inventory, models, schemas
+
+
+def test_set_shards_keeps_unfolded_sales():
+    db = database.SessionLocal()
+    try:
+        user = models.User(email="shards@shop.com", password_hash="x")
+        product = models.Product(name="Sharded Product", price=1.0, stock_quantity=20, category="QC")
+        db.add_all([user, product])
+        db.commit()
+        user_id, product_id = user.id, product.id
+
+        inventory.set_shards(db, product_id, 4)
+        crud.add_items_to_cart(db, user_id, [schemas.CartItemCreate(product_id=product_id, quantity=3)])
+        assert crud.create_order(db, user_id, schemas.OrderCreate(shipping_address="1 Test St"))
+        assert inventory.status(db, product_id)["unfolded_sold"] == 3
+
+        stock = inventory.set_shards(db, product_id, 8)
+        assert stock["stock_quantity"] == 17
+        assert stock["unfolded_sold"] == 0
+        assert sum(shard["available"] for shard in stock["shards"]) == 17
+
+        stock = inventory.set_shards(db, product_id, 0)
+        assert stock["stock_quantity"] == 17 and stock["available"] == 17
+    finally:
+        db.close()
@@ -0,0 +1,40 @@
+"""Product search and its pagination."""
+import asyncio
+
+import httpx
+
+import database, main, models, pagination
+
+
+def _pages(params: dict) -> tuple[list[list[int]], list[dict]]:
+    async def run():
+        pages, cursors, cursor = [], [], None
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=main.app), base_url="http://test") as client:
+            while True:
+                response = await client.get("/products", params={**params, **({"cursor": cursor} if cursor else {})})
+                assert response.status_code == 200
+                pages.append([product["id"] for product in response.json()])
+                cursor = response.headers.get(pagination.NEXT_CURSOR_HEADER)
+                if not cursor:
+                    break
+                cursors.append(pagination.decode_cursor(cursor))
+        await database.async_engine.dispose()
+        return pages, cursors
+
+    return asyncio.run(run())
+
+
+def test_search_without_terms_is_the_default_listing():
+    db = database.SessionLocal()
+    try:
+        db.add_all(models.Product(name=f"Termless {i}", price=1.0, stock_quantity=1, category="Termless")
+                   for i in range(5))
+        db.commit()
+    finally:
+        db.close()
+
+    listing, _ = _pages({"category": "Termless", "limit": 2})
+    pages, cursors = _pages({"category": "Termless", "limit": 2, "search": "!!!"})
+    assert pages == listing
+    assert sum(len(page) for page in pages) == 5
+    assert cursors and all("k" in cursor for cursor in cursors)
@@ -0,0 +1,122 @@
+"""
+Guard against N+1 loading in order history, carts and the agent tools.
+
+Seeds two users, one with a small history and one with a large one, and
+counts the SQL statements each path issues, including serialization through
+the response schemas and the agent tool formatters. Every path must issue
+the same number of queries for both. Counting uses query_stats, whose N+1
+warnings name the repeated statement.
+"""
+import asyncio
+
+import pytest
+
+import crud, crud_async, database, inventory, models, query_stats, schemas
+import agents.tools as agent_tools
+
+SIZES = {"small": (2, 2), "large": (50, 10)}   # (orders, items per order)
+
+
+def measure(name: str, fn) -> int:
+    with query_stats.track(name, kind="test") as queries:
+        fn()
+    return queries.count
+
+
+def seed(n_orders: int, n_items: int) -> tuple[int, list[int]]:
+    db = database.SessionLocal()
+    try:
+        user = models.User(email=f"qc-{n_orders}-{n_items}@shop.com", password_hash="x")
+        db.add(user)
+        products = [
+            models.Product(name=f"QC Product {n_orders}-{i}", price=1.0 + i, stock_quantity=100, category="QC")
+            for i in range(n_items)
+        ]
+        db.add_all(products)
+        db.flush()
+        for _ in range(n_orders):
+            order = models.Order(user_id=user.id, total_amount=1.0, shipping_address="1 Test St")
+            db.add(order)
+            db.flush()
+            db.add_all(
+                models.OrderItem(order_id=order.id, product_id=p.id, quantity=1, price_at_purchase=p.price)
+                for p in products
+            )
+        db.add_all(models.CartItem(user_id=user.id, product_id=p.id, quantity=1) for p in products)
+        db.commit()
+        return user.id, [p.id for p in products]
+    finally:
+        db.close()
+
+
+@pytest.fixture(scope="module")
+def users() -> dict:
+    return {size: seed(*counts) for size, counts in SIZES.items()}
+
+
+def _orders(user_id: int):
+    db = database.SessionLocal()
+    try:
+        [schemas.OrderResponse.model_validate(o) for o in crud.get_user_orders(db, user_id)]
+    finally:
+        db.close()
+
+
+def _cart(user_id: int):
+    db = database.SessionLocal()
+    try:
+        [schemas.CartItemResponse.model_validate(i) for i in crud.get_cart_items(db, user_id)]
+    finally:
+        db.close()
+
+
+async def _async_orders(user_id: int):
+    async with database.AsyncSessionLocal() as db:
+        [schemas.OrderResponse.model_validate(o) for o in await crud_async.get_user_orders(db, user_id)]
+    await database.async_engine.dispose()
+
+
+READ_PATHS = {
+    "crud.get_user_orders":          _orders,
+    "crud.get_cart_items":           _cart,
+    "agent_tools.get_order_status":  agent_tools.get_order_status,
+    "agent_tools.get_cart_contents": agent_tools.get_cart_contents,
+    "crud_async.get_user_orders":    lambda user_id: asyncio.run(_async_orders(user_id)),
+}
+
+
+@pytest.mark.parametrize("path", READ_PATHS)
+def test_read_path_query_count_is_constant(users, path):
+    counts = {}
+    for size, (user_id, _) in users.items():
+        counts[size] = measure(path, lambda: READ_PATHS[path](user_id))
+    assert counts["small"] == counts["large"], f"{path} issues more queries for a larger history: {counts}"
+
+
+def test_sharded_cart_and_checkout_query_counts_are_constant(users):
+    counts = {}
+    for size, (user_id, product_ids) in users.items():
+        db = database.SessionLocal()
+        try:
+            for product_id in product_ids:
+                inventory.set_shards(db, product_id, 4)
+        finally:
+            db.close()
+
+        def add():
+            db = database.SessionLocal()
+            try:
+                crud.add_items_to_cart(db, user_id, [schemas.CartItemCreate(product_id=p, quantity=1) for p in product_ids])
+            finally:
+                db.close()
+
+        def buy():
+            db = database.SessionLocal()
+            try:
+                # Each line holds 1 of its 2 units, so checkout also takes free units from the shards
+                assert crud.create_order(db, user_id, schemas.OrderCreate(shipping_address="1 Test St"))
+            finally:
+                db.close()
+
+        counts[size] = (measure("crud.add_items_to_cart", add), measure("crud.create_order", buy))
+    assert counts["small"] == counts["large"], f"(add, checkout) queries grow with the cart: {counts}"
@@ -164,8 +164,9 @@ const AIWidget = () => {
     const [showAgentPanel, setShowAgentPanel] = useState(false);
     const panelTimerRef = useRef(null);
 
-    // Full conversation history persisted for the entire session
+    // Conversation history lives on the server; we keep the session id and a local copy for the turn count
     const [history, setHistory] = useState([]);
+    const sessionIdRef = useRef(null);
     // Messages for display (includes system action cards)
     const [messages, setMessages] = useState([{
         role: 'assistant',
@@ -207,12 +208,10 @@ const AIWidget = () => {
         if (panelTimerRef.current) clearTimeout(panelTimerRef.current);
 
         try {
-            const res = await api.post('/chat', {
-                content,
-                history: history.map(m => ({ role: m.role, content: m.content })),
-            });
+            const res = await api.post('/chat', { content, session_id: sessionIdRef.current });
 
-            const { response, agents_used = [], actions = [] } = res.data;
+            const { response, agents_used = [], actions = [], session_id } = res.data;
+            sessionIdRef.current = session_id || null;
 
             // Update agent statuses based on who actually ran
             setAgentStatus(Object.keys(AGENTS).reduce((a, k) => ({
@@ -248,7 +247,7 @@ const AIWidget = () => {
         } finally {
             setLoading(false);
         }
-    }, [query, loading, history, fetchCart, resetAgents]);
+    }, [query, loading, fetchCart, resetAgents]);
 
     const handleKeyDown = (e) => {
         if (e.key === 'Enter' && !e.shiftKey) { e.preventDefault(); handleSend(); }
@@ -263,6 +262,10 @@ const AIWidget = () => {
     };
 
     const clearHistory = () => {
+        if (sessionIdRef.current) {
+            api.delete(`/chat/sessions/${sessionIdRef.current}`).catch(() => {});
+            sessionIdRef.current = null;
+        }
         setHistory([]);
         setMessages([{
             role: 'assistant',
@@ -11,16 +11,24 @@ const STATUS_STYLES = {
 
 export default function AdminDashboard() {
     const [orders, setOrders] = useState([]);
+    const [nextCursor, setNextCursor] = useState(null);
+    const [summary, setSummary] = useState({ orders: 0, revenue: 0, average_order_value: 0 });
     const [loading, setLoading] = useState(true);
     const [filterStatus, setFilterStatus] = useState('all');
 
     useEffect(() => { fetchOrders(); }, []);
 
-    const fetchOrders = async () => {
+    // /orders is keyset-paged: the X-Next-Cursor header points at the next page
+    const fetchOrders = async (cursor = null) => {
         try {
             setLoading(true);
-            const res = await api.get('/orders');
-            setOrders(res.data);
+            const [res, stats] = await Promise.all([
+                api.get('/orders', { params: cursor ? { cursor } : {} }),
+                cursor ? Promise.resolve(null) : api.get('/admin/analytics/summary'),
+            ]);
+            setOrders(prev => (cursor ? [...prev, ...res.data] : res.data));
+            setNextCursor(res.headers['x-next-cursor'] || null);
+            if (stats) setSummary(stats.data);
         } catch (err) {
             console.error(err);
         } finally {
@@ -32,13 +40,11 @@ export default function AdminDashboard() {
         ? orders
         : orders.filter(o => o.status?.toLowerCase() === filterStatus.toLowerCase());
 
-    const totalRevenue = orders.reduce((acc, o) => acc + o.total_amount, 0);
-    const avgOrder = orders.length ? totalRevenue / orders.length : 0;
-
+    // Totals come from the server-side sales rollups, not the loaded page of orders
     const STATS = [
-        { label: 'Total Orders', value: orders.length, icon: ShoppingBag, from: 'from-violet-600', to: 'to-indigo-600' },
-        { label: 'Total Revenue', value: `$${totalRevenue.toFixed(2)}`, icon: TrendingUp, from: 'from-emerald-600', to: 'to-teal-600' },
-        { label: 'Avg Order Value', value: `$${avgOrder.toFixed(2)}`, icon: LayoutDashboard, from: 'from-amber-500', to: 'to-orange-500' },
+        { label: 'Total Orders', value: summary.orders, icon: ShoppingBag, from: 'from-violet-600', to: 'to-indigo-600' },
+        { label: 'Total Revenue', value: `$${summary.revenue.toFixed(2)}`, icon: TrendingUp, from: 'from-emerald-600', to: 'to-teal-600' },
+        { label: 'Avg Order Value', value: `$${summary.average_order_value.toFixed(2)}`, icon: LayoutDashboard, from: 'from-amber-500', to: 'to-orange-500' },
     ];
 
     return (
@@ -50,7 +56,7 @@ export default function AdminDashboard() {
                     <p className="text-white/40 text-sm">Monitor orders, revenue, and fulfillment</p>
                 </div>
                 <button
-                    onClick={fetchOrders}
+                    onClick={() => fetchOrders()}
                     className="btn-outline text-sm !py-2.5 self-start"
                 >
                     <RefreshCcw className={`w-4 h-4 ${loading ? 'animate-spin' : ''}`} />
@@ -151,7 +157,15 @@ export default function AdminDashboard() {
                 {/* Footer */}
                 {!loading && filteredOrders.length > 0 && (
                     <div className="px-6 py-4 border-t border-white/[0.05] text-white/20 text-xs">
-                        Showing {filteredOrders.length} of {orders.length} total orders
+                        Showing {filteredOrders.length} of {summary.orders} total orders
+                        {nextCursor && (
+                            <button
+                                onClick={() => fetchOrders(nextCursor)}
+                                className="ml-4 text-violet-300 hover:text-violet-200 font-semibold"
+                            >
+                                Load more
+                            </button>
+                        )}
                     </div>
                 )}
             </div>